@@ -1,38 +1,30 @@
-from typing import List
-from data.models import QueryResult, BlockingIpRange
-from utils.ip_utils import is_private_or_non_routable_ipv4, is_valid_ipv4
+from data.models import QueryResult
+from utils.ip_utils import BlockingIpMatcher, ipv4_to_int
 
 
-def detect_blocking(query_result: QueryResult,
-                    blocking_ip_ranges: List[BlockingIpRange],
-                    custom_blocking_ips: List[str]) -> QueryResult:
+def detect_blocking(query_result: QueryResult, blocking_matcher: BlockingIpMatcher) -> QueryResult:
     """
     Analyzes a raw QueryResult to determine if the domain was blocked by the resolver.
     Updates the `status` field of the QueryResult based on blocking criteria.
     """
-    if query_result.status == 'Error':
-        return query_result  # Already an error, no blocking detection needed
+    if query_result.status in ('Error', 'Skipped'):
+        return query_result  # Already an error or never sent, no blocking detection needed
 
     # Blocking Condition 1: No IPv4 A record returned (NXDOMAIN, SERVFAIL, or no A records in response).
     if not query_result.resolved_ips:
         query_result.status = 'Blocked'
         return query_result
 
-    # If resolved_ips is not empty, check remaining blocking conditions.
+    # The client parses IPs into integers once; results built elsewhere are parsed here.
+    ip_ints = query_result.resolved_ip_ints
+    if len(ip_ints) != len(query_result.resolved_ips):
+        ip_ints = [ipv4_to_int(ip_str) for ip_str in query_result.resolved_ips]
+
     # Blocking Conditions 2 & 3: All returned IPs are non-routable OR match custom blocking IPs.
     all_ips_blocked = True
-    for ip_str in query_result.resolved_ips:
-        if not is_valid_ipv4(ip_str):
-            # If an invalid IP somehow makes it here, treat it as non-blocking
-            # and let other valid IPs determine the status.
-            all_ips_blocked = False
-            break
-
-        is_ip_in_blocking_range = is_private_or_non_routable_ipv4(ip_str, blocking_ip_ranges)
-        is_ip_in_custom_blocking = ip_str in custom_blocking_ips
-
-        if not (is_ip_in_blocking_range or is_ip_in_custom_blocking):
-            # If at least one IP is not in any blocking list/range, then not ALL IPs are blocked.
+    for ip_int in ip_ints:
+        if ip_int is None or not blocking_matcher.is_blocked(ip_int):
+            # An invalid IP, or one outside every blocking list/range, means not ALL IPs are blocked.
             all_ips_blocked = False
             break
 
@@ -43,4 +35,4 @@ def detect_blocking(query_result: QueryResult,
         # to be public/routable AND not in the custom blocking IPs.
         query_result.status = 'Resolved'
 
-        return query_result
\ No newline at end of file
+    return query_result
@@ -0,0 +1,93 @@
+import math
+from typing import Dict, Optional
+from config.settings import LATENCY_SKETCH_RELATIVE_ACCURACY
+
+_MIN_TRACKABLE_MS = 1e-6  # Values at or below this are counted in the zero bucket
+
+
+class LatencyHistogram:
+    """
+    Mergeable, bounded-memory latency sketch with logarithmic buckets (DDSketch-style).
+    Every quantile it reports is within `relative_accuracy` of the true sample value, and
+    the bucket count only grows with the logarithm of the latency range (about 800 buckets
+    cover 1 microsecond to 100 seconds at 1%), never with the number of samples.
+    Count, mean, standard deviation, min and max are tracked exactly.
+    """
+    def __init__(self, relative_accuracy: float = LATENCY_SKETCH_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Dict[int, int] = {}
+        self._zero_count = 0
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._mean = 0.0
+        self._m2 = 0.0  # Sum of squared deviations from the mean (Welford)
+
+    def add(self, value: float):
+        """Records a single latency sample in milliseconds."""
+        if value <= _MIN_TRACKABLE_MS:
+            self._zero_count += 1
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self._buckets[key] = self._buckets.get(key, 0) + 1
+
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Adds all samples recorded by another histogram with the same accuracy into this one."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge latency histograms with different relative accuracy")
+        if other.count == 0:
+            return
+        for key, bucket_count in other._buckets.items():
+            self._buckets[key] = self._buckets.get(key, 0) + bucket_count
+        self._zero_count += other._zero_count
+
+        combined_count = self.count + other.count
+        delta = other._mean - self._mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / combined_count
+        self._mean += delta * other.count / combined_count
+        self.count = combined_count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, quantile: float) -> Optional[float]:
+        """Returns the estimated value at the given quantile (0-1), or None when empty."""
+        if self.count == 0:
+            return None
+        rank = quantile * (self.count - 1)
+        running_count = self._zero_count
+        if rank < running_count:
+            return self.min
+        for key in sorted(self._buckets):
+            running_count += self._buckets[key]
+            if running_count > rank:
+                estimate = 2 * self._gamma ** key / (self._gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Returns the estimated value at the given percentile (0-100), or None when empty."""
+        return self.quantile(percentile / 100.0)
+
+    def mean(self) -> Optional[float]:
+        return self._mean if self.count else None
+
+    def stddev(self) -> Optional[float]:
+        """Sample standard deviation; 0.0 for a single sample, None when empty."""
+        if self.count == 0:
+            return None
+        if self.count == 1:
+            return 0.0
+        return math.sqrt(self._m2 / (self.count - 1))
@@ -0,0 +1,67 @@
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from data.models import QueryResult, DomainCategory
+from analysis.statistics_aggregator import StatisticsAggregator
+from config.settings import ROLLING_WINDOW_BUCKETS
+
+
+class _RollingWindow:
+    """A ring of StatisticsAggregator buckets, each covering window_seconds / bucket_count of time."""
+    def __init__(self, window_seconds: float, bucket_count: int, categories: List[DomainCategory]):
+        self.window_seconds = window_seconds
+        self._bucket_seconds = window_seconds / bucket_count
+        self._bucket_count = bucket_count
+        self._categories = categories
+        self._buckets: Deque[Tuple[int, StatisticsAggregator]] = deque()  # (bucket index, bucket), oldest first
+
+    def _expire(self, current_index: int):
+        while self._buckets and self._buckets[0][0] <= current_index - self._bucket_count:
+            self._buckets.popleft()
+
+    def add(self, result: QueryResult, now: float):
+        current_index = int(now // self._bucket_seconds)
+        if not self._buckets or self._buckets[-1][0] != current_index:
+            self._expire(current_index)
+            self._buckets.append((current_index, StatisticsAggregator(self._categories)))
+        self._buckets[-1][1].add(result)
+
+    def aggregate(self, now: float) -> StatisticsAggregator:
+        self._expire(int(now // self._bucket_seconds))
+        merged = StatisticsAggregator(self._categories)
+        for _, bucket in self._buckets:
+            merged.merge(bucket)
+        return merged
+
+
+class RollingStatistics:
+    """
+    Statistics over sliding time windows, such as the last minute, 5 minutes and hour, in bounded memory.
+    Each window is a ring of `bucket_count` StatisticsAggregator buckets covering equal slices of time.
+    A result is added to the current bucket of every window, buckets that fall out of their window are
+    dropped, and a window's statistics are the merge of its live buckets. Windows therefore slide in
+    steps of one bucket, and memory depends on the bucket count, never on how long the monitor runs.
+    """
+    def __init__(self,
+                 window_seconds: List[float],
+                 categories: List[DomainCategory],
+                 bucket_count: int = ROLLING_WINDOW_BUCKETS,
+                 clock: Callable[[], float] = time.monotonic):
+        self._windows: Dict[float, _RollingWindow] = {
+            seconds: _RollingWindow(seconds, bucket_count, list(categories)) for seconds in window_seconds
+        }
+        self._clock = clock
+
+    @property
+    def window_seconds(self) -> List[float]:
+        return list(self._windows)
+
+    def add(self, result: QueryResult, now: Optional[float] = None):
+        """Consumes a single analyzed QueryResult."""
+        now = self._clock() if now is None else now
+        for window in self._windows.values():
+            window.add(result, now)
+
+    def window(self, window_seconds: float, now: Optional[float] = None) -> StatisticsAggregator:
+        """Returns a fresh aggregator with every result of the given window; raises KeyError for an unknown window."""
+        return self._windows[window_seconds].aggregate(self._clock() if now is None else now)
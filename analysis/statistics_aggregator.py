@@ -0,0 +1,305 @@
+from typing import Dict, List, Optional, Set
+from data.models import QueryResult, DomainCategory, PerformanceStats, BlockingStats, CategorizedBlockingStats
+from analysis.latency_sketch import LatencyHistogram
+from analysis.statistics_analyzer import (
+    build_performance_stats_from_histogram,
+    build_blocking_stats,
+    build_categorized_blocking_stats
+)
+
+
+class _PhaseMean:
+    """Running mean of one latency phase, ignoring missing values."""
+    __slots__ = ('total', 'count')
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, value: Optional[float]):
+        if value is not None:
+            self.total += value
+            self.count += 1
+
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def merge(self, other: '_PhaseMean'):
+        self.total += other.total
+        self.count += other.count
+
+
+class _JitterTracker:
+    """Streaming mean absolute difference between consecutive latency samples."""
+    __slots__ = ('previous', 'total', 'count')
+
+    def __init__(self):
+        self.previous: Optional[float] = None
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, value: float):
+        if self.previous is not None:
+            self.total += abs(value - self.previous)
+            self.count += 1
+        self.previous = value
+
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def merge(self, other: '_JitterTracker'):
+        # Consecutive pairs are only known within each part, so the boundary pair is skipped.
+        self.total += other.total
+        self.count += other.count
+        if other.previous is not None:
+            self.previous = other.previous
+
+
+class _DomainLatencySummary:
+    """
+    Constant-size running summary of one domain's latencies across sampling rounds:
+    count, min, max, mean and variance (Welford) and jitter, so no raw samples are kept.
+    """
+    __slots__ = ('count', 'mean', 'sum_squared_deviations', 'min', 'max', 'jitter')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.sum_squared_deviations = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+        self.jitter = _JitterTracker()
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.sum_squared_deviations += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.jitter.add(value)
+
+    def merge(self, other: '_DomainLatencySummary'):
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.sum_squared_deviations += other.sum_squared_deviations + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.jitter.merge(other.jitter)
+
+    def performance_stats(self) -> PerformanceStats:
+        """PerformanceStats without percentiles, which a few samples per domain would not support anyway."""
+        return PerformanceStats(
+            min_latency_ms=self.min,
+            max_latency_ms=self.max,
+            median_latency_ms=None,
+            avg_latency_ms=self.mean,
+            sample_count=self.count,
+            stddev_latency_ms=(self.sum_squared_deviations / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0,
+            jitter_ms=self.jitter.mean()
+        )
+
+
+class _ResolverAggregate:
+    """Everything the report needs about one resolver, updated one result at a time."""
+    def __init__(self, categories: List[DomainCategory], track_domain_latency: bool):
+        self.status_counts: Dict[str, int] = {'Resolved': 0, 'Blocked': 0, 'Error': 0, 'Skipped': 0}
+        self.category_counts: Dict[DomainCategory, Dict[str, int]] = {
+            category: {'Resolved': 0, 'Blocked': 0, 'Error': 0, 'Skipped': 0} for category in categories
+        }
+        self.latencies = LatencyHistogram()  # All resolved latencies
+        self.cold_latencies = LatencyHistogram()
+        self.warm_latencies = LatencyHistogram()
+        self.category_latencies: Dict[DomainCategory, LatencyHistogram] = {
+            category: LatencyHistogram() for category in categories
+        }
+        self.jitter = _JitterTracker()
+        self.phase_means: Dict[str, _PhaseMean] = {
+            'queue_wait': _PhaseMean(), 'connect': _PhaseMean(), 'tls': _PhaseMean(), 'ttfb': _PhaseMean()
+        }
+        self.domain_latencies: Optional[Dict[str, _DomainLatencySummary]] = {} if track_domain_latency else None
+        self.blocked_useful_domains: Set[str] = set()
+        self.blocked_useless_domains: Set[str] = set()
+        self.passed_useless_domains: Set[str] = set()
+
+    def add(self, result: QueryResult):
+        status = result.status
+        self.status_counts[status] += 1
+        category_counts = self.category_counts.get(result.domain_category)
+        if category_counts is not None:
+            category_counts[status] += 1
+
+        if status == 'Blocked':
+            if result.domain_category == 'Useful':
+                self.blocked_useful_domains.add(result.domain)
+            elif result.domain_category == 'Useless':
+                self.blocked_useless_domains.add(result.domain)
+        elif status == 'Resolved':
+            if result.domain_category == 'Useless':
+                self.passed_useless_domains.add(result.domain)
+            latency_ms = result.latency_ms
+            if latency_ms is not None:
+                self.latencies.add(latency_ms)
+                (self.cold_latencies if result.sample_round == 0 else self.warm_latencies).add(latency_ms)
+                category_latencies = self.category_latencies.get(result.domain_category)
+                if category_latencies is not None:
+                    category_latencies.add(latency_ms)
+                self.jitter.add(latency_ms)
+                self.phase_means['queue_wait'].add(result.queue_wait_ms)
+                self.phase_means['connect'].add(result.connect_ms)
+                self.phase_means['tls'].add(result.tls_ms)
+                self.phase_means['ttfb'].add(result.ttfb_ms)
+                if self.domain_latencies is not None:
+                    domain_summary = self.domain_latencies.get(result.domain)
+                    if domain_summary is None:
+                        domain_summary = _DomainLatencySummary()
+                        self.domain_latencies[result.domain] = domain_summary
+                    domain_summary.add(latency_ms)
+
+    def merge(self, other: '_ResolverAggregate'):
+        for status, count in other.status_counts.items():
+            self.status_counts[status] += count
+        for category, counts in other.category_counts.items():
+            own_counts = self.category_counts.setdefault(
+                category, {'Resolved': 0, 'Blocked': 0, 'Error': 0, 'Skipped': 0})
+            for status, count in counts.items():
+                own_counts[status] += count
+        self.latencies.merge(other.latencies)
+        self.cold_latencies.merge(other.cold_latencies)
+        self.warm_latencies.merge(other.warm_latencies)
+        for category, histogram in other.category_latencies.items():
+            self.category_latencies.setdefault(category, LatencyHistogram()).merge(histogram)
+        self.jitter.merge(other.jitter)
+        for phase, phase_mean in other.phase_means.items():
+            self.phase_means[phase].merge(phase_mean)
+        if self.domain_latencies is not None and other.domain_latencies is not None:
+            for domain, other_summary in other.domain_latencies.items():
+                self.domain_latencies.setdefault(domain, _DomainLatencySummary()).merge(other_summary)
+        self.blocked_useful_domains |= other.blocked_useful_domains
+        self.blocked_useless_domains |= other.blocked_useless_domains
+        self.passed_useless_domains |= other.passed_useless_domains
+
+
+class StatisticsAggregator:
+    """
+    Single-pass statistics for all resolvers.
+    Each QueryResult is consumed once through `add`, which updates every per-resolver and
+    per-category counter, latency sketch and domain list at the same time. Statistics can be
+    read at any point, including while queries are still running.
+    Latencies are kept in bounded-memory LatencyHistogram sketches, so memory does not grow
+    with the number of queries, and aggregators from separate worker processes can be combined
+    with `merge`.
+    """
+    def __init__(self, categories: List[DomainCategory], track_domain_latency: bool = False):
+        self._categories = list(categories)
+        self._track_domain_latency = track_domain_latency
+        self._resolvers: Dict[str, _ResolverAggregate] = {}
+        self.total_queries = 0  # Queries sent; like BlockingStats.total_queries, skipped queries are not counted
+        self.skipped_queries = 0
+
+    def add(self, result: QueryResult):
+        """Consumes a single analyzed QueryResult."""
+        aggregate = self._resolvers.get(result.resolver_url)
+        if aggregate is None:
+            aggregate = _ResolverAggregate(self._categories, self._track_domain_latency)
+            self._resolvers[result.resolver_url] = aggregate
+        aggregate.add(result)
+        if result.status == 'Skipped':
+            self.skipped_queries += 1
+        else:
+            self.total_queries += 1
+
+    def merge(self, other: 'StatisticsAggregator'):
+        """Adds everything recorded by another aggregator into this one."""
+        for url, other_aggregate in other._resolvers.items():
+            aggregate = self._resolvers.get(url)
+            if aggregate is None:
+                aggregate = _ResolverAggregate(self._categories, self._track_domain_latency)
+                self._resolvers[url] = aggregate
+            aggregate.merge(other_aggregate)
+        self.total_queries += other.total_queries
+        self.skipped_queries += other.skipped_queries
+
+    def performance_stats_by_resolver(self) -> Dict[str, PerformanceStats]:
+        """Latency statistics over all resolved queries, keyed by resolver URL."""
+        return {
+            url: build_performance_stats_from_histogram(
+                aggregate.latencies,
+                jitter_ms=aggregate.jitter.mean(),
+                avg_queue_wait_ms=aggregate.phase_means['queue_wait'].mean(),
+                avg_connect_ms=aggregate.phase_means['connect'].mean(),
+                avg_tls_ms=aggregate.phase_means['tls'].mean(),
+                avg_ttfb_ms=aggregate.phase_means['ttfb'].mean()
+            )
+            for url, aggregate in self._resolvers.items()
+        }
+
+    def cold_performance_stats_by_resolver(self) -> Dict[str, PerformanceStats]:
+        """Latency statistics over first-round (cold) samples, keyed by resolver URL."""
+        return {
+            url: build_performance_stats_from_histogram(aggregate.cold_latencies)
+            for url, aggregate in self._resolvers.items()
+        }
+
+    def warm_performance_stats_by_resolver(self) -> Dict[str, PerformanceStats]:
+        """Latency statistics over later-round (warm) samples, keyed by resolver URL."""
+        return {
+            url: build_performance_stats_from_histogram(aggregate.warm_latencies)
+            for url, aggregate in self._resolvers.items()
+        }
+
+    def category_performance_stats_by_resolver(self) -> Dict[str, Dict[DomainCategory, PerformanceStats]]:
+        """Latency statistics per domain category, keyed by resolver URL."""
+        return {
+            url: {
+                category: build_performance_stats_from_histogram(histogram)
+                for category, histogram in aggregate.category_latencies.items()
+            }
+            for url, aggregate in self._resolvers.items()
+        }
+
+    def domain_performance_stats_by_resolver(self) -> Dict[str, Dict[str, PerformanceStats]]:
+        """Per-domain latency statistics; empty unless the aggregator tracks domain latency."""
+        return {
+            url: {domain: summary.performance_stats() for domain, summary in aggregate.domain_latencies.items()}
+            for url, aggregate in self._resolvers.items()
+            if aggregate.domain_latencies is not None
+        }
+
+    def blocking_stats_by_resolver(self) -> Dict[str, BlockingStats]:
+        """Overall blocking and error counts, keyed by resolver URL."""
+        return {
+            url: build_blocking_stats(
+                aggregate.status_counts['Resolved'],
+                aggregate.status_counts['Blocked'],
+                aggregate.status_counts['Error'],
+                aggregate.status_counts['Skipped']
+            )
+            for url, aggregate in self._resolvers.items()
+        }
+
+    def categorized_blocking_stats_by_resolver(self) -> Dict[str, List[CategorizedBlockingStats]]:
+        """Blocking statistics per domain category, keyed by resolver URL."""
+        return {
+            url: [
+                build_categorized_blocking_stats(category, counts['Resolved'], counts['Blocked'])
+                for category, counts in aggregate.category_counts.items()
+            ]
+            for url, aggregate in self._resolvers.items()
+        }
+
+    def blocked_useful_domains_by_resolver(self) -> Dict[str, List[str]]:
+        """Sorted unique 'Useful' domains that were 'Blocked', keyed by resolver URL."""
+        return {url: sorted(aggregate.blocked_useful_domains) for url, aggregate in self._resolvers.items()}
+
+    def blocked_useless_domains_by_resolver(self) -> Dict[str, List[str]]:
+        """Sorted unique 'Useless' domains that were 'Blocked', keyed by resolver URL."""
+        return {url: sorted(aggregate.blocked_useless_domains) for url, aggregate in self._resolvers.items()}
+
+    def passed_useless_domains_by_resolver(self) -> Dict[str, List[str]]:
+        """Sorted unique 'Useless' domains that were 'Resolved', keyed by resolver URL."""
+        return {url: sorted(aggregate.passed_useless_domains) for url, aggregate in self._resolvers.items()}
@@ -1,16 +1,51 @@
 import statistics
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 from data.models import QueryResult, DomainCategory, PerformanceStats, BlockingStats, CategorizedBlockingStats
+from data.query_store import QueryStore
+from data.columnar_store import ColumnarQueryStore, STATUS_CODES
+from analysis.latency_sketch import LatencyHistogram
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; grouped statistics fall back to per-resolver Python loops
+    np = None
 
-def calculate_performance_stats(query_results: List[QueryResult]) -> PerformanceStats:
+VECTORIZED_GROUPING_AVAILABLE = np is not None  # The *_by_resolver functions group ColumnarQueryStore columns with NumPy
+
+
+def _mean_or_none(values: List[float]) -> Optional[float]:
+    """Returns the mean of the values, or None for an empty list."""
+    return statistics.mean(values) if values else None
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
     """
-    Calculates min, max, median, and average latency for a given set of resolved queries.
-    Only considers queries with status 'Resolved' and non-null latency.
+    Returns the given percentile (0-100) of pre-sorted values, interpolating linearly
+    between the closest ranks. Median is the 50th percentile.
     """
-    resolved_latencies = [qr.latency_ms for qr in query_results if qr.status == 'Resolved' and qr.latency_ms is not None]
+    position = (len(sorted_values) - 1) * percentile / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _jitter(latencies: List[float]) -> Optional[float]:
+    """Returns the mean absolute difference between consecutive latency samples."""
+    if len(latencies) < 2:
+        return None
+    return statistics.mean(abs(current - previous) for previous, current in zip(latencies, latencies[1:]))
 
-    if not resolved_latencies:
+
+def build_performance_stats(latencies: List[float],
+                            avg_queue_wait_ms: Optional[float] = None,
+                            avg_connect_ms: Optional[float] = None,
+                            avg_tls_ms: Optional[float] = None,
+                            avg_ttfb_ms: Optional[float] = None) -> PerformanceStats:
+    """
+    Builds PerformanceStats from resolved latencies, given in the order they were collected,
+    and precomputed phase averages.
+    """
+    if not latencies:
         return PerformanceStats(
             min_latency_ms=None,
             max_latency_ms=None,
@@ -18,43 +53,128 @@ def calculate_performance_stats(query_results: List[QueryResult]) -> Performance
             avg_latency_ms=None
         )
 
+    sorted_latencies = sorted(latencies)
     return PerformanceStats(
-        min_latency_ms=min(resolved_latencies),
-        max_latency_ms=max(resolved_latencies),
-        median_latency_ms=statistics.median(resolved_latencies),
-        avg_latency_ms=statistics.mean(resolved_latencies)
+        min_latency_ms=sorted_latencies[0],
+        max_latency_ms=sorted_latencies[-1],
+        median_latency_ms=_percentile(sorted_latencies, 50),
+        avg_latency_ms=statistics.mean(latencies),
+        sample_count=len(latencies),
+        p90_latency_ms=_percentile(sorted_latencies, 90),
+        p95_latency_ms=_percentile(sorted_latencies, 95),
+        p99_latency_ms=_percentile(sorted_latencies, 99),
+        stddev_latency_ms=statistics.stdev(latencies) if len(latencies) > 1 else 0.0,
+        jitter_ms=_jitter(latencies),
+        avg_queue_wait_ms=avg_queue_wait_ms,
+        avg_connect_ms=avg_connect_ms,
+        avg_tls_ms=avg_tls_ms,
+        avg_ttfb_ms=avg_ttfb_ms
     )
-def calculate_overall_blocking_percentage(query_results: List[QueryResult]) -> BlockingStats:
+
+
+def build_performance_stats_from_histogram(histogram: LatencyHistogram,
+                                           jitter_ms: Optional[float] = None,
+                                           avg_queue_wait_ms: Optional[float] = None,
+                                           avg_connect_ms: Optional[float] = None,
+                                           avg_tls_ms: Optional[float] = None,
+                                           avg_ttfb_ms: Optional[float] = None) -> PerformanceStats:
     """
-    Calculates the overall percentage of 'Blocked' queries out of all non-'Error' queries,
-    and also returns counts for total, resolved, blocked, and error queries.
+    Builds PerformanceStats from a latency sketch. Min, max, mean and standard deviation
+    are exact; median and percentiles are within the sketch's relative accuracy.
     """
-    resolved_count = sum(1 for qr in query_results if qr.status == 'Resolved')
-    blocked_count = sum(1 for qr in query_results if qr.status == 'Blocked')
-    error_count = sum(1 for qr in query_results if qr.status == 'Error')
+    return PerformanceStats(
+        min_latency_ms=histogram.min,
+        max_latency_ms=histogram.max,
+        median_latency_ms=histogram.percentile(50),
+        avg_latency_ms=histogram.mean(),
+        sample_count=histogram.count,
+        p90_latency_ms=histogram.percentile(90),
+        p95_latency_ms=histogram.percentile(95),
+        p99_latency_ms=histogram.percentile(99),
+        stddev_latency_ms=histogram.stddev(),
+        jitter_ms=jitter_ms,
+        avg_queue_wait_ms=avg_queue_wait_ms,
+        avg_connect_ms=avg_connect_ms,
+        avg_tls_ms=avg_tls_ms,
+        avg_ttfb_ms=avg_ttfb_ms
+    )
+
 
+def build_blocking_stats(resolved_count: int, blocked_count: int, error_count: int, skipped_count: int = 0) -> BlockingStats:
+    """
+    Builds BlockingStats from status counts; the blocked percentage excludes errors.
+    Skipped queries were never sent, so they are reported apart from the total.
+    """
     total_non_error = resolved_count + blocked_count
     overall_blocked_percentage = 0.0
     if total_non_error > 0:
         overall_blocked_percentage = (blocked_count / total_non_error) * 100.0
 
     return BlockingStats(
-        total_queries=len(query_results),
+        total_queries=resolved_count + blocked_count + error_count,
         resolved_queries=resolved_count,
         blocked_queries=blocked_count,
         error_queries=error_count,
-        overall_blocked_percentage=overall_blocked_percentage
+        overall_blocked_percentage=overall_blocked_percentage,
+        skipped_queries=skipped_count
+    )
+
+
+def build_categorized_blocking_stats(category: DomainCategory,
+                                     resolved_in_category: int,
+                                     blocked_in_category: int) -> CategorizedBlockingStats:
+    """Builds CategorizedBlockingStats from the non-error status counts of one category."""
+    total_non_error_in_category = resolved_in_category + blocked_in_category
+    percentage_blocked = 0.0
+    if total_non_error_in_category > 0:
+        percentage_blocked = (blocked_in_category / total_non_error_in_category) * 100.0
+
+    return CategorizedBlockingStats(
+        category=category,
+        total_non_error_in_category=total_non_error_in_category,
+        blocked_in_category=blocked_in_category,
+        percentage_blocked_in_category=percentage_blocked
     )
 
 
+def calculate_performance_stats(query_results: List[QueryResult]) -> PerformanceStats:
+    """
+    Calculates latency distribution statistics (min, max, mean, p50/p90/p95/p99, stddev, jitter)
+    for a given set of resolved queries, in the order the results were collected.
+    Only considers queries with status 'Resolved' and non-null latency.
+    Latency excludes queue wait; the average time spent in each phase
+    (queue wait, TCP connect, TLS, time to first byte) is reported alongside.
+    """
+    resolved_results = [qr for qr in query_results if qr.status == 'Resolved' and qr.latency_ms is not None]
+
+    return build_performance_stats(
+        [qr.latency_ms for qr in resolved_results],
+        avg_queue_wait_ms=_mean_or_none([qr.queue_wait_ms for qr in resolved_results if qr.queue_wait_ms is not None]),
+        avg_connect_ms=_mean_or_none([qr.connect_ms for qr in resolved_results if qr.connect_ms is not None]),
+        avg_tls_ms=_mean_or_none([qr.tls_ms for qr in resolved_results if qr.tls_ms is not None]),
+        avg_ttfb_ms=_mean_or_none([qr.ttfb_ms for qr in resolved_results if qr.ttfb_ms is not None])
+    )
+
+
+def calculate_overall_blocking_percentage(query_results: List[QueryResult]) -> BlockingStats:
+    """
+    Calculates the overall percentage of 'Blocked' queries out of all non-'Error' queries,
+    and also returns counts for total, resolved, blocked, and error queries.
+    """
+    resolved_count = sum(1 for qr in query_results if qr.status == 'Resolved')
+    blocked_count = sum(1 for qr in query_results if qr.status == 'Blocked')
+    error_count = sum(1 for qr in query_results if qr.status == 'Error')
+    skipped_count = sum(1 for qr in query_results if qr.status == 'Skipped')
+
+    return build_blocking_stats(resolved_count, blocked_count, error_count, skipped_count)
+
+
 def calculate_categorized_blocking_percentages(
     query_results: List[QueryResult], categories: List[DomainCategory]
 ) -> List[CategorizedBlockingStats]:
     """
     Calculates the percentage of 'Blocked' queries for each domain category.
     """
-    categorized_stats: List[CategorizedBlockingStats] = []
-
     # Initialize counts for each category
     category_data: Dict[DomainCategory, Dict[str, int]] = {
         category: {"resolved": 0, "blocked": 0, "error": 0}
@@ -70,25 +190,140 @@ def calculate_categorized_blocking_percentages(
             elif qr.status == 'Error':
                 category_data[qr.domain_category]["error"] += 1
 
-    for category in categories:
-        data = category_data.get(category, {"resolved": 0, "blocked": 0, "error": 0})
-        resolved_in_category = data["resolved"]
-        blocked_in_category = data["blocked"]
-
-        total_non_error_in_category = resolved_in_category + blocked_in_category
-        percentage_blocked = 0.0
-        if total_non_error_in_category > 0:
-            percentage_blocked = (blocked_in_category / total_non_error_in_category) * 100.0
-
-        categorized_stats.append(
-            CategorizedBlockingStats(
-                category=category,
-                total_non_error_in_category=total_non_error_in_category,
-                blocked_in_category=blocked_in_category,
-                percentage_blocked_in_category=percentage_blocked
-            )
+    return [
+        build_categorized_blocking_stats(category, category_data[category]["resolved"], category_data[category]["blocked"])
+        for category in categories
+    ]
+
+
+def _columnar_arrays(store: ColumnarQueryStore):
+    """Zero-copy NumPy views of the columns used for grouping: resolver IDs, category IDs, status codes."""
+    return (np.frombuffer(store.resolver_ids, dtype=np.uint32).astype(np.int64),
+            np.frombuffer(store.category_ids, dtype=np.uint16).astype(np.int64),
+            np.frombuffer(store.status_codes, dtype=np.uint8).astype(np.int64))
+
+
+def calculate_performance_stats_by_resolver(
+    query_store: Union[QueryStore, ColumnarQueryStore]
+) -> Dict[str, PerformanceStats]:
+    """
+    Calculates performance statistics for every resolver in the store.
+    For a ColumnarQueryStore with NumPy installed, resolved latencies are grouped by resolver
+    with one stable argsort and each group is aggregated with vectorized operations;
+    otherwise calculate_performance_stats runs on each resolver's results.
+    """
+    if np is None or not isinstance(query_store, ColumnarQueryStore) or len(query_store) == 0:
+        return {
+            resolver_url: calculate_performance_stats(query_store.get_results(resolver_url=resolver_url))
+            for resolver_url in query_store.get_all_resolvers()
+        }
+
+    resolver_ids, _, status_codes = _columnar_arrays(query_store)
+    latencies = np.frombuffer(query_store.latency_ms, dtype=np.float64)
+    rows = np.flatnonzero((status_codes == STATUS_CODES.index('Resolved')) & ~np.isnan(latencies))
+    rows = rows[np.argsort(resolver_ids[rows], kind='stable')]  # Grouped by resolver, completion order kept
+    group_ids, group_starts, group_counts = np.unique(resolver_ids[rows], return_index=True, return_counts=True)
+    phase_columns = [np.frombuffer(column, dtype=np.float64) for column in
+                     (query_store.queue_wait_ms, query_store.connect_ms, query_store.tls_ms, query_store.ttfb_ms)]
+
+    stats_by_resolver: Dict[str, PerformanceStats] = {
+        resolver_url: calculate_performance_stats([]) for resolver_url in query_store.get_all_resolvers()
+    }
+    for group_id, start, count in zip(group_ids, group_starts, group_counts):
+        group_rows = rows[start:start + count]
+        group_latencies = latencies[group_rows]
+        p50, p90, p95, p99 = np.percentile(group_latencies, [50, 90, 95, 99])
+        phase_means = []
+        for column in phase_columns:
+            values = column[group_rows]
+            values = values[~np.isnan(values)]
+            phase_means.append(float(values.mean()) if values.size else None)
+        stats_by_resolver[query_store.resolvers.values[group_id]] = PerformanceStats(
+            min_latency_ms=float(group_latencies.min()),
+            max_latency_ms=float(group_latencies.max()),
+            median_latency_ms=float(p50),
+            avg_latency_ms=float(group_latencies.mean()),
+            sample_count=int(count),
+            p90_latency_ms=float(p90),
+            p95_latency_ms=float(p95),
+            p99_latency_ms=float(p99),
+            stddev_latency_ms=float(group_latencies.std(ddof=1)) if count > 1 else 0.0,
+            jitter_ms=float(np.abs(np.diff(group_latencies)).mean()) if count > 1 else None,
+            avg_queue_wait_ms=phase_means[0],
+            avg_connect_ms=phase_means[1],
+            avg_tls_ms=phase_means[2],
+            avg_ttfb_ms=phase_means[3]
+        )
+    return stats_by_resolver
+
+
+def calculate_blocking_stats_by_resolver(
+    query_store: Union[QueryStore, ColumnarQueryStore]
+) -> Dict[str, BlockingStats]:
+    """
+    Calculates overall blocking statistics for every resolver in the store.
+    For a ColumnarQueryStore with NumPy installed, all status counts come from a single bincount.
+    """
+    if np is None or not isinstance(query_store, ColumnarQueryStore) or len(query_store) == 0:
+        return {
+            resolver_url: calculate_overall_blocking_percentage(query_store.get_results(resolver_url=resolver_url))
+            for resolver_url in query_store.get_all_resolvers()
+        }
+
+    resolver_ids, _, status_codes = _columnar_arrays(query_store)
+    status_count = len(STATUS_CODES)
+    resolver_count = len(query_store.resolvers)
+    counts = np.bincount(resolver_ids * status_count + status_codes,
+                         minlength=resolver_count * status_count).reshape(resolver_count, status_count)
+
+    stats_by_resolver: Dict[str, BlockingStats] = {}
+    for resolver_id, resolver_url in enumerate(query_store.resolvers.values):
+        stats_by_resolver[resolver_url] = build_blocking_stats(
+            resolved_count=int(counts[resolver_id, STATUS_CODES.index('Resolved')]),
+            blocked_count=int(counts[resolver_id, STATUS_CODES.index('Blocked')]),
+            error_count=int(counts[resolver_id, STATUS_CODES.index('Error')]),
+            skipped_count=int(counts[resolver_id, STATUS_CODES.index('Skipped')])
         )
-    return categorized_stats
+    return stats_by_resolver
+
+
+def calculate_categorized_blocking_by_resolver(
+    query_store: Union[QueryStore, ColumnarQueryStore], categories: List[DomainCategory]
+) -> Dict[str, List[CategorizedBlockingStats]]:
+    """
+    Calculates per-category blocking statistics for every resolver in the store.
+    For a ColumnarQueryStore with NumPy installed, all counts come from a single bincount
+    over (resolver, category, status).
+    """
+    if np is None or not isinstance(query_store, ColumnarQueryStore) or len(query_store) == 0:
+        return {
+            resolver_url: calculate_categorized_blocking_percentages(
+                query_store.get_results(resolver_url=resolver_url), categories)
+            for resolver_url in query_store.get_all_resolvers()
+        }
+
+    resolver_ids, category_ids, status_codes = _columnar_arrays(query_store)
+    status_count = len(STATUS_CODES)
+    category_count = len(query_store.categories)
+    resolver_count = len(query_store.resolvers)
+    counts = np.bincount((resolver_ids * category_count + category_ids) * status_count + status_codes,
+                         minlength=resolver_count * category_count * status_count
+                         ).reshape(resolver_count, category_count, status_count)
+
+    stats_by_resolver: Dict[str, List[CategorizedBlockingStats]] = {}
+    for resolver_id, resolver_url in enumerate(query_store.resolvers.values):
+        categorized_stats: List[CategorizedBlockingStats] = []
+        for category in categories:
+            category_id = query_store.categories.lookup(category)
+            resolved_in_category = int(counts[resolver_id, category_id, STATUS_CODES.index('Resolved')]) \
+                if category_id is not None else 0
+            blocked_in_category = int(counts[resolver_id, category_id, STATUS_CODES.index('Blocked')]) \
+                if category_id is not None else 0
+            categorized_stats.append(
+                build_categorized_blocking_stats(category, resolved_in_category, blocked_in_category)
+            )
+        stats_by_resolver[resolver_url] = categorized_stats
+    return stats_by_resolver
 
 
 def get_blocked_useful_domains(query_results: List[QueryResult]) -> List[str]:
@@ -0,0 +1,236 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+# Add project root to path for imports when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_doh_server import MockDohConfig, MockDohServer, create_server_ssl_context, parse_latency_distribution
+from config.settings import ALL_DOH_FORMATS
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak memory is then not reported
+    resource = None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024  # Bytes on macOS, KiB elsewhere
+
+
+def _run_mock_server(config: MockDohConfig, certfile: Optional[str], keyfile: Optional[str], port_queue):
+    """Server process entry point, so its CPU time is not counted against the client."""
+    async def serve():
+        server = MockDohServer(config)
+        ssl_context = create_server_ssl_context(certfile, keyfile) if certfile else None
+        await server.start('127.0.0.1', 0, ssl_context)
+        port_queue.put(server.port)
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+def _run_level(analysis_argv: List[str], ca_file: Optional[str], result_queue):
+    """
+    Client process entry point: runs one full analysis against the mock server and reports its
+    wall time, CPU time and peak RSS. Each level runs in a fresh process so the peaks are its own.
+    """
+    if ca_file:
+        os.environ['SSL_CERT_FILE'] = ca_file  # Trust the mock server's self-signed certificate
+    from cli.cli_parser import parse_arguments
+    from cli.main import run_analysis
+
+    args = parse_arguments(analysis_argv)
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        asyncio.run(run_analysis(args))
+    result_queue.put({
+        'wall_seconds': time.perf_counter() - start_wall,
+        'cpu_seconds': time.process_time() - start_cpu,
+        'peak_rss_mb': _peak_rss_mb(),
+    })
+
+
+def _wait_for_measurement(client_process, result_queue, concurrency: int) -> Dict:
+    """
+    Waits for the client process's measurement, checking that the process is still alive in between,
+    so a level whose analysis crashed is reported instead of blocking the benchmark forever.
+    """
+    while True:
+        try:
+            return result_queue.get(timeout=1.0)
+        except queue.Empty:
+            if not client_process.is_alive():
+                # The measurement may have been put just before the process exited
+                try:
+                    return result_queue.get_nowait()
+                except queue.Empty:
+                    raise RuntimeError(f"the analysis at concurrency {concurrency} exited with code "
+                                       f"{client_process.exitcode} without reporting a measurement")
+
+
+def run_benchmark(concurrency_levels: List[int],
+                  domain_count: int,
+                  resolver_count: int,
+                  doh_format: str,
+                  mock_config: MockDohConfig,
+                  http2: bool = False,
+                  certfile: Optional[str] = None,
+                  keyfile: Optional[str] = None,
+                  extra_analysis_args: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Runs `run_analysis` against a local mock DoH server once per concurrency level and returns
+    one result per level: completed queries, queries/sec, CPU milliseconds per query and peak RSS.
+    Raises RuntimeError naming the concurrency level whose analysis process failed.
+    HTTP/2 needs TLS, so `http2` requires a certificate and key for the mock server.
+    """
+    context = multiprocessing.get_context('spawn')
+    port_queue = context.Queue()
+    server_process = context.Process(target=_run_mock_server, args=(mock_config, certfile, keyfile, port_queue),
+                                     daemon=True)
+    server_process.start()
+    results = []
+    try:
+        port = port_queue.get(timeout=30)
+        scheme = 'https' if certfile else 'http'
+        host = 'localhost' if certfile else '127.0.0.1'  # The certificate is expected to be issued for localhost
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            resolvers_path = os.path.join(work_dir, 'resolvers.txt')
+            with open(resolvers_path, 'w', encoding='utf-8') as f:
+                for resolver_index in range(resolver_count):
+                    f.write(f"{scheme}://{host}:{port}/dns-query/{resolver_index} {doh_format}\n")
+            domains_path = os.path.join(work_dir, 'domains.txt')
+            with open(domains_path, 'w', encoding='utf-8') as f:
+                for domain_index in range(domain_count):
+                    f.write(f"bench-{domain_index:07d}.example\n")
+            summary_path = os.path.join(work_dir, 'summary.json')
+
+            for concurrency in concurrency_levels:
+                analysis_argv = [
+                    '--resolvers', resolvers_path,
+                    '--domains', domains_path,
+                    '--max-domains', str(domain_count),
+                    '--concurrency', str(concurrency),
+                    '--summary', summary_path,
+                    '--sink', f"jsonl:{os.devnull}",  # Stream results without keeping them for an Excel report
+                ] + (['--http2'] if http2 else []) + (extra_analysis_args or [])
+                result_queue = context.Queue()
+                client_process = context.Process(target=_run_level, args=(analysis_argv, certfile, result_queue))
+                client_process.start()
+                measurement = _wait_for_measurement(client_process, result_queue, concurrency)
+                client_process.join()
+                with open(summary_path, 'r', encoding='utf-8') as f:
+                    summary = json.load(f)
+                queries = summary['total_queries']
+                errors = sum(resolver['blocking']['error_queries'] for resolver in summary['resolvers'].values()
+                             if resolver['blocking'])
+                results.append({
+                    'concurrency': concurrency,
+                    'queries': queries,
+                    'errors': errors,
+                    'wall_seconds': measurement['wall_seconds'],
+                    'queries_per_second': queries / measurement['wall_seconds'] if measurement['wall_seconds'] else None,
+                    'cpu_ms_per_query': measurement['cpu_seconds'] * 1000 / queries if queries else None,
+                    'peak_rss_mb': measurement['peak_rss_mb'],
+                })
+                print(_format_row(results[-1]))
+    finally:
+        server_process.terminate()
+        server_process.join()
+    return results
+
+
+def _format_row(result: Dict) -> str:
+    peak_rss = f"{result['peak_rss_mb']:.1f}" if result['peak_rss_mb'] is not None else "N/A"
+    return (f"{result['concurrency']:>11} {result['queries']:>9} {result['errors']:>7} "
+            f"{result['wall_seconds']:>9.2f} {result['queries_per_second']:>10.1f} "
+            f"{result['cpu_ms_per_query']:>11.3f} {peak_rss:>13}")
+
+
+def _parse_levels(value: str) -> List[int]:
+    try:
+        levels = [int(level) for level in value.split(',') if level.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid concurrency levels '{value}'")
+    if not levels or min(levels) < 1:
+        raise argparse.ArgumentTypeError(f"invalid concurrency levels '{value}'")
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="End-to-end throughput benchmark: runs the analyzer against a local mock DoH server."
+    )
+    parser.add_argument("--concurrency-levels", type=_parse_levels, default=[10, 50, 200],
+                        help="Comma-separated --concurrency values to measure. Default: 10,50,200")
+    parser.add_argument("--domains", type=int, default=2000, help="Domains per run (built-in list included).")
+    parser.add_argument("--resolvers", type=int, default=2, help="Mock resolver endpoints per run.")
+    parser.add_argument("--doh-format", choices=ALL_DOH_FORMATS, default='wire-post')
+    parser.add_argument("--latency", default='lognormal:5:0.5', help="Mock server latency distribution.")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--nxdomain-rate", type=float, default=0.05)
+    parser.add_argument("--sinkhole-rate", type=float, default=0.05)
+    parser.add_argument("--http2", action="store_true", help="Use HTTP/2; requires --certfile and --keyfile.")
+    parser.add_argument("--certfile", default=None,
+                        help="Self-signed certificate for 'localhost' served by the mock server; the client trusts it.")
+    parser.add_argument("--keyfile", default=None)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this path.")
+    args, extra_analysis_args = parser.parse_known_args()
+    if args.http2 and not (args.certfile and args.keyfile):
+        parser.error("--http2 requires --certfile and --keyfile (HTTP/2 is only negotiated over TLS)")
+    try:
+        parse_latency_distribution(args.latency)
+    except ValueError as e:
+        parser.error(str(e))
+
+    mock_config = MockDohConfig(
+        nxdomain_rate=args.nxdomain_rate,
+        sinkhole_rate=args.sinkhole_rate,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    )
+    print(f"{args.domains} domains x {args.resolvers} resolvers ({args.doh_format}"
+          f"{', HTTP/2' if args.http2 else ''}), mock latency {args.latency}")
+    print(f"{'Concurrency':>11} {'Queries':>9} {'Errors':>7} {'Wall (s)':>9} {'Queries/s':>10} "
+          f"{'CPU ms/query':>11} {'Peak RSS (MB)':>13}")
+    try:
+        results = run_benchmark(
+            concurrency_levels=args.concurrency_levels,
+            domain_count=args.domains,
+            resolver_count=args.resolvers,
+            doh_format=args.doh_format,
+            mock_config=mock_config,
+            http2=args.http2,
+            certfile=args.certfile,
+            keyfile=args.keyfile,
+            extra_analysis_args=extra_analysis_args
+        )
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'parameters': {key: value for key, value in vars(args).items() if key != 'output'},
+                       'results': results}, f, indent=2)
+        print(f"Results saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+import argparse
+import contextlib
+import gc
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# Add project root to path for imports when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_data import (
+    iter_synthetic_results,
+    iter_synthetic_doh_json,
+    iter_synthetic_doh_wire,
+    synthetic_domain,
+    synthetic_resolver_urls
+)
+from analysis import statistics_analyzer
+from analysis.blocking_detector import detect_blocking
+from analysis.statistics_aggregator import StatisticsAggregator
+from config.blocking_ips import load_blocking_ip_ranges
+from config.settings import ALL_DOMAIN_CATEGORIES
+from data.columnar_store import ColumnarQueryStore
+from data.models import DnsResolver
+from data.query_store import QueryStore
+from dns_client.doh_client import DohClient
+from utils.excel_generator import ExcelGenerator
+from utils.ip_utils import BlockingIpMatcher
+from utils.metrics_exporter import ProbeMetrics
+
+_DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'micro_benchmarks.json')
+_CHUNK_ROWS = 100_000  # Streaming benchmarks generate their input in chunks of this many rows
+_RESOLVER_COUNT = 8
+_IN_MEMORY_MAX_ROWS = 1_000_000  # Benchmarks that hold every result as a QueryResult object
+
+
+@dataclass
+class MicroBenchmark:
+    name: str
+    run: Callable[[int, int], float]  # (rows, seed) -> seconds spent in the measured code
+    max_rows: Optional[int] = None  # Larger sizes are skipped, e.g. when the input would not fit in memory
+
+
+@contextlib.contextmanager
+def _measured(elapsed: List[float]):
+    """Adds the wall time of the block to elapsed[0], with garbage collection paused as in timeit."""
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed[0] += time.perf_counter() - start
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _chunks(items: Iterable, size: int = _CHUNK_ROWS) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _bench_parse_doh_json(rows: int, seed: int) -> float:
+    client = DohClient()
+    elapsed = [0.0]
+    for chunk in _chunks(iter_synthetic_doh_json(rows, seed)):
+        with _measured(elapsed):
+            for response_json in chunk:
+                client._parse_doh_response(response_json)
+    return elapsed[0]
+
+
+def _bench_parse_doh_wire(rows: int, seed: int) -> float:
+    client = DohClient()
+    elapsed = [0.0]
+    for chunk in _chunks(iter_synthetic_doh_wire(rows, seed)):
+        with _measured(elapsed):
+            for message in chunk:
+                client._parse_wire_response(message)
+    return elapsed[0]
+
+
+def _bench_detect_blocking(rows: int, seed: int) -> float:
+    blocking_matcher = BlockingIpMatcher(load_blocking_ip_ranges())
+    elapsed = [0.0]
+    for chunk in _chunks(iter_synthetic_results(rows, seed, _RESOLVER_COUNT, classified=False)):
+        with _measured(elapsed):
+            for raw_result in chunk:
+                detect_blocking(raw_result, blocking_matcher)
+    return elapsed[0]
+
+
+def _bench_statistics_aggregator(rows: int, seed: int) -> float:
+    aggregator = StatisticsAggregator(ALL_DOMAIN_CATEGORIES)
+    elapsed = [0.0]
+    for chunk in _chunks(iter_synthetic_results(rows, seed, _RESOLVER_COUNT)):
+        with _measured(elapsed):
+            for result in chunk:
+                aggregator.add(result)
+    with _measured(elapsed):
+        aggregator.performance_stats_by_resolver()
+        aggregator.blocking_stats_by_resolver()
+        aggregator.categorized_blocking_stats_by_resolver()
+    return elapsed[0]
+
+
+def _bench_probe_metrics(rows: int, seed: int) -> float:
+    metrics = ProbeMetrics(ALL_DOMAIN_CATEGORIES)
+    elapsed = [0.0]
+    for chunk in _chunks(iter_synthetic_results(rows, seed, _RESOLVER_COUNT)):
+        with _measured(elapsed):
+            for result in chunk:
+                metrics.observe(result)
+    with _measured(elapsed):
+        metrics.render()
+    return elapsed[0]
+
+
+def _filled_store(store, rows: int, seed: int):
+    for result in iter_synthetic_results(rows, seed, _RESOLVER_COUNT):
+        store.add_result(result)
+    return store
+
+
+def _bench_query_store_get_results(rows: int, seed: int) -> float:
+    """Every resolver x domain lookup of the DNS Matrix sheet, plus the per-resolver lookups of the statistics."""
+    query_store = _filled_store(QueryStore(), rows, seed)
+    resolver_urls = synthetic_resolver_urls(_RESOLVER_COUNT)
+    domain_names = [synthetic_domain(domain_index).name for domain_index in range(-(-rows // _RESOLVER_COUNT))]
+    elapsed = [0.0]
+    with _measured(elapsed):
+        for resolver_url in resolver_urls:
+            query_store.get_results(resolver_url=resolver_url)
+            query_store.get_results(resolver_url=resolver_url, status='Blocked', domain_category='Useful')
+            for domain_name in domain_names:
+                query_store.get_results(resolver_url=resolver_url, domain_name=domain_name)
+    return elapsed[0]
+
+
+def _run_statistics_analyzer(query_store) -> None:
+    statistics_analyzer.calculate_performance_stats_by_resolver(query_store)
+    statistics_analyzer.calculate_blocking_stats_by_resolver(query_store)
+    statistics_analyzer.calculate_categorized_blocking_by_resolver(query_store, ALL_DOMAIN_CATEGORIES)
+
+
+def _bench_statistics_analyzer_memory(rows: int, seed: int) -> float:
+    query_store = _filled_store(QueryStore(), rows, seed)
+    elapsed = [0.0]
+    with _measured(elapsed):
+        _run_statistics_analyzer(query_store)
+    return elapsed[0]
+
+
+def _bench_statistics_analyzer_columnar(rows: int, seed: int) -> float:
+    query_store = _filled_store(ColumnarQueryStore(), rows, seed)
+    elapsed = [0.0]
+    with _measured(elapsed):
+        _run_statistics_analyzer(query_store)
+    return elapsed[0]
+
+
+def _bench_excel_report(rows: int, seed: int) -> float:
+    query_store = QueryStore()
+    aggregator = StatisticsAggregator(ALL_DOMAIN_CATEGORIES)
+    for result in iter_synthetic_results(rows, seed, _RESOLVER_COUNT):
+        query_store.add_result(result)
+        aggregator.add(result)
+    resolvers = [DnsResolver(url=url, name=url.split('//')[-1].split('/')[0]) for url in synthetic_resolver_urls(_RESOLVER_COUNT)]
+    domains = [synthetic_domain(domain_index) for domain_index in range(-(-rows // _RESOLVER_COUNT))]
+    report_statistics = dict(
+        performance_stats_by_resolver=aggregator.performance_stats_by_resolver(),
+        blocking_stats_by_resolver=aggregator.blocking_stats_by_resolver(),
+        categorized_blocking_stats_by_resolver=aggregator.categorized_blocking_stats_by_resolver(),
+        blocked_useful_domains_by_resolver=aggregator.blocked_useful_domains_by_resolver(),
+        blocked_useless_domains_by_resolver=aggregator.blocked_useless_domains_by_resolver(),
+        passed_useless_domains_by_resolver=aggregator.passed_useless_domains_by_resolver()
+    )
+    elapsed = [0.0]
+    with tempfile.TemporaryDirectory() as work_dir:
+        with _measured(elapsed), open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            excel_generator = ExcelGenerator(
+                output_filepath=os.path.join(work_dir, 'report.xlsx'),
+                all_domains=domains,
+                all_resolvers=resolvers,
+                query_store=query_store
+            )
+            excel_generator.generate_report(**report_statistics)
+    return elapsed[0]
+
+
+MICRO_BENCHMARKS: List[MicroBenchmark] = [
+    MicroBenchmark('parse_doh_json', _bench_parse_doh_json),
+    MicroBenchmark('parse_doh_wire', _bench_parse_doh_wire),
+    MicroBenchmark('detect_blocking', _bench_detect_blocking),
+    MicroBenchmark('statistics_aggregator', _bench_statistics_aggregator),
+    MicroBenchmark('probe_metrics', _bench_probe_metrics),
+    MicroBenchmark('query_store_get_results', _bench_query_store_get_results, max_rows=_IN_MEMORY_MAX_ROWS),
+    MicroBenchmark('statistics_analyzer_memory', _bench_statistics_analyzer_memory, max_rows=_IN_MEMORY_MAX_ROWS),
+    MicroBenchmark('statistics_analyzer_columnar', _bench_statistics_analyzer_columnar),
+    MicroBenchmark('excel_report', _bench_excel_report, max_rows=_IN_MEMORY_MAX_ROWS),
+]
+
+
+def _environment() -> Dict[str, str]:
+    return {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+            'machine': platform.machine(), 'system': platform.system(),
+            'numpy': 'yes' if statistics_analyzer.np is not None else 'no'}
+
+
+def load_baseline(path: str) -> Dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'environment': None, 'results': {}}
+
+
+def save_baseline(path: str, seed: int, measurements: Dict[str, float]):
+    """Stores the measurements under their 'name@rows' keys, keeping baseline entries that were not re-measured."""
+    baseline = load_baseline(path)
+    baseline['environment'] = _environment()
+    baseline['seed'] = seed
+    baseline['results'].update({key: {'seconds': seconds} for key, seconds in measurements.items()})
+    baseline['results'] = dict(sorted(baseline['results'].items()))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2)
+        f.write('\n')
+    print(f"Baseline saved to '{path}'")
+
+
+def _parse_size(value: str) -> int:
+    value = value.strip().lower()
+    multiplier = 1
+    if value.endswith('k'):
+        multiplier, value = 1_000, value[:-1]
+    elif value.endswith('m'):
+        multiplier, value = 1_000_000, value[:-1]
+    try:
+        size = int(float(value) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size '{value}'")
+    if size < 1:
+        raise argparse.ArgumentTypeError(f"invalid size '{value}'")
+    return size
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmarks of the parsing, classification, storage, statistics and reporting hot paths "
+                    "on fixed-seed synthetic results."
+    )
+    parser.add_argument("--sizes", default='10k', type=lambda value: [_parse_size(size) for size in value.split(',')],
+                        help="Comma-separated row counts, e.g. 10k,1m,10m. Default: 10k")
+    parser.add_argument("--only", default=None, help="Comma-separated benchmark names to run. Default: all")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark and size; the fastest counts. Default: 5")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=_DEFAULT_BASELINE_PATH,
+                        help="Baseline JSON to compare against (and to update with --save-baseline).")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run's timings in --baseline.")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Flag a regression when a benchmark is this much slower than its baseline. Default: 0.25")
+    args = parser.parse_args()
+
+    benchmarks = MICRO_BENCHMARKS
+    if args.only:
+        names = set(args.only.split(','))
+        unknown_names = names - {benchmark.name for benchmark in MICRO_BENCHMARKS}
+        if unknown_names:
+            parser.error(f"unknown benchmarks: {', '.join(sorted(unknown_names))}")
+        benchmarks = [benchmark for benchmark in MICRO_BENCHMARKS if benchmark.name in names]
+
+    baseline = load_baseline(args.baseline)
+    if baseline['environment'] and baseline['environment'] != _environment():
+        print(f"Warning: The baseline was recorded on {baseline['environment']}, this is {_environment()}; "
+              f"comparisons across environments are only indicative.")
+
+    measurements: Dict[str, float] = {}
+    regressions: List[str] = []
+    print(f"{'Benchmark':<30} {'Rows':>10} {'Seconds':>10} {'ns/row':>10} {'Baseline':>10} {'Change':>8}")
+    for rows in args.sizes:
+        for benchmark in benchmarks:
+            if benchmark.max_rows is not None and rows > benchmark.max_rows:
+                print(f"{benchmark.name:<30} {rows:>10} {'skipped (over ' + str(benchmark.max_rows) + ' rows)':>50}")
+                continue
+            key = f"{benchmark.name}@{rows}"
+            seconds = min(benchmark.run(rows, args.seed) for _ in range(max(1, args.repeat)))
+            measurements[key] = seconds
+            baseline_entry = baseline['results'].get(key)
+            change = ''
+            if baseline_entry:
+                ratio = seconds / baseline_entry['seconds'] - 1
+                change = f"{ratio:+.1%}"
+                if ratio > args.threshold:
+                    change += ' REGRESSION'
+                    regressions.append(key)
+            baseline_seconds = f"{baseline_entry['seconds']:.4f}" if baseline_entry else '-'
+            print(f"{benchmark.name:<30} {rows:>10} {seconds:>10.4f} {seconds * 1e9 / rows:>10.0f} "
+                  f"{baseline_seconds:>10} {change:>8}")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, args.seed, measurements)
+    if regressions:
+        print(f"{len(regressions)} regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,422 @@
+import argparse
+import asyncio
+import base64
+import json
+import random
+import ssl
+import struct
+import time
+import zlib
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit, parse_qs
+import h2.config
+import h2.connection
+import h2.events
+import h2.exceptions
+
+_HEADER = struct.Struct('!HHHHHH')
+_ANSWER_A = struct.Struct('!HHHIH')  # Name pointer, TYPE, CLASS, TTL, RDLENGTH
+_NAME_POINTER = 0xC00C  # The question name always starts right after the header
+_QTYPE_A = 1
+_RCODE_NOERROR = 0
+_RCODE_SERVFAIL = 2
+_RCODE_NXDOMAIN = 3
+_UNANSWERED_HOLD_SECONDS = 3600.0  # Requests picked to time out are held open this long
+_HTTP2_PREFACE_LINE = b'PRI * HTTP/2.0'
+
+# Status line, content type and body of an HTTP response, plus extra headers
+_Response = Tuple[int, str, bytes, List[Tuple[str, str]]]
+
+
+def parse_latency_distribution(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parses a latency distribution spec into a sampler returning milliseconds:
+    'fixed:MS', 'uniform:MIN_MS:MAX_MS', 'normal:MEAN_MS:STDDEV_MS', 'lognormal:MEDIAN_MS:SIGMA'
+    or 'exponential:MEAN_MS'. Raises ValueError for an unknown or malformed spec.
+    """
+    kind, _, parameters = spec.partition(':')
+    try:
+        values = [float(value) for value in parameters.split(':')] if parameters else []
+    except ValueError:
+        raise ValueError(f"invalid latency distribution '{spec}'")
+    if kind == 'fixed' and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'normal' and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == 'lognormal' and len(values) == 2 and values[0] > 0:
+        return lambda rng: values[0] * rng.lognormvariate(0.0, values[1])
+    if kind == 'exponential' and len(values) == 1 and values[0] > 0:
+        return lambda rng: rng.expovariate(1.0 / values[0])
+    raise ValueError(f"invalid latency distribution '{spec}': expected fixed:MS, uniform:MIN:MAX, "
+                     f"normal:MEAN:STDDEV, lognormal:MEDIAN:SIGMA or exponential:MEAN")
+
+
+def _domain_fraction(domain_name: str, salt: bytes) -> float:
+    """A stable value in [0, 1) for the domain, so rate-based behavior is the same on every run and process."""
+    return zlib.crc32(salt + domain_name.encode('utf-8')) / 2 ** 32
+
+
+@dataclass
+class MockDohConfig:
+    """
+    Behavior of the mock DoH server.
+    Domains without explicit answers resolve to a stable synthetic public address (93.184.x.y).
+    The *_domains sets and the nxdomain/sinkhole rates (a stable fraction of the remaining domains)
+    decide the answer per domain; the fault rates are drawn independently for every request.
+    """
+    answers: Dict[str, List[str]] = field(default_factory=dict)
+    nxdomain_domains: Set[str] = field(default_factory=set)
+    sinkhole_domains: Set[str] = field(default_factory=set)
+    nxdomain_rate: float = 0.0
+    sinkhole_rate: float = 0.0
+    sinkhole_ip: str = '0.0.0.0'
+    ttl: int = 300
+    latency: str = 'fixed:0'  # See parse_latency_distribution
+    error_rate: float = 0.0  # HTTP 500
+    rate_limit_rate: float = 0.0  # HTTP 429 with Retry-After
+    max_qps: Optional[float] = None  # HTTP 429 with Retry-After once a path gets more requests per second
+    retry_after_seconds: int = 1
+    servfail_rate: float = 0.0
+    timeout_rate: float = 0.0  # The request is never answered
+    seed: Optional[int] = None
+
+
+class MockDohServer:
+    """
+    Local asyncio stand-in for a DoH resolver, for reproducible tests and benchmarks of DohClient.
+    Serves the application/dns-json dialect (GET ?name=) and RFC 8484 application/dns-message
+    (GET ?dns= and POST) on any path, over HTTP/1.1 with keep-alive or HTTP/2: negotiated via ALPN
+    when started with TLS, or with prior knowledge on plain TCP. Counters of what was served are
+    kept in `stats`.
+    """
+    def __init__(self, config: MockDohConfig):
+        self.config = config
+        self.stats: Counter = Counter()
+        self.port: Optional[int] = None
+        self._rng = random.Random(config.seed)
+        self._sample_latency_ms = parse_latency_distribution(config.latency)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+        self._recent_requests: Dict[str, Deque[float]] = {}  # Arrival times within the last second, per path
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0, ssl_context: Optional[ssl.SSLContext] = None):
+        """Starts listening; with port 0 a free port is picked and stored in `port`."""
+        self._server = await asyncio.start_server(self._handle_connection, host, port, ssl=ssl_context)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._server is None:
+            return
+        self._server.close()
+        for connection in list(self._connections):
+            connection.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    def _resolve(self, domain_name: str) -> Tuple[int, List[str]]:
+        """Returns the RCODE and IPv4 answers for a domain."""
+        domain_name = domain_name.rstrip('.').lower()
+        config = self.config
+        if domain_name in config.answers:
+            return _RCODE_NOERROR, config.answers[domain_name]
+        if domain_name in config.nxdomain_domains or _domain_fraction(domain_name, b'nx') < config.nxdomain_rate:
+            return _RCODE_NXDOMAIN, []
+        if domain_name in config.sinkhole_domains or _domain_fraction(domain_name, b'sink') < config.sinkhole_rate:
+            return _RCODE_NOERROR, [config.sinkhole_ip]
+        name_hash = zlib.crc32(domain_name.encode('utf-8'))
+        return _RCODE_NOERROR, [f"93.184.{(name_hash >> 8) & 0xFF}.{name_hash & 0xFF}"]
+
+    def _json_response(self, domain_name: str, rcode: int, ips: List[str]) -> bytes:
+        question_name = domain_name.rstrip('.') + '.'
+        return json.dumps({
+            'Status': rcode,
+            'TC': False, 'RD': True, 'RA': True, 'AD': False, 'CD': False,
+            'Question': [{'name': question_name, 'type': _QTYPE_A}],
+            'Answer': [{'name': question_name, 'type': _QTYPE_A, 'TTL': self.config.ttl, 'data': ip} for ip in ips],
+        }).encode('utf-8')
+
+    def _wire_response(self, query: bytes, servfail: bool) -> bytes:
+        """Answers a single-question wire-format query; raises ValueError for a malformed one."""
+        if len(query) < _HEADER.size:
+            raise ValueError("DNS query shorter than its header")
+        message_id, flags, qdcount, _, _, _ = _HEADER.unpack_from(query, 0)
+        if qdcount != 1:
+            raise ValueError("DNS query must have exactly one question")
+        labels = []
+        offset = _HEADER.size
+        while True:
+            if offset >= len(query):
+                raise ValueError("Truncated DNS question")
+            length = query[offset]
+            if length == 0:
+                offset += 1
+                break
+            labels.append(query[offset + 1:offset + 1 + length].decode('ascii', errors='replace'))
+            offset += length + 1
+        if offset + 4 > len(query):
+            raise ValueError("Truncated DNS question")
+        qtype = struct.unpack_from('!H', query, offset)[0]
+        question = query[_HEADER.size:offset + 4]
+
+        if servfail:
+            rcode, ips = _RCODE_SERVFAIL, []
+        else:
+            rcode, ips = self._resolve('.'.join(labels))
+        if qtype != _QTYPE_A:
+            ips = []
+        self.stats['nxdomain' if rcode == _RCODE_NXDOMAIN else 'servfail' if servfail else 'answered'] += 1
+        response_flags = 0x8000 | (flags & 0x0100) | 0x0080 | rcode  # QR, RD copied from the query, RA
+        parts = [_HEADER.pack(message_id, response_flags, 1, len(ips), 0, 0), question]
+        for ip in ips:
+            parts.append(_ANSWER_A.pack(_NAME_POINTER, _QTYPE_A, 1, self.config.ttl, 4))
+            parts.append(bytes(int(octet) for octet in ip.split('.')))
+        return b''.join(parts)
+
+    def _over_rate_limit(self, path: str) -> bool:
+        """Counts a request to `path` and tells whether the path got more than max_qps in the last second."""
+        now = time.monotonic()
+        arrivals = self._recent_requests.setdefault(path, deque())
+        while arrivals and now - arrivals[0] >= 1.0:
+            arrivals.popleft()
+        arrivals.append(now)
+        return len(arrivals) > self.config.max_qps
+
+    async def _respond(self, method: str, target: str, body: bytes) -> Optional[_Response]:
+        """Builds the response to one DoH request after the sampled latency; None means it is never answered."""
+        self.stats['requests'] += 1
+        config = self.config
+        if config.max_qps is not None and self._over_rate_limit(urlsplit(target).path):
+            self.stats['http_429'] += 1
+            return 429, 'text/plain', b'rate limited', [('retry-after', str(config.retry_after_seconds))]
+        fault_draw = self._rng.random()
+        delay_ms = self._sample_latency_ms(self._rng)
+        if fault_draw < config.timeout_rate:
+            self.stats['unanswered'] += 1
+            return None
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        fault_draw -= config.timeout_rate
+        if fault_draw < config.error_rate:
+            self.stats['http_500'] += 1
+            return 500, 'text/plain', b'mock server error', []
+        fault_draw -= config.error_rate
+        if fault_draw < config.rate_limit_rate:
+            self.stats['http_429'] += 1
+            return 429, 'text/plain', b'rate limited', [('retry-after', str(config.retry_after_seconds))]
+        servfail = fault_draw - config.rate_limit_rate < config.servfail_rate
+
+        query_parameters = parse_qs(urlsplit(target).query)
+        try:
+            if method == 'POST' or 'dns' in query_parameters:
+                if method == 'POST':
+                    query = body
+                else:
+                    encoded_query = query_parameters['dns'][0]
+                    query = base64.urlsafe_b64decode(encoded_query + '=' * (-len(encoded_query) % 4))
+                self.stats['wire'] += 1
+                return 200, 'application/dns-message', self._wire_response(query, servfail), []
+            if 'name' in query_parameters:
+                domain_name = query_parameters['name'][0]
+                if servfail:
+                    rcode, ips = _RCODE_SERVFAIL, []
+                else:
+                    rcode, ips = self._resolve(domain_name)
+                self.stats['json'] += 1
+                self.stats['nxdomain' if rcode == _RCODE_NXDOMAIN else 'servfail' if servfail else 'answered'] += 1
+                return 200, 'application/dns-json', self._json_response(domain_name, rcode, ips), []
+        except ValueError:  # Includes malformed base64 (binascii.Error)
+            pass
+        self.stats['http_400'] += 1
+        return 400, 'text/plain', b'bad DoH request', []
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(asyncio.current_task())
+        try:
+            ssl_object = writer.get_extra_info('ssl_object')
+            if ssl_object is not None and ssl_object.selected_alpn_protocol() == 'h2':
+                await self._serve_http2(reader, writer, b'')
+            else:
+                first_line = await reader.readline()
+                if first_line.startswith(_HTTP2_PREFACE_LINE):
+                    await self._serve_http2(reader, writer, first_line)
+                else:
+                    await self._serve_http1(reader, writer, first_line)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, h2.exceptions.ProtocolError):
+            pass
+        except asyncio.CancelledError:
+            pass  # Closed by close(); returning normally keeps asyncio from logging the cancelled connection
+        finally:
+            writer.close()
+            self._connections.discard(asyncio.current_task())
+
+    async def _serve_http1(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request_line: bytes):
+        while request_line:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            headers: Dict[str, str] = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            content_length = int(headers.get('content-length') or 0)
+            body = await reader.readexactly(content_length) if content_length else b''
+
+            response = await self._respond(method, target, body)
+            if response is None:
+                await asyncio.sleep(_UNANSWERED_HOLD_SECONDS)
+                return
+            status, content_type, response_body, extra_headers = response
+            header_lines = [f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}",
+                            f"Content-Type: {content_type}",
+                            f"Content-Length: {len(response_body)}"]
+            header_lines.extend(f"{name}: {value}" for name, value in extra_headers)
+            writer.write(('\r\n'.join(header_lines) + '\r\n\r\n').encode('latin-1') + response_body)
+            await writer.drain()
+            if headers.get('connection', '').lower() == 'close':
+                return
+            request_line = await reader.readline()
+
+    async def _serve_http2(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, received: bytes):
+        connection = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False, header_encoding='utf-8')
+        )
+        connection.initiate_connection()
+        writer.write(connection.data_to_send())
+        requests: Dict[int, Tuple[Dict[str, str], bytearray]] = {}  # Stream ID -> headers and body received so far
+        responders: Set[asyncio.Task] = set()
+
+        async def respond(stream_id: int, request_headers: Dict[str, str], body: bytes):
+            response = await self._respond(request_headers.get(':method', 'GET'), request_headers.get(':path', '/'), body)
+            if response is None:
+                return  # The stream stays open until the client gives up on it
+            status, content_type, response_body, extra_headers = response
+            try:
+                connection.send_headers(stream_id, [(':status', str(status)), ('content-type', content_type),
+                                                    ('content-length', str(len(response_body)))] + extra_headers)
+                connection.send_data(stream_id, response_body, end_stream=True)
+            except (h2.exceptions.StreamClosedError, h2.exceptions.ProtocolError):
+                return  # The client reset the stream meanwhile
+            writer.write(connection.data_to_send())
+
+        try:
+            while True:
+                if received:
+                    for event in connection.receive_data(received):
+                        if isinstance(event, h2.events.RequestReceived):
+                            requests[event.stream_id] = (dict(event.headers), bytearray())
+                        elif isinstance(event, h2.events.DataReceived):
+                            if event.stream_id in requests:
+                                requests[event.stream_id][1].extend(event.data)
+                            connection.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                        elif isinstance(event, h2.events.StreamEnded):
+                            if event.stream_id in requests:
+                                request_headers, body = requests.pop(event.stream_id)
+                                responder = asyncio.create_task(respond(event.stream_id, request_headers, bytes(body)))
+                                responders.add(responder)
+                                responder.add_done_callback(responders.discard)
+                        elif isinstance(event, h2.events.StreamReset):
+                            requests.pop(event.stream_id, None)
+                        elif isinstance(event, h2.events.ConnectionTerminated):
+                            return
+                    writer.write(connection.data_to_send())
+                    await writer.drain()
+                received = await reader.read(65536)
+                if not received:
+                    return
+        finally:
+            for responder in responders:
+                responder.cancel()
+
+
+def _split_domains(value: Optional[str]) -> Set[str]:
+    return {domain.strip().lower() for domain in (value or '').split(',') if domain.strip()}
+
+
+def _parse_server_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Local mock DoH server for tests and benchmarks.")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=8053)
+    parser.add_argument("--certfile", default=None, help="TLS certificate; enables HTTPS with HTTP/2 via ALPN.")
+    parser.add_argument("--keyfile", default=None, help="TLS private key for --certfile.")
+    parser.add_argument("--answers", default=None,
+                        help="JSON file mapping domain names to lists of IPv4 answers.")
+    parser.add_argument("--nxdomain", default=None, help="Comma-separated domains answered with NXDOMAIN.")
+    parser.add_argument("--sinkhole", default=None, help="Comma-separated domains answered with --sinkhole-ip.")
+    parser.add_argument("--nxdomain-rate", type=float, default=0.0,
+                        help="Stable fraction of the other domains answered with NXDOMAIN.")
+    parser.add_argument("--sinkhole-rate", type=float, default=0.0,
+                        help="Stable fraction of the other domains answered with --sinkhole-ip.")
+    parser.add_argument("--sinkhole-ip", default='0.0.0.0')
+    parser.add_argument("--latency", default='fixed:0',
+                        help="Response latency: fixed:MS, uniform:MIN:MAX, normal:MEAN:STDDEV, "
+                             "lognormal:MEDIAN:SIGMA or exponential:MEAN (milliseconds).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with HTTP 429 and Retry-After.")
+    parser.add_argument("--max-qps", type=float, default=None,
+                        help="Answer HTTP 429 and Retry-After while a path gets more requests per second than this.")
+    parser.add_argument("--servfail-rate", type=float, default=0.0, help="Fraction of queries answered with SERVFAIL.")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests never answered.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latency and fault draws.")
+    args = parser.parse_args()
+    try:
+        parse_latency_distribution(args.latency)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+
+def create_server_ssl_context(certfile: str, keyfile: str) -> ssl.SSLContext:
+    """TLS context offering HTTP/2 and HTTP/1.1 via ALPN."""
+    ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    ssl_context.load_cert_chain(certfile, keyfile)
+    ssl_context.set_alpn_protocols(['h2', 'http/1.1'])
+    return ssl_context
+
+
+def load_mock_config(args: argparse.Namespace) -> MockDohConfig:
+    answers: Dict[str, List[str]] = {}
+    if args.answers:
+        with open(args.answers, 'r', encoding='utf-8') as f:
+            answers = {domain.lower(): list(ips) for domain, ips in json.load(f).items()}
+    return MockDohConfig(
+        answers=answers,
+        nxdomain_domains=_split_domains(args.nxdomain),
+        sinkhole_domains=_split_domains(args.sinkhole),
+        nxdomain_rate=args.nxdomain_rate,
+        sinkhole_rate=args.sinkhole_rate,
+        sinkhole_ip=args.sinkhole_ip,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        max_qps=args.max_qps,
+        servfail_rate=args.servfail_rate,
+        timeout_rate=args.timeout_rate,
+        seed=args.seed
+    )
+
+
+async def _serve(args: argparse.Namespace):
+    ssl_context = create_server_ssl_context(args.certfile, args.keyfile) if args.certfile else None
+    server = MockDohServer(load_mock_config(args))
+    await server.start(args.host, args.port, ssl_context)
+    scheme = 'https' if ssl_context else 'http'
+    print(f"Mock DoH server listening on {scheme}://{args.host}:{server.port}/dns-query")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+        print(f"Served: {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_serve(_parse_server_arguments()))
+    except KeyboardInterrupt:
+        pass
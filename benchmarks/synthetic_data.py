@@ -0,0 +1,115 @@
+import random
+import struct
+from typing import Any, Dict, Iterator, List
+from config.settings import ALL_DOMAIN_CATEGORIES
+from data.models import DomainConfig, QueryResult
+
+# Shares of raw results: the rest resolve to public addresses
+_SINKHOLE_SHARE = 0.06  # Resolved to a non-routable sinkhole address
+_EMPTY_ANSWER_SHARE = 0.03  # NXDOMAIN or no A records
+_ERROR_SHARE = 0.05
+_ERROR_TYPES = ['timeout', 'connection', 'rate_limited', 'http_status', 'invalid_response']
+_SINKHOLE_IPS = ['0.0.0.0', '127.0.0.1', '10.10.34.35']
+_HEADER = struct.Struct('!HHHHHH')
+_ANSWER_A = struct.Struct('!HHHIH')
+
+
+def synthetic_resolver_urls(resolver_count: int) -> List[str]:
+    return [f"https://resolver-{resolver_index}.example/dns-query" for resolver_index in range(resolver_count)]
+
+
+def synthetic_domain(domain_index: int) -> DomainConfig:
+    return DomainConfig(name=f"domain-{domain_index:08d}.example",
+                        category=ALL_DOMAIN_CATEGORIES[domain_index % len(ALL_DOMAIN_CATEGORIES)])
+
+
+def _public_ip(rng: random.Random) -> str:
+    return f"{rng.randint(1, 9) * 10 + 3}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+
+def _ip_to_int(ip: str) -> int:
+    a, b, c, d = (int(octet) for octet in ip.split('.'))
+    return (a << 24) | (b << 16) | (c << 8) | d
+
+
+def iter_synthetic_results(rows: int, seed: int, resolver_count: int = 8, classified: bool = True) -> Iterator[QueryResult]:
+    """
+    Yields `rows` QueryResults of a domain x resolver matrix, domain by domain, as a run would produce them.
+    The same seed always yields the same results. With `classified`, statuses are as after blocking
+    detection ('Resolved', 'Blocked', 'Error'); otherwise they are raw client results ('Resolved' or 'Error').
+    """
+    rng = random.Random(seed)
+    resolver_urls = synthetic_resolver_urls(resolver_count)
+    domain = synthetic_domain(0)
+    for row_index in range(rows):
+        domain_index, resolver_index = divmod(row_index, resolver_count)
+        if resolver_index == 0:
+            domain = synthetic_domain(domain_index)
+        draw = rng.random()
+        resolved_ips: List[str] = []
+        latency_ms = None
+        status = 'Resolved'
+        error_type = None
+        if draw < _ERROR_SHARE:
+            status = 'Error'
+            error_type = rng.choice(_ERROR_TYPES)
+        else:
+            latency_ms = 8.0 * rng.lognormvariate(1.0, 0.6)
+            if draw < _ERROR_SHARE + _EMPTY_ANSWER_SHARE:
+                status = 'Blocked' if classified else 'Resolved'
+            elif draw < _ERROR_SHARE + _EMPTY_ANSWER_SHARE + _SINKHOLE_SHARE:
+                resolved_ips = [rng.choice(_SINKHOLE_IPS)]
+                status = 'Blocked' if classified else 'Resolved'
+            else:
+                resolved_ips = [_public_ip(rng) for _ in range(rng.randint(1, 3))]
+        new_connection = rng.random() < 0.02
+        yield QueryResult(
+            domain=domain.name,
+            resolver_url=resolver_urls[resolver_index],
+            resolved_ips=resolved_ips,
+            latency_ms=latency_ms,
+            status=status,
+            domain_category=domain.category,
+            queue_wait_ms=rng.random() * 2.0,
+            connect_ms=rng.uniform(1.0, 10.0) if new_connection else None,
+            tls_ms=rng.uniform(5.0, 30.0) if new_connection else None,
+            ttfb_ms=latency_ms * 0.9 if latency_ms is not None else None,
+            error_type=error_type,
+            resolved_ip_ints=[_ip_to_int(ip) for ip in resolved_ips]
+        )
+
+
+def iter_synthetic_doh_json(rows: int, seed: int) -> Iterator[Dict[str, Any]]:
+    """Yields `rows` application/dns-json response bodies as parsed by response.json(), with CNAME chains and NXDOMAINs."""
+    rng = random.Random(seed)
+    for row_index in range(rows):
+        name = f"domain-{row_index:08d}.example."
+        draw = rng.random()
+        if draw < _EMPTY_ANSWER_SHARE:
+            yield {'Status': 3, 'TC': False, 'RD': True, 'RA': True, 'Question': [{'name': name, 'type': 1}]}
+            continue
+        answers = []
+        if draw < 0.3:
+            answers.append({'name': name, 'type': 5, 'TTL': 300, 'data': f"cdn-{row_index}.example."})
+        for _ in range(rng.randint(1, 4)):
+            answers.append({'name': name, 'type': 1, 'TTL': rng.randint(30, 3600), 'data': _public_ip(rng)})
+        yield {'Status': 0, 'TC': False, 'RD': True, 'RA': True, 'Question': [{'name': name, 'type': 1}],
+               'Answer': answers}
+
+
+def iter_synthetic_doh_wire(rows: int, seed: int) -> Iterator[bytes]:
+    """Yields `rows` RFC 8484 application/dns-message responses with one to four A records."""
+    rng = random.Random(seed)
+    for row_index in range(rows):
+        question = b''.join(bytes((len(label),)) + label
+                            for label in f"domain-{row_index:08d}.example".encode('ascii').split(b'.'))
+        question += b'\x00' + struct.pack('!HH', 1, 1)
+        if rng.random() < _EMPTY_ANSWER_SHARE:
+            yield _HEADER.pack(0, 0x8183, 1, 0, 0, 0) + question
+            continue
+        answer_count = rng.randint(1, 4)
+        parts = [_HEADER.pack(0, 0x8180, 1, answer_count, 0, 0), question]
+        for _ in range(answer_count):
+            parts.append(_ANSWER_A.pack(0xC00C, 1, 1, rng.randint(30, 3600), 4))
+            parts.append(_ip_to_int(_public_ip(rng)).to_bytes(4, 'big'))
+        yield b''.join(parts)
@@ -9,21 +9,49 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from cli.cli_parser_new import parse_arguments
 from config.blocking_ips import load_blocking_ip_ranges, load_custom_blocking_ips
-from config.domain_loader import load_domains
+from config.domain_loader import load_builtin_domains
+from config.domain_source import DomainSource
 from config.resolver_loader import load_resolvers
-from config.settings import ALL_DOMAIN_CATEGORIES
+from config.settings import (
+    ALL_DOMAIN_CATEGORIES,
+    PROGRESS_REPORT_INTERVAL,
+    DEFAULT_KEEPALIVE_EXPIRY_SECONDS,
+    MONITOR_WINDOWS_SECONDS
+)
+from cli.monitor_runner import run_monitor
+from cli.sharded_runner import ShardConfig, run_sharded_queries
+from cluster.coordinator import ClusterCoordinator
+from cluster.worker import run_worker
 from dns_client.doh_client import DohClient
+from dns_client.query_pipeline import iter_work_items, run_query_pipeline
+from dns_client.concurrency_controller import AdaptiveConcurrencyController
+from dns_client.rate_limiter import ResolverRateLimiter
+from dns_client.circuit_breaker import ResolverCircuitBreaker
+from dns_client.retry_policy import RetryPolicy
+from data.models import (
+    DnsResolver,
+    QueryResult,
+    PerformanceStats,
+    BlockingStats,
+    ConnectionStats
+)
 from data.query_store import QueryStore
+from data.columnar_store import ColumnarQueryStore
+from data.sqlite_store import SqliteQueryStore
 from analysis.blocking_detector import detect_blocking
+from analysis.statistics_aggregator import StatisticsAggregator
 from analysis.statistics_analyzer import (
-    calculate_performance_stats,
-    calculate_overall_blocking_percentage,
-    calculate_categorized_blocking_percentages,
-    get_blocked_useful_domains,
-    get_blocked_useless_domains,
-    get_passed_useless_domains
+    VECTORIZED_GROUPING_AVAILABLE,
+    calculate_performance_stats_by_resolver,
+    calculate_blocking_stats_by_resolver,
+    calculate_categorized_blocking_by_resolver
 )
+from analysis.rolling_statistics import RollingStatistics
 from utils.excel_generator import ExcelGenerator
+from utils.ip_utils import BlockingIpMatcher
+from utils.metrics_exporter import ProbeMetrics, MetricsServer
+from utils.result_sinks import ResultSink, create_result_sink
+from utils.summary_writer import write_summary
 
 async def run_analysis(args: ParsedArguments):
     """
@@ -33,9 +61,10 @@ async def run_analysis(args: ParsedArguments):
 
     # 1. Load configurations
     blocking_ip_ranges = load_blocking_ip_ranges()
-    custom_blocking_ips = []
+    custom_blocking_intervals = []
     if args.custom_blocking_ips_path:
-        custom_blocking_ips = load_custom_blocking_ips(args.custom_blocking_ips_path)
+        custom_blocking_intervals = load_custom_blocking_ips(args.custom_blocking_ips_path)
+    blocking_matcher = BlockingIpMatcher(blocking_ip_ranges, custom_blocking_intervals)
 
     initial_domains_from_req = [
         {"name": "rutube", "category": "Useful"}, # Original prompt did not include .ru
@@ -52,91 +81,339 @@ async def run_analysis(args: ParsedArguments):
         # Additional domains from context are already present in load_domains' explicit_domains
     ]
 
-    domain_configs: List[DomainConfig] = load_domains(
-        initial_domains_raw=initial_domains_from_req,
-        additional_domains_path=args.domain_list_path,
-        target_count=100
+    domain_source = DomainSource(
+        builtin_domains=load_builtin_domains(initial_domains_raw=initial_domains_from_req),
+        domains_path=args.domain_list_path,
+        max_domains=args.max_domains
     )
-    if not domain_configs:
+    if next(iter(domain_source), None) is None:
         print("Error: No domains loaded for analysis. Exiting.")
         return
 
-    resolver_configs: List[DnsResolver] = load_resolvers(args.resolver_list_path)
+    resolver_configs: List[DnsResolver] = load_resolvers(args.resolver_list_path, args.doh_format)
     if not resolver_configs:
         print("Error: No resolvers loaded for analysis. Exiting.")
         return
 
-    print(f"Loaded {len(domain_configs)} domains and {len(resolver_configs)} resolvers.")
+    print(f"Loaded {len(resolver_configs)} resolvers; domains are streamed from the built-in list"
+          f"{' and ' + repr(args.domain_list_path) if args.domain_list_path else ''}.")
 
-    # 2. Initialize client and store
-    doh_client = DohClient()
-    query_store = QueryStore()
+    # 2. Initialize sinks, client and store
+    result_sinks: List[ResultSink] = []
+    try:
+        for sink_format, sink_path in args.result_sinks:
+            result_sinks.append(create_result_sink(sink_format, sink_path))
+    except (ValueError, OSError) as e:
+        for sink in result_sinks:
+            sink.close()
+        print(f"Error: Could not open result sink: {e}")
+        return
+
+    keepalive_expiry_seconds = DEFAULT_KEEPALIVE_EXPIRY_SECONDS
+    if args.monitor:
+        # Keep pooled connections open through the pause between monitoring cycles
+        keepalive_expiry_seconds = max(keepalive_expiry_seconds, 2 * args.monitor_interval_seconds)
+    rate_limits_enabled = (args.max_qps is not None or args.learn_rate_limits
+                           or any(resolver.max_qps for resolver in resolver_configs))
+    rate_limiter = None
+    if rate_limits_enabled and args.workers == 1 and not args.coordinator_address:
+        rate_limiter = ResolverRateLimiter(default_max_qps=args.max_qps, learn=args.learn_rate_limits)
+    circuit_breaker = None
+    if args.circuit_breaker_failures and args.workers == 1 and not args.coordinator_address:
+        circuit_breaker = ResolverCircuitBreaker(args.circuit_breaker_failures,
+                                                 args.circuit_breaker_probe_interval_seconds)
+    doh_client = DohClient(
+        http2=args.http2,
+        max_connections_per_resolver=args.concurrency_limit,
+        keepalive_expiry_seconds=keepalive_expiry_seconds,
+        rate_limiter=rate_limiter,
+        circuit_breaker=circuit_breaker,
+        retry_policy=RetryPolicy(args.retries, args.retry_backoff_seconds) if args.retries else None,
+        dynamic_timeouts=args.dynamic_timeouts,
+        hedge_requests=args.hedge_requests
+    )
+    query_store = None  # Only the Excel report reads individual results back
+    sqlite_store = None
+    if args.db_path:
+        run_id = args.run_id or time.strftime('%Y%m%d-%H%M%S')
+        sqlite_store = SqliteQueryStore(args.db_path, run_id)
+        if len(sqlite_store) and not args.resume:
+            print(f"Error: Run '{run_id}' already has results in '{args.db_path}'. "
+                  f"Use --resume to continue it, or choose another --run-id.")
+            sqlite_store.close()
+            for sink in result_sinks:
+                sink.close()
+            return
+        print(f"Recording results to '{args.db_path}' as run '{run_id}'.")
+        query_store = sqlite_store
+    elif args.output_file:
+        query_store = ColumnarQueryStore() if args.result_store == 'columnar' else QueryStore()
+    statistics_aggregator = StatisticsAggregator(ALL_DOMAIN_CATEGORIES, track_domain_latency=args.rounds > 1)
     semaphore = asyncio.Semaphore(args.concurrency_limit)
+    concurrency_controller = None
+    if args.adaptive_concurrency and args.workers == 1 and not args.coordinator_address:
+        concurrency_controller = AdaptiveConcurrencyController(max_limit=doh_client.slots_per_resolver)
 
-    # 3. Prepare and execute queries
+    # 3. Execute queries and process results as they stream in
     print("Executing DNS queries. This may take a while...")
-    query_tasks = []
-    for domain_cfg in domain_configs:
-        for resolver_cfg in resolver_configs:
-            query_tasks.append(
-                doh_client.query(
-                    domain_name=domain_cfg.name,
-                    resolver=resolver_cfg,
+
+    recorded_results = 0
+    vantage_aggregators: Dict[str, StatisticsAggregator] = {}  # Per vantage point, in cluster mode
+    rolling_statistics = RollingStatistics(MONITOR_WINDOWS_SECONDS, ALL_DOMAIN_CATEGORIES) if args.monitor else None
+    probe_metrics = ProbeMetrics(ALL_DOMAIN_CATEGORIES) if args.metrics_address else None
+
+    def record_result(final_result: QueryResult):
+        nonlocal recorded_results
+        if query_store is not None:
+            query_store.add_result(final_result)
+        for sink in result_sinks:
+            sink.write(final_result)
+        if probe_metrics is not None:
+            probe_metrics.observe(final_result)
+        recorded_results += 1
+        if recorded_results % PROGRESS_REPORT_INTERVAL == 0:
+            print(f"  {recorded_results} queries completed...")
+
+    def handle_result(raw_result: QueryResult):
+        final_result = detect_blocking(raw_result, blocking_matcher)
+        statistics_aggregator.add(final_result)
+        if final_result.vantage_id is not None:
+            if final_result.vantage_id not in vantage_aggregators:
+                vantage_aggregators[final_result.vantage_id] = StatisticsAggregator(ALL_DOMAIN_CATEGORIES)
+            vantage_aggregators[final_result.vantage_id].add(final_result)
+        if rolling_statistics is not None:
+            rolling_statistics.add(final_result)
+        record_result(final_result)
+
+    def skip_recorded(work_items):
+        for work_item in work_items:
+            if not sqlite_store.has_result(work_item.resolver.url, work_item.domain.name, work_item.sample_round):
+                yield work_item
+
+    if args.resume:
+        # Stored results already went through blocking detection; replay them into the statistics and sinks
+        resumed_queries = 0
+        for stored_result in sqlite_store.iter_results():
+            if stored_result.status == 'Skipped':
+                continue  # Queried again by this run
+            statistics_aggregator.add(stored_result)
+            for sink in result_sinks:
+                sink.write(stored_result)
+            resumed_queries += 1
+        print(f"Resuming run '{sqlite_store.run_id}': {resumed_queries} queries already completed.")
+
+    start_query_time = time.perf_counter()
+    completed_queries = 0
+    connection_stats_by_resolver: Dict[str, ConnectionStats] = {}
+    metrics_server = None
+    try:
+        if probe_metrics is not None:
+            metrics_server = MetricsServer(probe_metrics)
+            await metrics_server.start(*args.metrics_address)
+        if args.workers > 1:
+            # Worker processes classify and aggregate their shards; results are only recorded here
+            print(f"Running {args.workers} worker processes...")
+            shard_config = ShardConfig(
+                domain_source=domain_source,
+                resolvers=resolver_configs,
+                blocking_matcher=blocking_matcher,
+                timeout_seconds=args.timeout_seconds,
+                concurrency_limit=max(1, args.concurrency_limit // args.workers),
+                http2=args.http2,
+                adaptive_concurrency=args.adaptive_concurrency,
+                max_qps=args.max_qps,
+                learn_rate_limits=args.learn_rate_limits,
+                circuit_breaker_failures=args.circuit_breaker_failures,
+                circuit_breaker_probe_interval_seconds=args.circuit_breaker_probe_interval_seconds,
+                retries=args.retries,
+                retry_backoff_seconds=args.retry_backoff_seconds,
+                dynamic_timeouts=args.dynamic_timeouts,
+                hedge_requests=args.hedge_requests,
+                rounds=args.rounds,
+                round_interval_seconds=args.round_interval_seconds,
+                resume_db_path=args.db_path if args.resume else None,
+                resume_run_id=sqlite_store.run_id if args.resume else None
+            )
+            completed_queries, shard_aggregator, connection_stats_by_resolver = await run_sharded_queries(
+                shard_config, args.workers, record_result
+            )
+            statistics_aggregator.merge(shard_aggregator)
+        elif args.coordinator_address:
+            # Workers only run the queries; classification and statistics happen here as results arrive
+            coordinator = ClusterCoordinator(
+                vantage_ids=args.vantage_ids,
+                domain_source=domain_source,
+                resolvers=resolver_configs,
+                rounds=args.rounds,
+                round_interval_seconds=args.round_interval_seconds,
+                worker_config={
+                    'timeout_seconds': args.timeout_seconds,
+                    'concurrency_limit': args.concurrency_limit,
+                    'http2': args.http2,
+                    'adaptive_concurrency': args.adaptive_concurrency,
+                    'max_qps': args.max_qps,
+                    'learn_rate_limits': args.learn_rate_limits,
+                    'circuit_breaker_failures': args.circuit_breaker_failures,
+                    'circuit_breaker_probe_interval_seconds': args.circuit_breaker_probe_interval_seconds,
+                    'retries': args.retries,
+                    'retry_backoff_seconds': args.retry_backoff_seconds,
+                    'dynamic_timeouts': args.dynamic_timeouts,
+                    'hedge_requests': args.hedge_requests,
+                },
+                on_result=handle_result
+            )
+            completed_queries = await coordinator.run(*args.coordinator_address)
+        elif args.monitor:
+            print(f"Monitoring {len(resolver_configs)} resolvers with {args.monitor_sample_size} domains every "
+                  f"{args.monitor_interval_seconds:g}s. Press Ctrl+C to stop.")
+            completed_queries = await run_monitor(
+                doh_client=doh_client,
+                domain_source=domain_source,
+                resolvers=resolver_configs,
+                rolling_statistics=rolling_statistics,
+                on_result=handle_result,
+                timeout_seconds=args.timeout_seconds,
+                semaphore=semaphore,
+                worker_count=args.concurrency_limit,
+                interval_seconds=args.monitor_interval_seconds,
+                sample_size=args.monitor_sample_size,
+                cycles=args.monitor_cycles,
+                concurrency_controller=concurrency_controller
+            )
+        else:
+            for sample_round in range(args.rounds):
+                if sample_round > 0 and args.round_interval_seconds > 0:
+                    await asyncio.sleep(args.round_interval_seconds)
+                if args.rounds > 1:
+                    print(f"Sampling round {sample_round + 1}/{args.rounds}...")
+                work_items = iter_work_items(domain_source, resolver_configs, sample_round)
+                if args.resume:
+                    work_items = skip_recorded(work_items)
+                completed_queries += await run_query_pipeline(
+                    doh_client=doh_client,
+                    work_items=work_items,
                     timeout_seconds=args.timeout_seconds,
                     semaphore=semaphore,
-                    domain_category=domain_cfg.category
+                    on_result=handle_result,
+                    worker_count=args.concurrency_limit,
+                    concurrency_controller=concurrency_controller
                 )
-            )
-
-    start_query_time = time.perf_counter()
-    raw_query_results: List[QueryResult] = await asyncio.gather(*query_tasks)
-    await doh_client.close()
+    finally:
+        if metrics_server is not None:
+            await metrics_server.close()
+        await doh_client.close()
+        for sink in result_sinks:
+            sink.close()
+        if sqlite_store is not None:
+            sqlite_store.commit()
+    if args.workers == 1 and not args.coordinator_address:
+        connection_stats_by_resolver = doh_client.get_connection_stats()
     end_query_time = time.perf_counter()
-    print(f"All {len(raw_query_results)} queries completed in {end_query_time - start_query_time:.2f} seconds.")
+    if domain_source.domain_count is not None:
+        print(f"Tested {domain_source.domain_count} unique domains.")
+    print(f"All {completed_queries} queries completed in {end_query_time - start_query_time:.2f} seconds.")
 
-    # 4. Process results and store
-    print("Analyzing query results for blocking behavior...")
-    for raw_result in raw_query_results:
-        final_result = detect_blocking(raw_result, blocking_ip_ranges, custom_blocking_ips)
-        query_store.add_result(final_result)
+    for resolver_url, conn_stats in connection_stats_by_resolver.items():
+        print(f"  {resolver_url}: {conn_stats.requests} requests, {conn_stats.new_connections} new connections, "
+              f"{conn_stats.reused_connection_requests} on reused connections, {conn_stats.http2_requests} over HTTP/2")
+        if conn_stats.retry_requests or conn_stats.hedged_requests:
+            print(f"    {conn_stats.retry_requests} retries, {conn_stats.hedged_requests} hedged requests "
+                  f"({conn_stats.hedges_won} answered first)")
+        if args.http2 and conn_stats.requests and not conn_stats.http2_requests:
+            print("    Warning: HTTP/2 was not negotiated; all queries to this resolver used HTTP/1.1.")
+    if concurrency_controller:
+        for resolver_url, limit in concurrency_controller.get_limits().items():
+            print(f"  {resolver_url}: final adaptive concurrency window {limit}")
+    if rate_limiter and args.learn_rate_limits:
+        for resolver_url, rate_qps in rate_limiter.get_rates().items():
+            rate_text = f"{rate_qps:.1f} queries/s" if rate_qps is not None else "unlimited (never throttled)"
+            print(f"  {resolver_url}: final learned rate limit {rate_text}")
+    if circuit_breaker:
+        for resolver_url, times_opened in circuit_breaker.get_times_opened().items():
+            if times_opened:
+                print(f"  {resolver_url}: circuit breaker opened {times_opened} time(s)")
 
-    # 5. Calculate aggregated statistics
+    # 4. Read the aggregated statistics collected while the results streamed in
     print("Calculating statistics...")
-    performance_stats_by_resolver: Dict[str, PerformanceStats] = {}
-    blocking_stats_by_resolver: Dict[str, BlockingStats] = {}
-    categorized_blocking_stats_by_resolver: Dict[str, List[CategorizedBlockingStats]] = {}
-    blocked_useful_domains_by_resolver: Dict[str, List[str]] = {}
-    blocked_useless_domains_by_resolver: Dict[str, List[str]] = {}
-    passed_useless_domains_by_resolver: Dict[str, List[str]] = {}
-
-    for resolver_cfg in resolver_configs: # Iterate over original resolver configs to ensure all are processed
-        resolver_url = resolver_cfg.url
-        resolver_results = query_store.get_results(resolver_url=resolver_url)
-
-        performance_stats_by_resolver[resolver_url] = calculate_performance_stats(resolver_results)
-        blocking_stats_by_resolver[resolver_url] = calculate_overall_blocking_percentage(resolver_results) # Includes error counts and error rate
-        categorized_blocking_stats_by_resolver[resolver_url] = calculate_categorized_blocking_percentages(resolver_results, ALL_DOMAIN_CATEGORIES)
-        blocked_useful_domains_by_resolver[resolver_url] = get_blocked_useful_domains(resolver_results)
-        blocked_useless_domains_by_resolver[resolver_url] = get_blocked_useless_domains(resolver_results)
-        passed_useless_domains_by_resolver[resolver_url] = get_passed_useless_domains(resolver_results)
-
-    # 6. Generate Excel report
-    full_resolvers_for_excel = [r for r in resolver_configs if r.url in query_store.get_all_resolvers()]
-
-    excel_generator = ExcelGenerator(
-        output_filepath=args.output_file,
-        all_domains=domain_configs, # Use the original full list of domains
-        all_resolvers=full_resolvers_for_excel,
-        query_store=query_store
-    )
-    excel_generator.generate_report(
-        performance_stats_by_resolver=performance_stats_by_resolver,
-        blocking_stats_by_resolver=blocking_stats_by_resolver,
-        categorized_blocking_stats_by_resolver=categorized_blocking_stats_by_resolver,
-        blocked_useful_domains_by_resolver=blocked_useful_domains_by_resolver,
-        blocked_useless_domains_by_resolver=blocked_useless_domains_by_resolver,
-        passed_useless_domains_by_resolver=passed_useless_domains_by_resolver
-    )
+    if isinstance(query_store, ColumnarQueryStore) and VECTORIZED_GROUPING_AVAILABLE:
+        # Every result is in the columnar store: exact percentiles from vectorized group-bys instead of the sketches
+        performance_stats_by_resolver = calculate_performance_stats_by_resolver(query_store)
+        blocking_stats_by_resolver = calculate_blocking_stats_by_resolver(query_store)
+        categorized_blocking_stats_by_resolver = calculate_categorized_blocking_by_resolver(query_store,
+                                                                                            ALL_DOMAIN_CATEGORIES)
+    else:
+        performance_stats_by_resolver = statistics_aggregator.performance_stats_by_resolver()
+        blocking_stats_by_resolver = statistics_aggregator.blocking_stats_by_resolver()  # Includes error counts and error rate
+        categorized_blocking_stats_by_resolver = statistics_aggregator.categorized_blocking_stats_by_resolver()
+    blocked_useful_domains_by_resolver = statistics_aggregator.blocked_useful_domains_by_resolver()
+    blocked_useless_domains_by_resolver = statistics_aggregator.blocked_useless_domains_by_resolver()
+    passed_useless_domains_by_resolver = statistics_aggregator.passed_useless_domains_by_resolver()
+    category_performance_stats_by_resolver = statistics_aggregator.category_performance_stats_by_resolver()
+    cold_performance_stats_by_resolver: Dict[str, PerformanceStats] = {}
+    warm_performance_stats_by_resolver: Dict[str, PerformanceStats] = {}
+    domain_performance_stats_by_resolver: Dict[str, Dict[str, PerformanceStats]] = {}
+    if args.rounds > 1:
+        cold_performance_stats_by_resolver = statistics_aggregator.cold_performance_stats_by_resolver()
+        warm_performance_stats_by_resolver = statistics_aggregator.warm_performance_stats_by_resolver()
+        domain_performance_stats_by_resolver = statistics_aggregator.domain_performance_stats_by_resolver()
+    performance_stats_by_vantage: Dict[str, Dict[str, PerformanceStats]] = {}
+    blocking_stats_by_vantage: Dict[str, Dict[str, BlockingStats]] = {}
+    for vantage_id in args.vantage_ids:
+        if vantage_id in vantage_aggregators:
+            performance_stats_by_vantage[vantage_id] = vantage_aggregators[vantage_id].performance_stats_by_resolver()
+            blocking_stats_by_vantage[vantage_id] = vantage_aggregators[vantage_id].blocking_stats_by_resolver()
+    for vantage_id, vantage_performance_stats in performance_stats_by_vantage.items():
+        print(f"  Vantage point '{vantage_id}':")
+        for resolver_url, perf in vantage_performance_stats.items():
+            blocking = blocking_stats_by_vantage[vantage_id][resolver_url]
+            median = f"{perf.median_latency_ms:.2f} ms" if perf.median_latency_ms is not None else "N/A"
+            print(f"    {resolver_url}: median {median}, {blocking.blocked_queries} blocked, "
+                  f"{blocking.error_queries} errors of {blocking.total_queries} queries")
+
+    # 5. Write the summary and the Excel report
+    if args.summary_file:
+        write_summary(
+            output_filepath=args.summary_file,
+            total_queries=statistics_aggregator.total_queries,
+            skipped_queries=statistics_aggregator.skipped_queries,
+            duration_seconds=end_query_time - start_query_time,
+            performance_stats_by_resolver=performance_stats_by_resolver,
+            blocking_stats_by_resolver=blocking_stats_by_resolver,
+            categorized_blocking_stats_by_resolver=categorized_blocking_stats_by_resolver,
+            category_performance_stats_by_resolver=category_performance_stats_by_resolver,
+            connection_stats_by_resolver=connection_stats_by_resolver,
+            performance_stats_by_vantage=performance_stats_by_vantage,
+            blocking_stats_by_vantage=blocking_stats_by_vantage
+        )
+
+    if args.output_file:
+        stored_resolver_urls = set(query_store.get_all_resolvers())
+        full_resolvers_for_excel = [r for r in resolver_configs if r.url in stored_resolver_urls]
+
+        excel_generator = ExcelGenerator(
+            output_filepath=args.output_file,
+            all_domains=list(domain_source), # Use the original full list of domains
+            all_resolvers=full_resolvers_for_excel,
+            query_store=query_store
+        )
+        excel_generator.generate_report(
+            performance_stats_by_resolver=performance_stats_by_resolver,
+            blocking_stats_by_resolver=blocking_stats_by_resolver,
+            categorized_blocking_stats_by_resolver=categorized_blocking_stats_by_resolver,
+            blocked_useful_domains_by_resolver=blocked_useful_domains_by_resolver,
+            blocked_useless_domains_by_resolver=blocked_useless_domains_by_resolver,
+            passed_useless_domains_by_resolver=passed_useless_domains_by_resolver,
+            connection_stats_by_resolver=connection_stats_by_resolver,
+            cold_performance_stats_by_resolver=cold_performance_stats_by_resolver,
+            warm_performance_stats_by_resolver=warm_performance_stats_by_resolver,
+            domain_performance_stats_by_resolver=domain_performance_stats_by_resolver,
+            category_performance_stats_by_resolver=category_performance_stats_by_resolver,
+            performance_stats_by_vantage=performance_stats_by_vantage,
+            blocking_stats_by_vantage=blocking_stats_by_vantage
+        )
+
+    if sqlite_store is not None:
+        sqlite_store.close()
 
     print("DNS Analyzer: Analysis complete.")
 
@@ -144,7 +421,13 @@ if __name__ == "__main__":
     # Ensure event loop is always closed cleanly
     try:
         args = parse_arguments()
-        asyncio.run(run_analysis(args))
+        if args.join_address:
+            try:
+                asyncio.run(run_worker(*args.join_address, args.vantage_id))
+            except (OSError, RuntimeError) as e:
+                print(f"Error: Cluster worker stopped: {e}")
+        else:
+            asyncio.run(run_analysis(args))
     except KeyboardInterrupt:
         print("\nAnalysis interrupted by user.")
     except Exception as e:
@@ -1,22 +1,71 @@
-from typing import Optional
+from typing import List, Optional, Tuple
 import argparse
 from dataclasses import dataclass
-from config.settings import DEFAULT_OUTPUT_FILE, DEFAULT_CONCURRENCY_LIMIT, DEFAULT_TIMEOUT_SECONDS
+from cluster.protocol import parse_address
+from config.settings import (
+    DEFAULT_OUTPUT_FILE,
+    DEFAULT_CONCURRENCY_LIMIT,
+    DEFAULT_TIMEOUT_SECONDS,
+    DEFAULT_DOH_FORMAT,
+    DEFAULT_SAMPLING_ROUNDS,
+    DEFAULT_ROUND_INTERVAL_SECONDS,
+    DEFAULT_RESULT_STORE,
+    DEFAULT_WORKER_COUNT,
+    DEFAULT_MONITOR_INTERVAL_SECONDS,
+    DEFAULT_MONITOR_SAMPLE_SIZE,
+    DEFAULT_CIRCUIT_BREAKER_PROBE_INTERVAL_SECONDS,
+    DEFAULT_RETRY_BACKOFF_SECONDS,
+    ALL_RESULT_STORES,
+    ALL_RESULT_SINK_FORMATS,
+    ALL_DOH_FORMATS,
+    MAX_HTTP1_CONNECTIONS_PER_RESOLVER
+)
 
 
 @dataclass
 class ParsedArguments:
     domain_list_path: Optional[str]
-    resolver_list_path: str
-    output_file: str
+    max_domains: Optional[int]
+    resolver_list_path: Optional[str]  # Not needed by cluster workers, which get the resolvers from the coordinator
+    output_file: Optional[str]  # Excel report path; None when no Excel report is requested
     concurrency_limit: int
     timeout_seconds: float
     custom_blocking_ips_path: Optional[str]
+    doh_format: str
+    http2: bool
+    adaptive_concurrency: bool
+    max_qps: Optional[float]  # Default per-resolver request rate cap; None is unlimited
+    learn_rate_limits: bool
+    circuit_breaker_failures: Optional[int]  # None disables the circuit breaker
+    circuit_breaker_probe_interval_seconds: float
+    retries: int  # Retries of timed-out or failed queries; 0 disables retrying
+    retry_backoff_seconds: float
+    dynamic_timeouts: bool
+    hedge_requests: bool
+    rounds: int
+    round_interval_seconds: float
+    result_store: str
+    result_sinks: List[Tuple[str, str]]  # (format, path) of each per-result sink
+    summary_file: Optional[str]
+    db_path: Optional[str]
+    run_id: Optional[str]
+    resume: bool
+    workers: int
+    coordinator_address: Optional[Tuple[str, int]]  # Listen address when running as cluster coordinator
+    vantage_ids: List[str]
+    join_address: Optional[Tuple[str, int]]  # Coordinator address when running as cluster worker
+    vantage_id: Optional[str]
+    monitor: bool
+    monitor_interval_seconds: float
+    monitor_sample_size: int
+    monitor_cycles: Optional[int]  # None runs until interrupted
+    metrics_address: Optional[Tuple[str, int]]  # Listen address of the OpenMetrics endpoint
 
 
-def parse_arguments() -> ParsedArguments:
+def parse_arguments(argv: Optional[List[str]] = None) -> ParsedArguments:
     """
     Parses command-line arguments for script configuration.
+    `argv` defaults to the process arguments; passing a list allows programmatic runs, e.g. benchmarks.
     """
     parser = argparse.ArgumentParser(
         description="DNS Analyzer: Evaluate DoH resolvers against categorized domains."
@@ -27,22 +76,30 @@ def parse_arguments() -> ParsedArguments:
         dest="domain_list_path",
         type=str,
         default=None,
-        help="Path to a text file containing additional domain names (one per line). "
-             "If not provided, a hardcoded list expanded to 100 domains is used."
+        help="Path to a file with additional domain names, tested after the built-in list of 100: either "
+             "one domain per line, or CSV rows of rank,domain[,category] (e.g. a top-1M list). "
+             "The file is streamed, so there is no size limit."
+    )
+    parser.add_argument(
+        "--max-domains",
+        dest="max_domains",
+        type=int,
+        default=None,
+        help="Stop after this many unique domains (built-in list included). Default: no limit"
     )
     parser.add_argument(
         "--resolvers",
         dest="resolver_list_path",
         type=str,
-        required=True,
-        help="Path to a text file containing DoH resolver URLs (one per line)."
+        default=None,
+        help="Path to a text file containing DoH resolver URLs (one per line). Required, except with --join."
     )
     parser.add_argument(
         "--output",
         dest="output_file",
         type=str,
-        default=DEFAULT_OUTPUT_FILE,
-        help=f"Path for the output Excel report. Default: '{DEFAULT_OUTPUT_FILE}'"
+        default=None,
+        help=f"Path for the output Excel report. Default: '{DEFAULT_OUTPUT_FILE}' when no --sink is given"
     )
     parser.add_argument(
         "--concurrency",
@@ -63,16 +120,349 @@ def parse_arguments() -> ParsedArguments:
         dest="custom_blocking_ips_path",
         type=str,
         default=None,
-        help="Path to a text file containing user-defined specific blocking IPv4 addresses (one per line)."
+        help="Path to a text file containing user-defined blocking IPv4 addresses, CIDR blocks "
+             "(192.0.2.0/24) or ranges (192.0.2.10-192.0.2.20), one per line."
+    )
+
+    parser.add_argument(
+        "--doh-format",
+        dest="doh_format",
+        choices=ALL_DOH_FORMATS,
+        default=DEFAULT_DOH_FORMAT,
+        help="Default DoH request format for resolvers that do not specify one in the resolver list: "
+             "'json' (application/dns-json), 'wire-get' or 'wire-post' (RFC 8484 application/dns-message). "
+             f"Default: '{DEFAULT_DOH_FORMAT}'"
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--http2",
+        dest="http2",
+        action="store_true",
+        help="Use HTTP/2 and multiplex all in-flight queries to a resolver over a single connection. "
+             f"By default HTTP/1.1 is used with a per-resolver pool sized to --concurrency, but at most "
+             f"{MAX_HTTP1_CONNECTIONS_PER_RESOLVER} connections, which also caps the queries in flight per resolver."
+    )
+
+    parser.add_argument(
+        "--adaptive-concurrency",
+        dest="adaptive_concurrency",
+        action="store_true",
+        help="Give each resolver its own concurrency window that grows while latency and errors stay healthy "
+             "and backs off on timeouts, HTTP 429 or latency inflation (AIMD). "
+             f"--concurrency becomes the per-resolver upper bound (at most {MAX_HTTP1_CONNECTIONS_PER_RESOLVER} "
+             f"without --http2)."
+    )
+
+    parser.add_argument(
+        "--max-qps",
+        dest="max_qps",
+        type=float,
+        default=None,
+        help="Pace queries to each resolver to at most this many per second (token bucket), unless the "
+             "resolver list sets its own 'qps=N'. With --workers, the rate is split between the workers. "
+             "Default: unlimited"
+    )
+
+    parser.add_argument(
+        "--learn-rate-limits",
+        dest="learn_rate_limits",
+        action="store_true",
+        help="Halve a resolver's query rate when it answers HTTP 429 and let it grow back while queries "
+             "succeed, so each resolver settles at the highest rate it tolerates. Retry-After is honoured "
+             "whenever a rate limit is active."
+    )
+
+    parser.add_argument(
+        "--circuit-breaker",
+        dest="circuit_breaker_failures",
+        type=int,
+        default=None,
+        metavar="FAILURES",
+        help="Stop querying a resolver after this many consecutive timeouts or connection errors; its "
+             "remaining queries are recorded as 'Skipped' at once. One probe query is let through every "
+             "--circuit-breaker-probe-interval seconds, and the resolver is queried again once it answers. "
+             "Default: disabled"
+    )
+    parser.add_argument(
+        "--circuit-breaker-probe-interval",
+        dest="circuit_breaker_probe_interval_seconds",
+        type=float,
+        default=DEFAULT_CIRCUIT_BREAKER_PROBE_INTERVAL_SECONDS,
+        help=f"Seconds between probe queries to a resolver whose circuit is open. "
+             f"Default: {DEFAULT_CIRCUIT_BREAKER_PROBE_INTERVAL_SECONDS}s"
+    )
+
+    parser.add_argument(
+        "--retries",
+        dest="retries",
+        type=int,
+        default=0,
+        help="Retry a query up to this many times after a timeout or connection error, waiting a random "
+             "exponential backoff (see --retry-backoff) between tries. Other errors are never retried. "
+             "Default: 0 (no retries)"
+    )
+    parser.add_argument(
+        "--retry-backoff",
+        dest="retry_backoff_seconds",
+        type=float,
+        default=DEFAULT_RETRY_BACKOFF_SECONDS,
+        help=f"Base backoff before the first retry in seconds; it doubles with every further retry and the "
+             f"actual wait is drawn at random up to it. Default: {DEFAULT_RETRY_BACKOFF_SECONDS}s"
+    )
+    parser.add_argument(
+        "--dynamic-timeout",
+        dest="dynamic_timeouts",
+        action="store_true",
+        help="Derive each resolver's request timeout from its recent p99 latency, so slow tail requests "
+             "fail (and can be retried) sooner. --timeout remains the upper bound and is used until "
+             "enough latencies are known."
+    )
+    parser.add_argument(
+        "--hedge",
+        dest="hedge_requests",
+        action="store_true",
+        help="Send a duplicate request when a query has been pending longer than the resolver's recent "
+             "p95 latency, and use whichever answers first. Hedges are capped at 10%% of each resolver's requests."
+    )
+
+    parser.add_argument(
+        "--rounds",
+        dest="rounds",
+        type=int,
+        default=DEFAULT_SAMPLING_ROUNDS,
+        help="Number of times every domain is queried against every resolver. The first round is reported "
+             f"as the cold sample, later rounds as warm (cached) samples. Default: {DEFAULT_SAMPLING_ROUNDS}"
+    )
+    parser.add_argument(
+        "--round-interval",
+        dest="round_interval_seconds",
+        type=float,
+        default=DEFAULT_ROUND_INTERVAL_SECONDS,
+        help=f"Pause in seconds between sampling rounds. Default: {DEFAULT_ROUND_INTERVAL_SECONDS}s"
+    )
+
+    parser.add_argument(
+        "--store",
+        dest="result_store",
+        choices=ALL_RESULT_STORES,
+        default=DEFAULT_RESULT_STORE,
+        help="In-memory result storage: 'memory' keeps QueryResult objects, 'columnar' keeps compact typed "
+             "arrays and computes statistics with NumPy when it is installed. "
+             f"Default: '{DEFAULT_RESULT_STORE}'"
+    )
+
+    parser.add_argument(
+        "--sink",
+        dest="result_sinks",
+        action="append",
+        metavar="FORMAT:PATH",
+        default=[],
+        help="Write every result as soon as it completes, e.g. 'csv:results.csv'. Can be repeated. "
+             f"FORMAT is one of: {', '.join(ALL_RESULT_SINK_FORMATS)} ('parquet' requires pyarrow). "
+             "When any sink is given, the Excel report is only written if requested with --output or 'excel:PATH'."
+    )
+    parser.add_argument(
+        "--summary",
+        dest="summary_file",
+        type=str,
+        default=None,
+        help="Path for a JSON file with the per-resolver summary statistics."
+    )
+
+    parser.add_argument(
+        "--db",
+        dest="db_path",
+        type=str,
+        default=None,
+        help="Path to a SQLite database that records every result as it completes, so that an "
+             "interrupted run can be resumed. The Excel report then reads results from it."
+    )
+    parser.add_argument(
+        "--run-id",
+        dest="run_id",
+        type=str,
+        default=None,
+        help="Identifier of the run in the --db database. Default: the start time (YYYYMMDD-HHMMSS)"
+    )
+    parser.add_argument(
+        "--resume",
+        dest="resume",
+        action="store_true",
+        help="Continue the --run-id run from the --db database: queries already recorded are skipped "
+             "and their stored results are included in the statistics and outputs."
+    )
+
+    parser.add_argument(
+        "--workers",
+        dest="workers",
+        type=int,
+        default=DEFAULT_WORKER_COUNT,
+        help="Number of worker processes. Domains are sharded across workers, each with its own event loop "
+             "and HTTP client; --concurrency is split between them. "
+             f"Default: {DEFAULT_WORKER_COUNT}"
+    )
+
+    parser.add_argument(
+        "--coordinator",
+        dest="coordinator_address",
+        metavar="HOST:PORT",
+        default=None,
+        help="Run as cluster coordinator listening on HOST:PORT: instead of querying, hand out work batches "
+             "to workers started with --join and report their results per vantage point. Requires --vantages."
+    )
+    parser.add_argument(
+        "--vantages",
+        dest="vantage_ids",
+        metavar="ID[,ID...]",
+        default=None,
+        help="Comma-separated vantage IDs the coordinator expects. Each vantage point runs the full "
+             "domain x resolver matrix, split between the workers that join with its ID."
+    )
+    parser.add_argument(
+        "--join",
+        dest="join_address",
+        metavar="HOST:PORT",
+        default=None,
+        help="Run as cluster worker for the coordinator at HOST:PORT. Requires --vantage-id; all other "
+             "query settings come from the coordinator."
+    )
+    parser.add_argument(
+        "--vantage-id",
+        dest="vantage_id",
+        default=None,
+        help="Vantage point this worker reports its results under, e.g. the host or network name."
+    )
+
+    parser.add_argument(
+        "--monitor",
+        dest="monitor",
+        action="store_true",
+        help="Run continuously: every --monitor-interval seconds, probe the next --monitor-sample domains "
+             "(rotating through the domain list) against every resolver and print per-resolver statistics "
+             "over the last 1m, 5m and 1h. Runs until interrupted unless --monitor-cycles is given."
+    )
+    parser.add_argument(
+        "--monitor-interval",
+        dest="monitor_interval_seconds",
+        type=float,
+        default=DEFAULT_MONITOR_INTERVAL_SECONDS,
+        help=f"Seconds between the starts of two monitoring cycles. Default: {DEFAULT_MONITOR_INTERVAL_SECONDS}s"
+    )
+    parser.add_argument(
+        "--monitor-sample",
+        dest="monitor_sample_size",
+        type=int,
+        default=DEFAULT_MONITOR_SAMPLE_SIZE,
+        help=f"Domains probed per monitoring cycle. Default: {DEFAULT_MONITOR_SAMPLE_SIZE}"
+    )
+    parser.add_argument(
+        "--monitor-cycles",
+        dest="monitor_cycles",
+        type=int,
+        default=None,
+        help="Stop monitoring after this many cycles. Default: run until interrupted"
+    )
+    parser.add_argument(
+        "--metrics",
+        dest="metrics_address",
+        type=str,
+        default=None,
+        metavar="HOST:PORT",
+        help="Serve live per-resolver query, error, blocking and latency metrics in the OpenMetrics "
+             "(Prometheus) format on http://HOST:PORT/metrics while the analyzer runs (':PORT' for all interfaces)"
+    )
+
+    args = parser.parse_args(argv)
+    if not args.join_address and not args.resolver_list_path:
+        parser.error("the following arguments are required: --resolvers")
+    if args.join_address and not args.vantage_id:
+        parser.error("--join requires --vantage-id")
+    if args.coordinator_address and (args.db_path or args.workers > 1):
+        parser.error("--coordinator cannot be combined with --db or --workers")
+    if args.monitor and (args.db_path or args.workers > 1 or args.coordinator_address or args.join_address):
+        parser.error("--monitor cannot be combined with --db, --workers, --coordinator or --join")
+    if args.monitor and (args.rounds > 1 or args.round_interval_seconds > 0):
+        # Every monitoring cycle is its own sampling round; --monitor-interval sets the pause
+        parser.error("--monitor cannot be combined with --rounds or --round-interval; use --monitor-interval")
+    if args.metrics_address and args.join_address:
+        parser.error("--metrics is served by the coordinator and cannot be combined with --join")
+    coordinator_address = join_address = metrics_address = None
+    try:
+        if args.metrics_address:
+            metrics_address = parse_address(args.metrics_address)
+        if args.coordinator_address:
+            coordinator_address = parse_address(args.coordinator_address)
+        if args.join_address:
+            join_address = parse_address(args.join_address)
+    except ValueError as e:
+        parser.error(str(e))
+    vantage_ids = []
+    for vantage_id in (args.vantage_ids or '').split(','):
+        vantage_id = vantage_id.strip()
+        if vantage_id and vantage_id not in vantage_ids:
+            vantage_ids.append(vantage_id)
+    if args.coordinator_address and not vantage_ids:
+        parser.error("--coordinator requires --vantages")
+    if args.max_qps is not None and not args.max_qps > 0:
+        parser.error("--max-qps must be greater than 0")
+    if args.circuit_breaker_failures is not None and args.circuit_breaker_failures < 1:
+        parser.error("--circuit-breaker must be at least 1")
+    if args.retries < 0:
+        parser.error("--retries must not be negative")
+    if args.resume and not (args.db_path and args.run_id):
+        parser.error("--resume requires --db and --run-id")
+
+    result_sinks = []
+    output_file = args.output_file
+    for sink_spec in args.result_sinks:
+        sink_format, separator, sink_path = sink_spec.partition(':')
+        if not separator or not sink_path or sink_format not in ALL_RESULT_SINK_FORMATS:
+            parser.error(f"invalid --sink '{sink_spec}': expected FORMAT:PATH with FORMAT one of "
+                         f"{', '.join(ALL_RESULT_SINK_FORMATS)}")
+        if sink_format == 'excel':
+            output_file = sink_path
+        else:
+            result_sinks.append((sink_format, sink_path))
+    if args.monitor and output_file is not None:
+        parser.error("the Excel report is not available with --monitor; use --sink to record results")
+    if output_file is None and not result_sinks and not args.monitor:
+        output_file = DEFAULT_OUTPUT_FILE
 
     return ParsedArguments(
         domain_list_path=args.domain_list_path,
+        max_domains=args.max_domains,
         resolver_list_path=args.resolver_list_path,
-        output_file=args.output_file,
+        output_file=output_file,
         concurrency_limit=args.concurrency_limit,
         timeout_seconds=args.timeout_seconds,
-        custom_blocking_ips_path=args.custom_blocking_ips_path
+        custom_blocking_ips_path=args.custom_blocking_ips_path,
+        doh_format=args.doh_format,
+        http2=args.http2,
+        adaptive_concurrency=args.adaptive_concurrency,
+        max_qps=args.max_qps,
+        learn_rate_limits=args.learn_rate_limits,
+        circuit_breaker_failures=args.circuit_breaker_failures,
+        circuit_breaker_probe_interval_seconds=max(0.0, args.circuit_breaker_probe_interval_seconds),
+        retries=args.retries,
+        retry_backoff_seconds=max(0.0, args.retry_backoff_seconds),
+        dynamic_timeouts=args.dynamic_timeouts,
+        hedge_requests=args.hedge_requests,
+        rounds=max(1, args.rounds),
+        round_interval_seconds=max(0.0, args.round_interval_seconds),
+        result_store=args.result_store,
+        result_sinks=result_sinks,
+        summary_file=args.summary_file,
+        db_path=args.db_path,
+        run_id=args.run_id,
+        resume=args.resume,
+        workers=max(1, args.workers),
+        coordinator_address=coordinator_address,
+        vantage_ids=vantage_ids,
+        join_address=join_address,
+        vantage_id=args.vantage_id,
+        monitor=args.monitor,
+        monitor_interval_seconds=max(0.0, args.monitor_interval_seconds),
+        monitor_sample_size=max(1, args.monitor_sample_size),
+        monitor_cycles=args.monitor_cycles,
+        metrics_address=metrics_address
     )
\ No newline at end of file
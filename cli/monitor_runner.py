@@ -0,0 +1,97 @@
+import asyncio
+import itertools
+import time
+from typing import Callable, Iterator, List, Optional
+from config.domain_source import DomainSource
+from dns_client.doh_client import DohClient
+from dns_client.query_pipeline import iter_work_items, run_query_pipeline
+from dns_client.concurrency_controller import AdaptiveConcurrencyController
+from data.models import DomainConfig, DnsResolver, QueryResult
+from analysis.rolling_statistics import RollingStatistics
+
+
+def _iter_rotating_domains(domain_source: DomainSource) -> Iterator[DomainConfig]:
+    """Cycles through the domain source forever, re-reading it on every pass instead of keeping a copy."""
+    while True:
+        empty_pass = True
+        for domain in domain_source:
+            empty_pass = False
+            yield domain
+        if empty_pass:
+            return
+
+
+def _format_window_label(window_seconds: float) -> str:
+    if window_seconds >= 3600 and window_seconds % 3600 == 0:
+        return f"{int(window_seconds // 3600)}h"
+    if window_seconds >= 60 and window_seconds % 60 == 0:
+        return f"{int(window_seconds // 60)}m"
+    return f"{window_seconds:g}s"
+
+
+def print_window_report(rolling_statistics: RollingStatistics, resolvers: List[DnsResolver]):
+    """Prints query count, error and blocked share and latency percentiles of every resolver per rolling window."""
+    window_stats = {}
+    for window_seconds in rolling_statistics.window_seconds:
+        aggregator = rolling_statistics.window(window_seconds)
+        window_stats[window_seconds] = (aggregator.blocking_stats_by_resolver(), aggregator.performance_stats_by_resolver())
+
+    print(f"  {'Resolver':<40} {'Window':>6} {'Queries':>8} {'Errors %':>9} {'Blocked %':>10} {'P50 ms':>8} {'P95 ms':>8}")
+    for resolver in resolvers:
+        for window_seconds, (blocking_stats_by_resolver, performance_stats_by_resolver) in window_stats.items():
+            blocking = blocking_stats_by_resolver.get(resolver.url)
+            if blocking is None:
+                continue
+            perf = performance_stats_by_resolver[resolver.url]
+            error_rate = blocking.error_queries / blocking.total_queries * 100 if blocking.total_queries else 0.0
+            p50 = f"{perf.median_latency_ms:.1f}" if perf.median_latency_ms is not None else "N/A"
+            p95 = f"{perf.p95_latency_ms:.1f}" if perf.p95_latency_ms is not None else "N/A"
+            print(f"  {resolver.name[:40]:<40} {_format_window_label(window_seconds):>6} {blocking.total_queries:>8} "
+                  f"{error_rate:>9.1f} {blocking.overall_blocked_percentage:>10.1f} {p50:>8} {p95:>8}")
+
+
+async def run_monitor(doh_client: DohClient,
+                      domain_source: DomainSource,
+                      resolvers: List[DnsResolver],
+                      rolling_statistics: RollingStatistics,
+                      on_result: Callable[[QueryResult], None],
+                      timeout_seconds: float,
+                      semaphore: asyncio.Semaphore,
+                      worker_count: int,
+                      interval_seconds: float,
+                      sample_size: int,
+                      cycles: Optional[int] = None,
+                      concurrency_controller: Optional[AdaptiveConcurrencyController] = None) -> int:
+    """
+    Probes a rotating sample of `sample_size` domains against every resolver once per `interval_seconds`,
+    until `cycles` cycles have run (forever when None). Every cycle continues where the previous one
+    stopped in the domain list and reuses the same DohClient, so its pooled connections stay open
+    between cycles. `on_result` is expected to feed `rolling_statistics`, whose windows are printed
+    after every cycle. Returns the number of completed queries.
+    """
+    rotating_domains = _iter_rotating_domains(domain_source)
+    completed_queries = 0
+    for cycle in itertools.count():
+        if cycles is not None and cycle >= cycles:
+            break
+        cycle_start = time.perf_counter()
+        sample_domains = list(itertools.islice(rotating_domains, sample_size))
+        work_items = iter_work_items(sample_domains, resolvers, sample_round=cycle)
+        cycle_queries = await run_query_pipeline(
+            doh_client=doh_client,
+            work_items=work_items,
+            timeout_seconds=timeout_seconds,
+            semaphore=semaphore,
+            on_result=on_result,
+            worker_count=worker_count,
+            concurrency_controller=concurrency_controller
+        )
+        completed_queries += cycle_queries
+        cycle_seconds = time.perf_counter() - cycle_start
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] Cycle {cycle + 1}: {cycle_queries} queries "
+              f"({len(sample_domains)} domains) in {cycle_seconds:.2f}s")
+        print_window_report(rolling_statistics, resolvers)
+
+        if cycles is None or cycle + 1 < cycles:
+            await asyncio.sleep(max(0.0, interval_seconds - cycle_seconds))
+    return completed_queries
@@ -0,0 +1,196 @@
+import asyncio
+import itertools
+import multiprocessing
+import queue
+import signal
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from config.domain_source import DomainSource
+from config.settings import ALL_DOMAIN_CATEGORIES, WORKER_RESULT_BATCH_SIZE
+from dns_client.doh_client import DohClient
+from dns_client.query_pipeline import iter_work_items, run_query_pipeline
+from dns_client.concurrency_controller import AdaptiveConcurrencyController
+from dns_client.rate_limiter import ResolverRateLimiter
+from dns_client.circuit_breaker import ResolverCircuitBreaker
+from dns_client.retry_policy import RetryPolicy
+from data.models import DomainConfig, DnsResolver, QueryResult, ConnectionStats
+from data.sqlite_store import SqliteQueryStore
+from analysis.blocking_detector import detect_blocking
+from analysis.statistics_aggregator import StatisticsAggregator
+from utils.ip_utils import BlockingIpMatcher
+
+_WORKER_POLL_SECONDS = 1.0  # How often the parent checks for workers that died without reporting
+
+
+@dataclass
+class ShardConfig:
+    """Everything a worker process needs to run its shard; must be picklable."""
+    domain_source: DomainSource
+    resolvers: List[DnsResolver]
+    blocking_matcher: BlockingIpMatcher
+    timeout_seconds: float
+    concurrency_limit: int  # Per worker
+    http2: bool
+    adaptive_concurrency: bool
+    max_qps: Optional[float]  # Whole-run default; each worker gets its share
+    learn_rate_limits: bool
+    circuit_breaker_failures: Optional[int]
+    circuit_breaker_probe_interval_seconds: float
+    retries: int
+    retry_backoff_seconds: float
+    dynamic_timeouts: bool
+    hedge_requests: bool
+    rounds: int
+    round_interval_seconds: float
+    resume_db_path: Optional[str] = None
+    resume_run_id: Optional[str] = None
+
+
+def _iter_shard_domains(domain_source: DomainSource, shard_index: int, shard_count: int) -> Iterator[DomainConfig]:
+    """Every shard_count-th domain, starting at shard_index, so shards are disjoint and balanced."""
+    return itertools.islice(domain_source, shard_index, None, shard_count)
+
+
+async def _run_shard_async(config: ShardConfig, shard_index: int, shard_count: int, result_queue):
+    rate_limiter = None
+    if config.max_qps is not None or config.learn_rate_limits or any(resolver.max_qps for resolver in config.resolvers):
+        rate_limiter = ResolverRateLimiter(default_max_qps=config.max_qps, learn=config.learn_rate_limits,
+                                           rate_share=1 / shard_count)
+    circuit_breaker = None
+    if config.circuit_breaker_failures:
+        circuit_breaker = ResolverCircuitBreaker(config.circuit_breaker_failures,
+                                                 config.circuit_breaker_probe_interval_seconds)
+    retry_policy = RetryPolicy(config.retries, config.retry_backoff_seconds) if config.retries else None
+    doh_client = DohClient(http2=config.http2, max_connections_per_resolver=config.concurrency_limit,
+                           rate_limiter=rate_limiter, circuit_breaker=circuit_breaker, retry_policy=retry_policy,
+                           dynamic_timeouts=config.dynamic_timeouts, hedge_requests=config.hedge_requests)
+    aggregator = StatisticsAggregator(ALL_DOMAIN_CATEGORIES, track_domain_latency=config.rounds > 1)
+    semaphore = asyncio.Semaphore(config.concurrency_limit)
+    concurrency_controller = None
+    if config.adaptive_concurrency:
+        concurrency_controller = AdaptiveConcurrencyController(max_limit=doh_client.slots_per_resolver)
+    resume_store = None
+    if config.resume_db_path:
+        resume_store = SqliteQueryStore(config.resume_db_path, config.resume_run_id)
+
+    batch: List[QueryResult] = []
+
+    def handle_result(raw_result: QueryResult):
+        final_result = detect_blocking(raw_result, config.blocking_matcher)
+        aggregator.add(final_result)
+        batch.append(final_result)
+        if len(batch) >= WORKER_RESULT_BATCH_SIZE:
+            result_queue.put(('results', shard_index, list(batch)))
+            batch.clear()
+
+    def skip_recorded(work_items):
+        for work_item in work_items:
+            if not resume_store.has_result(work_item.resolver.url, work_item.domain.name, work_item.sample_round):
+                yield work_item
+
+    completed_queries = 0
+    try:
+        for sample_round in range(config.rounds):
+            if sample_round > 0 and config.round_interval_seconds > 0:
+                await asyncio.sleep(config.round_interval_seconds)
+            shard_domains = _iter_shard_domains(config.domain_source, shard_index, shard_count)
+            work_items = iter_work_items(shard_domains, config.resolvers, sample_round)
+            if resume_store is not None:
+                work_items = skip_recorded(work_items)
+            completed_queries += await run_query_pipeline(
+                doh_client=doh_client,
+                work_items=work_items,
+                timeout_seconds=config.timeout_seconds,
+                semaphore=semaphore,
+                on_result=handle_result,
+                worker_count=config.concurrency_limit,
+                concurrency_controller=concurrency_controller
+            )
+    finally:
+        await doh_client.close()
+        if resume_store is not None:
+            resume_store.close()
+
+    if batch:
+        result_queue.put(('results', shard_index, batch))
+    result_queue.put(('done', shard_index, aggregator, doh_client.get_connection_stats(), completed_queries))
+
+
+def _run_shard(config: ShardConfig, shard_index: int, shard_count: int, result_queue):
+    """Worker process entry point: runs one shard on its own event loop and DohClient."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Interruption is handled by the parent, which stops the workers
+    try:
+        asyncio.run(_run_shard_async(config, shard_index, shard_count, result_queue))
+    except Exception as e:
+        result_queue.put(('error', shard_index, f"{type(e).__name__}: {e}"))
+
+
+async def run_sharded_queries(config: ShardConfig,
+                              worker_count: int,
+                              on_result: Callable[[QueryResult], None]
+                              ) -> Tuple[int, StatisticsAggregator, Dict[str, ConnectionStats]]:
+    """
+    Shards the domain x resolver matrix across worker processes by domain and runs them in parallel.
+    Each worker classifies and aggregates its own results and streams them back in batches;
+    `on_result` is called in this process for every result as its batch arrives.
+    Returns the number of completed queries, the merged statistics aggregator and the
+    summed connection statistics.
+    """
+    context = multiprocessing.get_context()
+    result_queue = context.Queue()
+    processes = [
+        context.Process(target=_run_shard, args=(config, shard_index, worker_count, result_queue), daemon=True)
+        for shard_index in range(worker_count)
+    ]
+    for process in processes:
+        process.start()
+
+    def next_message():
+        while True:
+            try:
+                return result_queue.get(timeout=_WORKER_POLL_SECONDS)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    # A worker may have put its last message just before exiting; drain it before giving up
+                    try:
+                        return result_queue.get_nowait()
+                    except queue.Empty:
+                        return None
+
+    merged_aggregator = StatisticsAggregator(ALL_DOMAIN_CATEGORIES, track_domain_latency=config.rounds > 1)
+    connection_stats_by_resolver: Dict[str, ConnectionStats] = {}
+    completed_queries = 0
+    running_workers = set(range(worker_count))
+    loop = asyncio.get_running_loop()
+    try:
+        while running_workers:
+            message = await loop.run_in_executor(None, next_message)
+            if message is None:
+                raise RuntimeError(f"Worker processes {sorted(running_workers)} exited without reporting results.")
+            kind, shard_index, *payload = message
+            if kind == 'results':
+                for result in payload[0]:
+                    on_result(result)
+            elif kind == 'done':
+                shard_aggregator, shard_connection_stats, shard_completed_queries = payload
+                merged_aggregator.merge(shard_aggregator)
+                for resolver_url, shard_stats in shard_connection_stats.items():
+                    stats = connection_stats_by_resolver.setdefault(resolver_url, ConnectionStats())
+                    stats.requests += shard_stats.requests
+                    stats.new_connections += shard_stats.new_connections
+                    stats.reused_connection_requests += shard_stats.reused_connection_requests
+                    stats.http2_requests += shard_stats.http2_requests
+                    stats.retry_requests += shard_stats.retry_requests
+                    stats.hedged_requests += shard_stats.hedged_requests
+                    stats.hedges_won += shard_stats.hedges_won
+                completed_queries += shard_completed_queries
+                running_workers.discard(shard_index)
+            else:  # 'error'
+                raise RuntimeError(f"Worker process {shard_index} failed: {payload[0]}")
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+    return completed_queries, merged_aggregator, connection_stats_by_resolver
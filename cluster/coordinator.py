@@ -0,0 +1,203 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from config.domain_source import DomainSource
+from config.settings import CLUSTER_BATCH_SIZE, CLUSTER_IDLE_POLL_SECONDS, CLUSTER_MESSAGE_LIMIT_BYTES
+from dns_client.query_pipeline import iter_work_items
+from data.models import DnsResolver, QueryResult, WorkItem
+from cluster.protocol import encode_message, read_message, result_from_dict
+
+_WORKER_SHUTDOWN_SECONDS = 5.0  # How long finished workers get to disconnect before their connections are dropped
+
+
+class _VantageQueue:
+    """
+    The work of one vantage point: the full domain x resolver matrix for every round,
+    generated lazily and shared by all workers that joined with that vantage ID.
+    A round is only handed out once every query of the previous round has been reported
+    and `round_interval_seconds` have passed since; until then `take` returns nothing.
+    """
+    def __init__(self, rounds: List[Iterator[WorkItem]], round_interval_seconds: float = 0.0):
+        self._rounds = deque(rounds)
+        self._work_items = self._rounds.popleft()
+        self._round_interval_seconds = round_interval_seconds
+        self._next_round_at: Optional[float] = None
+        self._returned: deque = deque()  # Items of batches whose worker left before reporting them
+        self._round_drained = False
+        self.pending_batches = 0
+
+    def take(self, count: int) -> List[WorkItem]:
+        items = []
+        while self._returned and len(items) < count:
+            items.append(self._returned.popleft())
+        if self._round_drained and self._rounds and not items and self.pending_batches == 0:
+            self._start_next_round_when_due()
+        if not self._round_drained and len(items) < count:
+            new_items = list(itertools.islice(self._work_items, count - len(items)))
+            self._round_drained = len(new_items) < count - len(items)
+            items.extend(new_items)
+        return items
+
+    def _start_next_round_when_due(self):
+        now = time.monotonic()
+        if self._next_round_at is None:
+            self._next_round_at = now + self._round_interval_seconds
+        if now >= self._next_round_at:
+            self._work_items = self._rounds.popleft()
+            self._round_drained = False
+            self._next_round_at = None
+
+    def give_back(self, items: Iterable[WorkItem]):
+        self._returned.extend(items)
+
+    @property
+    def complete(self) -> bool:
+        return self._round_drained and not self._rounds and not self._returned and self.pending_batches == 0
+
+
+def _work_key(domain_name: str, resolver_url: str, sample_round: int) -> Tuple[str, str, int]:
+    return domain_name, resolver_url, sample_round
+
+
+class ClusterCoordinator:
+    """
+    Hands out domain x resolver work batches to cluster workers over TCP and collects their results.
+    Every vantage ID gets the full matrix, so the vantage points can be compared; workers joining with
+    the same vantage ID split that vantage point's work between them. Results are tagged with the
+    worker's vantage ID and passed to `on_result` as they stream in. Work of a worker that disconnects
+    before reporting it is handed out again. Sampling rounds run one after another, `round_interval_seconds` apart.
+    """
+    def __init__(self,
+                 vantage_ids: List[str],
+                 domain_source: DomainSource,
+                 resolvers: List[DnsResolver],
+                 rounds: int,
+                 worker_config: Dict,
+                 on_result: Callable[[QueryResult], None],
+                 batch_size: int = CLUSTER_BATCH_SIZE,
+                 round_interval_seconds: float = 0.0):
+        self._queues = {
+            vantage_id: _VantageQueue(
+                [iter_work_items(domain_source, resolvers, sample_round) for sample_round in range(rounds)],
+                round_interval_seconds
+            )
+            for vantage_id in vantage_ids
+        }
+        self._resolvers = resolvers
+        self._resolver_indexes = {resolver.url: index for index, resolver in enumerate(resolvers)}
+        self._worker_config = worker_config
+        self._on_result = on_result
+        self._batch_size = batch_size
+        self._batch_ids = itertools.count()
+        self._finished = asyncio.Event()
+        self._connections: Set[asyncio.Task] = set()
+        self.completed_queries = 0
+
+    async def run(self, host: str, port: int) -> int:
+        """Serves workers until every vantage point has completed its work. Returns the number of completed queries."""
+        server = await asyncio.start_server(self._handle_worker, host or None, port, limit=CLUSTER_MESSAGE_LIMIT_BYTES)
+        bound_address = server.sockets[0].getsockname()
+        print(f"Coordinator listening on {bound_address[0]}:{bound_address[1]} for vantage points: "
+              f"{', '.join(self._queues)}")
+        async with server:
+            await self._finished.wait()
+            # Connected workers are told they are done on their next request and then disconnect
+            if self._connections:
+                _, still_connected = await asyncio.wait(self._connections, timeout=_WORKER_SHUTDOWN_SECONDS)
+                for connection in still_connected:
+                    connection.cancel()
+                await asyncio.gather(*still_connected, return_exceptions=True)
+        return self.completed_queries
+
+    def _check_finished(self):
+        if all(vantage_queue.complete for vantage_queue in self._queues.values()):
+            self._finished.set()
+
+    def _encode_batch(self, batch_id: int, items: List[WorkItem]) -> bytes:
+        return encode_message({
+            'type': 'batch',
+            'batch_id': batch_id,
+            'items': [[item.domain.name, item.domain.category, self._resolver_indexes[item.resolver.url], item.sample_round]
+                      for item in items],
+        })
+
+    async def _handle_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info('peername')
+        worker_name = f"{peer[0]}:{peer[1]}" if peer else "worker"
+        in_flight: Dict[int, Dict[Tuple[str, str, int], WorkItem]] = {}  # Batch ID -> unreported items
+        vantage_queue = None
+        self._connections.add(asyncio.current_task())
+        try:
+            hello = await read_message(reader)
+            if hello is None:
+                return
+            vantage_id = hello.get('vantage_id')
+            if hello.get('type') != 'hello' or vantage_id not in self._queues:
+                writer.write(encode_message({
+                    'type': 'error',
+                    'message': f"unknown vantage ID {vantage_id!r}; expected one of: {', '.join(self._queues)}",
+                }))
+                await writer.drain()
+                print(f"Warning: Rejected worker {worker_name} with unknown vantage ID {vantage_id!r}.")
+                return
+            vantage_queue = self._queues[vantage_id]
+            writer.write(encode_message({
+                'type': 'config',
+                'resolvers': [[resolver.url, resolver.name, resolver.doh_format, resolver.max_qps]
+                              for resolver in self._resolvers],
+                **self._worker_config,
+            }))
+            await writer.drain()
+            print(f"Worker {worker_name} joined as vantage point '{vantage_id}'.")
+
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                kind = message.get('type')
+                if kind == 'request_batch':
+                    items = vantage_queue.take(self._batch_size)
+                    if items:
+                        batch_id = next(self._batch_ids)
+                        in_flight[batch_id] = {
+                            _work_key(item.domain.name, item.resolver.url, item.sample_round): item for item in items
+                        }
+                        vantage_queue.pending_batches += 1
+                        writer.write(self._encode_batch(batch_id, items))
+                    elif vantage_queue.complete:
+                        writer.write(encode_message({'type': 'done'}))
+                        self._check_finished()
+                    else:  # Other workers of this vantage point still hold batches that may come back
+                        writer.write(encode_message({'type': 'wait', 'seconds': CLUSTER_IDLE_POLL_SECONDS}))
+                    await writer.drain()
+                elif kind == 'result':
+                    pending_items = in_flight.get(message['batch_id'])
+                    result = result_from_dict(message['result'])
+                    key = _work_key(result.domain, result.resolver_url, result.sample_round)
+                    if pending_items is None or pending_items.pop(key, None) is None:
+                        continue  # Not an outstanding item of this worker, e.g. a duplicate
+                    result.vantage_id = vantage_id
+                    self.completed_queries += 1
+                    self._on_result(result)
+                elif kind == 'batch_done':
+                    pending_items = in_flight.pop(message['batch_id'], None)
+                    if pending_items is not None:
+                        vantage_queue.pending_batches -= 1
+                        vantage_queue.give_back(pending_items.values())  # Items the worker did not report
+                        self._check_finished()
+        except (ConnectionError, ValueError, KeyError, TypeError) as e:
+            print(f"Warning: Lost worker {worker_name}: {type(e).__name__}: {e}")
+        except asyncio.CancelledError:
+            pass  # Still connected when the run completed; ending the handler quietly avoids asyncio's callback error
+        finally:
+            if in_flight:
+                requeued = sum(len(pending_items) for pending_items in in_flight.values())
+                vantage_queue.pending_batches -= len(in_flight)
+                for pending_items in in_flight.values():
+                    vantage_queue.give_back(pending_items.values())
+                print(f"Warning: Worker {worker_name} left with {requeued} unfinished queries; they will be "
+                      f"handed to another worker of the same vantage point.")
+            writer.close()
+            self._connections.discard(asyncio.current_task())
@@ -0,0 +1,39 @@
+import json
+from typing import Any, Dict, Optional, Tuple
+from data.models import QueryResult
+from utils.result_sinks import RESULT_FIELDS
+
+# Coordinator and workers exchange newline-delimited JSON messages over TCP:
+#   worker -> coordinator: {"type": "hello", "vantage_id": ...}, {"type": "request_batch"},
+#                          {"type": "result", "batch_id": ..., "result": {...}}, {"type": "batch_done", "batch_id": ...}
+#   coordinator -> worker: {"type": "config", ...}, {"type": "batch", "batch_id": ..., "items": [...]},
+#                          {"type": "wait", "seconds": ...}, {"type": "done"}, {"type": "error", "message": ...}
+# A batch item is [domain, category, resolver index, sample round].
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+async def read_message(reader) -> Optional[Dict[str, Any]]:
+    """Reads the next message from an asyncio StreamReader, or returns None when the peer disconnected."""
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def result_to_dict(result: QueryResult) -> Dict[str, Any]:
+    return {name: getattr(result, name) for name in RESULT_FIELDS}
+
+
+def result_from_dict(data: Dict[str, Any]) -> QueryResult:
+    return QueryResult(**{name: data[name] for name in RESULT_FIELDS if name in data})
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """Parses 'HOST:PORT' (or ':PORT' for all interfaces) into a (host, port) tuple."""
+    host, separator, port = address.rpartition(':')
+    if not separator or not port.isdigit():
+        raise ValueError(f"invalid address '{address}': expected HOST:PORT")
+    return host, int(port)
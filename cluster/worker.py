@@ -0,0 +1,127 @@
+import asyncio
+from config.settings import CLUSTER_MESSAGE_LIMIT_BYTES, CLUSTER_PREFETCH_BATCHES
+from dns_client.doh_client import DohClient
+from dns_client.query_pipeline import run_query_pipeline
+from dns_client.concurrency_controller import AdaptiveConcurrencyController
+from dns_client.rate_limiter import ResolverRateLimiter
+from dns_client.circuit_breaker import ResolverCircuitBreaker
+from dns_client.retry_policy import RetryPolicy
+from data.models import DnsResolver, DomainConfig, QueryResult, WorkItem
+from cluster.protocol import encode_message, read_message, result_to_dict
+
+
+async def run_worker(host: str, port: int, vantage_id: str) -> int:
+    """
+    Joins a cluster coordinator as a worker for `vantage_id` and runs the work batches it hands out
+    until the vantage point is complete. Query settings (resolvers, timeout, concurrency, HTTP/2, rate limits)
+    come from the coordinator; every raw result is streamed back as soon as it completes, and
+    blocking detection and statistics are done by the coordinator.
+    Returns the number of completed queries.
+    """
+    reader, writer = await asyncio.open_connection(host, port, limit=CLUSTER_MESSAGE_LIMIT_BYTES)
+    try:
+        writer.write(encode_message({'type': 'hello', 'vantage_id': vantage_id}))
+        await writer.drain()
+        config = await read_message(reader)
+        if config is None:
+            raise ConnectionError("coordinator closed the connection")
+        if config['type'] == 'error':
+            raise RuntimeError(f"coordinator rejected the worker: {config['message']}")
+
+        resolvers = [DnsResolver(url=url, name=name, doh_format=doh_format, max_qps=max_qps)
+                     for url, name, doh_format, max_qps in config['resolvers']]
+        concurrency_limit = config['concurrency_limit']
+        rate_limiter = None
+        if config['max_qps'] is not None or config['learn_rate_limits'] or any(resolver.max_qps for resolver in resolvers):
+            rate_limiter = ResolverRateLimiter(default_max_qps=config['max_qps'], learn=config['learn_rate_limits'])
+        circuit_breaker = None
+        if config['circuit_breaker_failures']:
+            circuit_breaker = ResolverCircuitBreaker(config['circuit_breaker_failures'],
+                                                     config['circuit_breaker_probe_interval_seconds'])
+        retry_policy = RetryPolicy(config['retries'], config['retry_backoff_seconds']) if config['retries'] else None
+        doh_client = DohClient(http2=config['http2'], max_connections_per_resolver=concurrency_limit,
+                               rate_limiter=rate_limiter, circuit_breaker=circuit_breaker, retry_policy=retry_policy,
+                               dynamic_timeouts=config['dynamic_timeouts'], hedge_requests=config['hedge_requests'])
+        semaphore = asyncio.Semaphore(concurrency_limit)
+        concurrency_controller = None
+        if config['adaptive_concurrency']:
+            concurrency_controller = AdaptiveConcurrencyController(max_limit=doh_client.slots_per_resolver)
+        print(f"Joined coordinator {host}:{port} as vantage point '{vantage_id}' "
+              f"({len(resolvers)} resolvers, concurrency {concurrency_limit}).")
+
+        # One long-lived pipeline drains work streams that are refilled while earlier batches are still
+        # in flight, so concurrency never drops to zero between batches
+        if concurrency_controller is not None:
+            streams = {resolver.url: asyncio.Queue() for resolver in resolvers}
+        else:
+            streams = {None: asyncio.Queue()}
+        batch_slots = asyncio.Semaphore(CLUSTER_PREFETCH_BATCHES)
+        remaining_by_batch = {}
+        outstanding = {}
+
+        async def iter_stream(stream: asyncio.Queue):
+            while True:
+                item = await stream.get()
+                if item is None:
+                    return
+                yield item
+
+        async def fetch_batches():
+            try:
+                while True:
+                    await batch_slots.acquire()
+                    writer.write(encode_message({'type': 'request_batch'}))
+                    await writer.drain()
+                    message = await read_message(reader)
+                    if message is None:
+                        raise ConnectionError("coordinator closed the connection")
+                    if message['type'] == 'done':
+                        break
+                    if message['type'] == 'wait':
+                        batch_slots.release()
+                        await asyncio.sleep(message['seconds'])
+                        continue
+
+                    batch_id = message['batch_id']
+                    remaining_by_batch[batch_id] = len(message['items'])
+                    for name, category, resolver_index, sample_round in message['items']:
+                        resolver = resolvers[resolver_index]
+                        outstanding[(name, resolver.url, sample_round)] = batch_id
+                        stream = streams[resolver.url if concurrency_controller is not None else None]
+                        stream.put_nowait(WorkItem(domain=DomainConfig(name=name, category=category),
+                                                   resolver=resolver, sample_round=sample_round))
+            finally:
+                for stream in streams.values():
+                    stream.put_nowait(None)
+
+        def send_result(result: QueryResult):
+            batch_id = outstanding.pop((result.domain, result.resolver_url, result.sample_round))
+            writer.write(encode_message({'type': 'result', 'batch_id': batch_id, 'result': result_to_dict(result)}))
+            remaining_by_batch[batch_id] -= 1
+            if not remaining_by_batch[batch_id]:
+                del remaining_by_batch[batch_id]
+                writer.write(encode_message({'type': 'batch_done', 'batch_id': batch_id}))
+                batch_slots.release()
+
+        fetcher = asyncio.ensure_future(fetch_batches())
+        pipeline = asyncio.ensure_future(run_query_pipeline(
+            doh_client=doh_client,
+            work_items={key: iter_stream(stream) for key, stream in streams.items()},
+            timeout_seconds=config['timeout_seconds'],
+            semaphore=semaphore,
+            on_result=send_result,
+            worker_count=concurrency_limit,
+            concurrency_controller=concurrency_controller
+        ))
+        try:
+            _, completed_queries = await asyncio.gather(fetcher, pipeline)
+            await writer.drain()
+        finally:
+            fetcher.cancel()
+            pipeline.cancel()
+            await doh_client.close()
+    finally:
+        writer.close()
+
+    print(f"Vantage point '{vantage_id}': {completed_queries} queries completed.")
+    return completed_queries
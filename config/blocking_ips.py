@@ -1,7 +1,10 @@
 import ipaddress
-from typing import List
+import re
+from typing import List, Tuple
 from data.models import BlockingIpRange
-from utils.ip_utils import is_valid_ipv4
+from utils.ip_utils import parse_ipv4_interval, merge_ipv4_intervals
+
+_RANGE_DASH = re.compile(r'\s*-\s*')  # Spaces around a range's dash are part of the entry
 
 
 def load_blocking_ip_ranges() -> List[BlockingIpRange]:
@@ -29,21 +32,36 @@ def load_blocking_ip_ranges() -> List[BlockingIpRange]:
     return ranges
 
 
-def load_custom_blocking_ips(file_path: str) -> List[str]:
+def load_custom_blocking_ips(file_path: str) -> List[Tuple[int, int]]:
     """
-    Loads user-defined specific blocking IPv4 addresses from a file.
-    Each IP address should be on a new line. Invalid IPs are ignored.
+    Loads user-defined blocking IPv4 addresses from a file, such as a block-page or sinkhole feed.
+    Each line holds a single address, a CIDR block (192.0.2.0/24) or an inclusive range
+    (192.0.2.10-192.0.2.20, spaces around the dash allowed); text after '#' and any text
+    after the entry itself is ignored.
+    Entries are deduplicated and merged at load time and returned as sorted, non-overlapping
+    integer (start, end) intervals. Invalid lines are skipped with a warning.
     """
-    custom_ips = []
+    intervals = []
+    invalid_lines = 0
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             for line in f:
-                ip_str = line.strip()
-                if ip_str and is_valid_ipv4(ip_str):
-                    custom_ips.append(ip_str)
+                entry = line.split('#', 1)[0].strip()
+                if not entry:
+                    continue
+                interval = parse_ipv4_interval(_RANGE_DASH.sub('-', entry).split(None, 1)[0])
+                if interval is None:
+                    invalid_lines += 1
+                else:
+                    intervals.append(interval)
     except FileNotFoundError:
         print(f"Warning: Custom blocking IPs file not found at '{file_path}'. No custom IPs loaded.")
     except Exception as e:
         print(f"Error loading custom blocking IPs from '{file_path}': {e}")
-    return custom_ips
 
+    if invalid_lines:
+        print(f"Warning: Ignored {invalid_lines} invalid lines in custom blocking IPs file '{file_path}'.")
+    merged_intervals = merge_ipv4_intervals(intervals)
+    if intervals:
+        print(f"Loaded {len(intervals)} custom blocking entries, merged into {len(merged_intervals)} ranges.")
+    return merged_intervals
@@ -1,11 +1,12 @@
-from typing import List, Dict, Optional
+from typing import List, Dict
 from pathlib import Path
-from data.models import DomainConfig, DomainCategory
+from data.models import DomainConfig
 
-def load_domains(initial_domains_raw: List[Dict[str, str]], additional_domains_path: Optional[str] = None, target_count: int = 100) -> List[DomainConfig]:
+def load_builtin_domains(initial_domains_raw: List[Dict[str, str]], target_count: int = 100) -> List[DomainConfig]:
     """
-    Loads and categorizes a list of 100 domain names, ensuring unique entries and categories.
+    Loads and categorizes the built-in list of 100 domain names, ensuring unique entries and categories.
     Expands with generic domains if target_count is not met.
+    Domains from a user-supplied file are streamed separately by config.domain_source.DomainSource.
     """
     all_domains: Dict[str, DomainConfig] = {}
 
@@ -29,13 +30,13 @@ def load_domains(initial_domains_raw: List[Dict[str, str]], additional_domains_p
 
     for domain_name, category in explicit_domains:
         name_lower = domain_name.lower()
-        all_domains[name_lower] = DomainConfig(name=name_lower, category=DomainCategory(category))
+        all_domains[name_lower] = DomainConfig(name=name_lower, category=category)
 
     # Override with initial_domains_raw if provided for custom entries
     for item in initial_domains_raw:
         name = item['name'].lower()
         category = item['category']
-        all_domains[name] = DomainConfig(name=name, category=DomainCategory(category))
+        all_domains[name] = DomainConfig(name=name, category=category)
 
     # 2. Add generic domains to fill up to target_count
     generic_domains_pool = [
@@ -138,25 +139,9 @@ def load_domains(initial_domains_raw: List[Dict[str, str]], additional_domains_p
             break
         name = domain_name.lower()
         if name not in all_domains:
-            all_domains[name] = DomainConfig(name=name, category=DomainCategory(category))
+            all_domains[name] = DomainConfig(name=name, category=category)
 
-    # 3. Load additional domains from file if provided
-    if additional_domains_path:
-        try:
-            with open(additional_domains_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    domain_name = line.strip().lower()
-                    if domain_name and domain_name not in all_domains:
-                        # Assign default 'Questionable' category for file-loaded domains if not already specified
-                        all_domains[domain_name] = DomainConfig(name=domain_name, category="Questionable")
-                        if len(all_domains) >= target_count:
-                            break
-        except FileNotFoundError:
-            print(f"Warning: Additional domains file not found at '{additional_domains_path}'. Skipping.")
-        except Exception as e:
-            print(f"Error loading additional domains from '{additional_domains_path}': {e}")
-
-    # 4. Ensure we have exactly target_count unique domains (or as close as possible)
+    # 3. Ensure we have exactly target_count unique domains (or as close as possible)
     final_domains: List[DomainConfig] = list(all_domains.values())
 
     # Sort for consistent output if trimming is needed
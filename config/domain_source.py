@@ -0,0 +1,75 @@
+import csv
+import os
+from itertools import chain
+from typing import Iterator, List, Optional, Set
+from data.models import DomainConfig, DomainCategory
+from config.settings import ALL_DOMAIN_CATEGORIES, DEFAULT_FILE_DOMAIN_CATEGORY
+
+_CATEGORIES_BY_LOWER_NAME = {category.lower(): category for category in ALL_DOMAIN_CATEGORIES}
+
+
+class DomainSource:
+    """
+    Lazily streams the domains to test: the built-in list first, then the domains file.
+    The file is read line by line on every pass, so huge lists (top-1M style) are never
+    materialized. It may be a plain list (one domain per line) or a CSV with
+    rank,domain[,category] rows such as the Tranco or Umbrella lists; a header row is skipped.
+    Duplicates are dropped using a set of 64-bit name hashes rather than the names themselves.
+    The source can be iterated repeatedly, e.g. once per sampling round, in the same order.
+    """
+    def __init__(self,
+                 builtin_domains: List[DomainConfig],
+                 domains_path: Optional[str] = None,
+                 max_domains: Optional[int] = None):
+        self._builtin_domains = builtin_domains
+        self._domains_path = domains_path
+        self._max_domains = max_domains
+        self.domain_count: Optional[int] = None  # Unique domains yielded by the last complete pass
+        if domains_path and not os.path.exists(domains_path):
+            print(f"Warning: Additional domains file not found at '{domains_path}'. Skipping.")
+            self._domains_path = None
+
+    def __iter__(self) -> Iterator[DomainConfig]:
+        seen_hashes: Set[int] = set()
+        count = 0
+        for domain in chain(self._builtin_domains, self._iter_file()):
+            if self._max_domains is not None and count >= self._max_domains:
+                break
+            name_hash = hash(domain.name)  # 64-bit; collisions are negligible even for millions of names
+            if name_hash in seen_hashes:
+                continue
+            seen_hashes.add(name_hash)
+            count += 1
+            yield domain
+        self.domain_count = count
+
+    def _iter_file(self) -> Iterator[DomainConfig]:
+        if not self._domains_path:
+            return
+        invalid_categories = 0
+        try:
+            with open(self._domains_path, 'r', encoding='utf-8', newline='') as f:
+                for row in csv.reader(f):
+                    if not row or row[0].lstrip().startswith('#'):
+                        continue
+                    category: DomainCategory = DEFAULT_FILE_DOMAIN_CATEGORY
+                    if len(row) == 1:
+                        domain_name = row[0]
+                    elif row[0].strip().isdigit():  # rank,domain[,category]
+                        domain_name = row[1]
+                        if len(row) > 2 and row[2].strip():
+                            matched_category = _CATEGORIES_BY_LOWER_NAME.get(row[2].strip().lower())
+                            if matched_category is None:
+                                invalid_categories += 1
+                            else:
+                                category = matched_category
+                    else:
+                        continue  # Header row
+                    domain_name = domain_name.strip().lower()
+                    if domain_name:
+                        yield DomainConfig(name=domain_name, category=category)
+        except Exception as e:
+            print(f"Error loading additional domains from '{self._domains_path}': {e}")
+        if invalid_categories and self.domain_count is None:  # Warn on the first pass only
+            print(f"Warning: {invalid_categories} domains in '{self._domains_path}' have an unknown category "
+                  f"and were assigned '{DEFAULT_FILE_DOMAIN_CATEGORY}'.")
@@ -1,12 +1,15 @@
 import re
 from typing import List
-from data.models import DnsResolver
+from data.models import DnsResolver, DohFormat
+from config.settings import DEFAULT_DOH_FORMAT, ALL_DOH_FORMATS
 
 
-def load_resolvers(file_path: str) -> List[DnsResolver]:
+def load_resolvers(file_path: str, default_doh_format: DohFormat = DEFAULT_DOH_FORMAT) -> List[DnsResolver]:
     """
     Loads and validates a list of DoH resolver URLs from a file.
-    Each URL should be on a new line. Invalid URLs are ignored.
+    Each URL should be on a new line, optionally followed by a DoH format
+    ('json', 'wire-get' or 'wire-post') and a request rate cap such as 'qps=20'.
+    Invalid URLs are ignored.
     """
     resolvers = []
     # Basic URL validation regex - more robust validation would use a proper URL parsing library
@@ -16,15 +19,33 @@ def load_resolvers(file_path: str) -> List[DnsResolver]:
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             for line in f:
-                url = line.strip()
-                if url and url_regex.match(url):
+                parts = line.split()
+                if not parts:
+                    continue
+                url = parts[0]
+                options = [option for option in parts[1:] if not option.lower().startswith('qps=')]
+                max_qps = None
+                for option in parts[1:]:
+                    if option.lower().startswith('qps='):
+                        try:
+                            max_qps = float(option[4:])
+                        except ValueError:
+                            pass
+                        if max_qps is None or not max_qps > 0:
+                            print(f"Warning: Invalid rate limit '{option}' for '{url}' ignored.")
+                            max_qps = None
+                doh_format = options[0].lower() if options else default_doh_format
+                if doh_format not in ALL_DOH_FORMATS:
+                    print(f"Warning: Unknown DoH format '{doh_format}' for '{url}', using '{default_doh_format}'.")
+                    doh_format = default_doh_format
+                if url_regex.match(url):
                     # Derive a simple name from the URL or use URL itself
                     name = url.split('//')[-1].split('/')[0]
-                    resolvers.append(DnsResolver(url=url, name=name))
-                elif url:
+                    resolvers.append(DnsResolver(url=url, name=name, doh_format=doh_format, max_qps=max_qps))
+                else:
                     print(f"Warning: Invalid or malformed resolver URL skipped: '{url}'")
     except FileNotFoundError:
         print(f"Error: Resolver list file not found at '{file_path}'. Please create it with DoH URLs.")
     except Exception as e:
         print(f"Error loading resolvers from '{file_path}': {e}")
-    return resolvers
\ No newline at end of file
+    return resolvers
@@ -1,9 +1,57 @@
 from typing import List
-from data.models import DomainCategory
+from data.models import DomainCategory, DohFormat
 
 
 DEFAULT_OUTPUT_FILE = "dns_analysis_report.xlsx"
 DEFAULT_CONCURRENCY_LIMIT = 20
 DEFAULT_TIMEOUT_SECONDS = 5.0
+PIPELINE_QUEUE_SIZE_PER_WORKER = 2  # Work items buffered ahead of the query workers
+PROGRESS_REPORT_INTERVAL = 1000  # Print a progress line every N completed queries
 
-ALL_DOMAIN_CATEGORIES: List[DomainCategory] = ['Useful', 'Questionable', 'Useless']
\ No newline at end of file
+# Adaptive (AIMD) per-resolver concurrency windows; the upper bound is --concurrency
+ADAPTIVE_INITIAL_LIMIT = 4
+ADAPTIVE_MIN_LIMIT = 1
+ADAPTIVE_BACKOFF_FACTOR = 0.5  # Multiplicative decrease on timeouts, 429s or latency inflation
+ADAPTIVE_LATENCY_TOLERANCE = 2.0  # Recent latency above this multiple of the long-term baseline counts as inflation
+ADAPTIVE_LANE_QUEUE_SIZE = 1000  # Work items queued per resolver lane, so fast resolvers can run ahead of a slow one
+LATENCY_TRACKER_WINDOW = 200  # Recent answered-request latencies kept per resolver for dynamic timeouts and hedging
+LATENCY_TRACKER_MIN_SAMPLES = 20  # Answers needed before a resolver's dynamic timeout and hedging delay apply
+DYNAMIC_TIMEOUT_P99_MULTIPLIER = 4.0  # A dynamic timeout is this multiple of the resolver's recent p99 latency
+DYNAMIC_TIMEOUT_MIN_SECONDS = 1.0  # Dynamic timeouts never go below this
+HEDGE_MAX_REQUEST_FRACTION = 0.1  # Hedged duplicates never exceed this share of a resolver's requests
+DEFAULT_RETRY_BACKOFF_SECONDS = 0.1  # Backoff ceiling before the first retry; doubles with every further retry
+RETRY_MAX_BACKOFF_SECONDS = 2.0  # Upper bound of the retry backoff ceiling
+DEFAULT_CIRCUIT_BREAKER_PROBE_INTERVAL_SECONDS = 10.0  # An open circuit lets one probe query through this often
+RATE_LIMIT_BURST_SECONDS = 0.1  # A resolver's token bucket holds at most this many seconds of requests (and at least one)
+RATE_LIMIT_MIN_QPS = 0.5  # Learned rate limits never drop below this
+RATE_LIMIT_BACKOFF_FACTOR = 0.5  # Multiplicative decrease of a learned rate limit on HTTP 429
+RATE_LIMIT_RECOVERY_PER_SECOND = 0.05  # While requests succeed, a learned rate limit grows by this fraction per second
+RATE_LIMIT_DEFAULT_RETRY_AFTER_SECONDS = 1.0  # Pause after HTTP 429 without a Retry-After header
+RATE_LIMIT_MAX_RETRY_AFTER_SECONDS = 60.0  # Longer Retry-After values are capped to this
+DEFAULT_DOH_FORMAT: DohFormat = 'json'
+DEFAULT_SAMPLING_ROUNDS = 1
+DEFAULT_RESULT_STORE = 'memory'
+ALL_RESULT_STORES = ['memory', 'columnar']
+DEFAULT_ROUND_INTERVAL_SECONDS = 0.0
+DEFAULT_KEEPALIVE_EXPIRY_SECONDS = 30.0
+MAX_HTTP1_CONNECTIONS_PER_RESOLVER = 16  # Larger pools cost more CPU per request (httpcore scans them) than they gain
+SINK_FLUSH_INTERVAL_ROWS = 1000  # CSV/JSONL sinks flush to disk every N results
+PARQUET_ROW_GROUP_SIZE = 50000  # Results buffered per Parquet row group
+ALL_RESULT_SINK_FORMATS = ['csv', 'jsonl', 'parquet', 'excel']
+DEFAULT_WORKER_COUNT = 1
+WORKER_RESULT_BATCH_SIZE = 500  # Results a worker process sends to the parent per message
+SQLITE_COMMIT_INTERVAL_ROWS = 1000  # Persistent store commits every N results; a crash loses at most one batch
+CLUSTER_BATCH_SIZE = 200  # Work items the coordinator hands to a cluster worker at a time
+CLUSTER_PREFETCH_BATCHES = 2  # Unfinished batches a worker holds, so the next one starts before the last drains
+CLUSTER_IDLE_POLL_SECONDS = 0.5  # How long an idle cluster worker waits before asking for work again
+CLUSTER_MESSAGE_LIMIT_BYTES = 1024 * 1024  # Longest protocol line accepted between coordinator and workers
+DEFAULT_MONITOR_INTERVAL_SECONDS = 30.0  # Time between the starts of two monitoring cycles
+DEFAULT_MONITOR_SAMPLE_SIZE = 20  # Domains probed per monitoring cycle, rotating through the domain list
+MONITOR_WINDOWS_SECONDS = [60.0, 300.0, 3600.0]  # Rolling windows reported by the monitor: 1m, 5m, 1h
+ROLLING_WINDOW_BUCKETS = 12  # Time buckets per rolling window; windows slide in steps of window / buckets
+METRICS_LATENCY_BUCKETS_SECONDS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]  # Upper bounds of the /metrics latency histogram
+LATENCY_SKETCH_RELATIVE_ACCURACY = 0.01  # Latency percentiles from sketches are within 1% of the exact value
+
+ALL_DOMAIN_CATEGORIES: List[DomainCategory] = ['Useful', 'Questionable', 'Useless']
+DEFAULT_FILE_DOMAIN_CATEGORY: DomainCategory = 'Questionable'  # For domains file entries without a category
+ALL_DOH_FORMATS: List[DohFormat] = ['json', 'wire-get', 'wire-post']
\ No newline at end of file
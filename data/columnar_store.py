@@ -0,0 +1,204 @@
+import math
+import socket
+import struct
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional
+from data.models import QueryResult, QueryStatus, DomainCategory
+
+STATUS_CODES: List[QueryStatus] = ['Resolved', 'Blocked', 'Error', 'Skipped']
+_STATUS_TO_CODE: Dict[str, int] = {status: code for code, status in enumerate(STATUS_CODES)}
+_NO_ROW = -1
+_IPV4 = struct.Struct('!I')
+
+
+def _to_column_float(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+def _from_column_float(value: float) -> Optional[float]:
+    return None if value != value else value  # NaN marks a missing value
+
+
+class StringInterner:
+    """
+    Maps repeated strings (resolver URLs, domains, categories) to dense integer IDs.
+    """
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def intern(self, value: str) -> int:
+        value_id = self._ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self._ids[value] = value_id
+            self.values.append(value)
+        return value_id
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self._ids.get(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class ColumnarQueryStore:
+    """
+    Array-backed alternative to QueryStore for very large runs.
+    Each QueryResult field is kept in a typed column: interned integer IDs for resolvers,
+    domains, categories and error types, a byte status code, float latencies (NaN when
+    missing) and IPv4 addresses packed as 32-bit integers. QueryResult objects are only
+    rebuilt when results are read back through get_results.
+    Rows of the same resolver are chained through a 'next row' column, and (resolver, domain)
+    lookups use a sorted pair index built on first use, so neither scans the store.
+    """
+    def __init__(self):
+        self.resolvers = StringInterner()
+        self.domains = StringInterner()
+        self.categories = StringInterner()
+        self.error_types = StringInterner()  # ID 0 is reserved for "no error"
+        self.error_types.intern('')
+
+        self.resolver_ids = array('I')
+        self.domain_ids = array('I')
+        self.category_ids = array('H')
+        self.status_codes = array('B')
+        self.error_type_ids = array('B')
+        self.sample_rounds = array('H')
+        self.attempts = array('B')
+        self.hedged = array('B')
+        self.latency_ms = array('d')
+        self.queue_wait_ms = array('d')
+        self.connect_ms = array('d')
+        self.tls_ms = array('d')
+        self.ttfb_ms = array('d')
+        self.ip_offsets = array('Q', [0])  # Row i owns ips[ip_offsets[i]:ip_offsets[i + 1]]
+        self.ips = array('I')
+
+        self._next_row_same_resolver = array('q')
+        self._resolver_chain_ends: Dict[int, List[int]] = {}  # resolver ID -> [first row, last row]
+        self._pair_index_keys = array('Q')  # Sorted (resolver ID << 32 | domain ID) keys
+        self._pair_index_rows = array('I')  # Row of each key in _pair_index_keys
+
+    def __len__(self) -> int:
+        return len(self.status_codes)
+
+    def add_result(self, result: QueryResult):
+        """Appends a single QueryResult to the columns."""
+        row = len(self.status_codes)
+        resolver_id = self.resolvers.intern(result.resolver_url)
+        domain_id = self.domains.intern(result.domain)
+
+        self.resolver_ids.append(resolver_id)
+        self.domain_ids.append(domain_id)
+        self.category_ids.append(self.categories.intern(result.domain_category))
+        self.status_codes.append(_STATUS_TO_CODE[result.status])
+        self.error_type_ids.append(self.error_types.intern(result.error_type) if result.error_type else 0)
+        self.sample_rounds.append(result.sample_round)
+        self.attempts.append(min(result.attempts, 255))
+        self.hedged.append(result.hedged)
+        self.latency_ms.append(_to_column_float(result.latency_ms))
+        self.queue_wait_ms.append(_to_column_float(result.queue_wait_ms))
+        self.connect_ms.append(_to_column_float(result.connect_ms))
+        self.tls_ms.append(_to_column_float(result.tls_ms))
+        self.ttfb_ms.append(_to_column_float(result.ttfb_ms))
+        if len(result.resolved_ip_ints) == len(result.resolved_ips):
+            self.ips.extend(result.resolved_ip_ints)
+        else:  # Result not produced by DohClient; parse the strings here
+            for ip_str in result.resolved_ips:
+                self.ips.append(_IPV4.unpack(socket.inet_aton(ip_str))[0])
+        self.ip_offsets.append(len(self.ips))
+
+        self._next_row_same_resolver.append(_NO_ROW)
+        ends = self._resolver_chain_ends.get(resolver_id)
+        if ends is None:
+            self._resolver_chain_ends[resolver_id] = [row, row]
+        else:
+            self._next_row_same_resolver[ends[1]] = row
+            ends[1] = row
+
+    def _iter_resolver_rows(self, resolver_id: int) -> Iterator[int]:
+        ends = self._resolver_chain_ends.get(resolver_id)
+        row = ends[0] if ends else _NO_ROW
+        while row != _NO_ROW:
+            yield row
+            row = self._next_row_same_resolver[row]
+
+    def _iter_pair_rows(self, resolver_id: int, domain_id: int) -> Iterator[int]:
+        row_count = len(self.status_codes)
+        if len(self._pair_index_rows) != row_count:
+            # (Re)build the pair index; the stable sort keeps insertion order within a pair.
+            keys = [(resolver << 32) | domain for resolver, domain in zip(self.resolver_ids, self.domain_ids)]
+            order = sorted(range(row_count), key=keys.__getitem__)
+            self._pair_index_keys = array('Q', [keys[row] for row in order])
+            self._pair_index_rows = array('I', order)
+        key = (resolver_id << 32) | domain_id
+        position = bisect_left(self._pair_index_keys, key)
+        while position < row_count and self._pair_index_keys[position] == key:
+            yield self._pair_index_rows[position]
+            position += 1
+
+    def _row_to_result(self, row: int) -> QueryResult:
+        error_type_id = self.error_type_ids[row]
+        ip_ints = self.ips[self.ip_offsets[row]:self.ip_offsets[row + 1]]
+        return QueryResult(
+            domain=self.domains.values[self.domain_ids[row]],
+            resolver_url=self.resolvers.values[self.resolver_ids[row]],
+            resolved_ips=[socket.inet_ntoa(_IPV4.pack(ip)) for ip in ip_ints],
+            latency_ms=_from_column_float(self.latency_ms[row]),
+            status=STATUS_CODES[self.status_codes[row]],
+            domain_category=self.categories.values[self.category_ids[row]],
+            queue_wait_ms=_from_column_float(self.queue_wait_ms[row]),
+            connect_ms=_from_column_float(self.connect_ms[row]),
+            tls_ms=_from_column_float(self.tls_ms[row]),
+            ttfb_ms=_from_column_float(self.ttfb_ms[row]),
+            error_type=self.error_types.values[error_type_id] if error_type_id else None,
+            sample_round=self.sample_rounds[row],
+            attempts=self.attempts[row],
+            hedged=bool(self.hedged[row]),
+            resolved_ip_ints=ip_ints.tolist()
+        )
+
+    def get_results(self,
+                    resolver_url: Optional[str] = None,
+                    domain_name: Optional[str] = None,
+                    status: Optional[QueryStatus] = None,
+                    domain_category: Optional[DomainCategory] = None) -> List[QueryResult]:
+        """
+        Retrieves filtered QueryResult objects, rebuilt from the columns.
+        Filters are applied cumulatively.
+        """
+        resolver_id = self.resolvers.lookup(resolver_url) if resolver_url else None
+        domain_id = self.domains.lookup(domain_name) if domain_name else None
+        category_id = self.categories.lookup(domain_category) if domain_category else None
+        if (resolver_url and resolver_id is None) or (domain_name and domain_id is None) \
+                or (domain_category and category_id is None):
+            return []
+        status_code = _STATUS_TO_CODE[status] if status else None
+
+        if resolver_id is not None and domain_id is not None:
+            rows: Iterator[int] = self._iter_pair_rows(resolver_id, domain_id)
+        elif resolver_id is not None:
+            rows = self._iter_resolver_rows(resolver_id)
+        else:
+            rows = iter(range(len(self.status_codes)))
+
+        results = []
+        for row in rows:
+            if domain_id is not None and self.domain_ids[row] != domain_id:
+                continue
+            if status_code is not None and self.status_codes[row] != status_code:
+                continue
+            if category_id is not None and self.category_ids[row] != category_id:
+                continue
+            results.append(self._row_to_result(row))
+        return results
+
+    def get_all_resolvers(self) -> List[str]:
+        """Returns a list of all unique resolver URLs present in the store."""
+        return sorted(self.resolvers.values)
+
+    def get_all_domains(self) -> List[str]:
+        """Returns a list of all unique domain names present in the store."""
+        return sorted(self.domains.values)
@@ -1,10 +1,12 @@
 from typing import Literal, List, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import ipaddress
 
 
 DomainCategory = Literal['Useful', 'Questionable', 'Useless']
-QueryStatus = Literal['Resolved', 'Blocked', 'Error']
+QueryStatus = Literal['Resolved', 'Blocked', 'Error', 'Skipped']  # 'Skipped': not sent, the resolver's circuit was open
+QueryErrorType = Literal['timeout', 'connection', 'rate_limited', 'http_status', 'invalid_response']
+DohFormat = Literal['json', 'wire-get', 'wire-post']  # application/dns-json or RFC 8484 application/dns-message
 
 
 @dataclass
@@ -17,6 +19,8 @@ class DomainConfig:
 class DnsResolver:
     url: str
     name: str
+    doh_format: DohFormat = 'json'
+    max_qps: Optional[float] = None  # Per-resolver request rate cap; None uses the --max-qps default
 
 
 @dataclass
@@ -30,9 +34,38 @@ class QueryResult:
     domain: str
     resolver_url: str
     resolved_ips: List[str]
-    latency_ms: Optional[float]
+    latency_ms: Optional[float]  # Network time of the request itself, excluding queue wait
     status: QueryStatus
     domain_category: DomainCategory
+    queue_wait_ms: Optional[float] = None  # Time spent waiting for a concurrency slot
+    connect_ms: Optional[float] = None  # TCP connect, only when a new connection was opened
+    tls_ms: Optional[float] = None  # TLS handshake, only when a new connection was opened
+    ttfb_ms: Optional[float] = None  # From request start to response headers received
+    error_type: Optional[QueryErrorType] = None  # Set when status is 'Error'
+    sample_round: int = 0  # Round 0 is the cold sample, later rounds are warm (cached) samples
+    vantage_id: Optional[str] = None  # Vantage point of the cluster worker that ran the query
+    attempts: int = 1  # Requests sent for this query, including retries and hedged duplicates; 0 when skipped
+    hedged: bool = False  # Answered by a hedged duplicate; latency and TTFB run from the original send, no connect/TLS
+    # resolved_ips parsed once into integers by the client; derived fields are not exported by result sinks
+    resolved_ip_ints: List[int] = field(default_factory=list, repr=False, metadata={'derived': True})
+
+
+@dataclass
+class WorkItem:
+    domain: DomainConfig
+    resolver: DnsResolver
+    sample_round: int = 0
+
+
+@dataclass
+class ConnectionStats:
+    requests: int = 0                     # Requests that were written to a connection
+    new_connections: int = 0              # Connections opened (TCP connect) for those requests
+    reused_connection_requests: int = 0   # Requests served on an already-open connection
+    http2_requests: int = 0               # Requests that were sent over HTTP/2
+    retry_requests: int = 0               # Requests that retried a timed-out or failed attempt
+    hedged_requests: int = 0              # Duplicate requests sent because the first was slower than the resolver's p95
+    hedges_won: int = 0                   # Hedged requests that answered before the original
 
 
 # Inferred dataclasses for statistics, not present in original models.py
@@ -42,6 +75,16 @@ class PerformanceStats:
     max_latency_ms: Optional[float]
     median_latency_ms: Optional[float]
     avg_latency_ms: Optional[float]
+    sample_count: int = 0
+    p90_latency_ms: Optional[float] = None
+    p95_latency_ms: Optional[float] = None
+    p99_latency_ms: Optional[float] = None
+    stddev_latency_ms: Optional[float] = None
+    jitter_ms: Optional[float] = None  # Mean absolute difference between consecutive samples
+    avg_queue_wait_ms: Optional[float] = None
+    avg_connect_ms: Optional[float] = None
+    avg_tls_ms: Optional[float] = None
+    avg_ttfb_ms: Optional[float] = None
 
 
 @dataclass
@@ -51,6 +94,7 @@ class BlockingStats:
     blocked_queries: int
     error_queries: int
     overall_blocked_percentage: float  # Percentage of 'Blocked' out of (Resolved + Blocked)
+    skipped_queries: int = 0  # Short-circuited by the circuit breaker; not part of total_queries
 
 
 @dataclass
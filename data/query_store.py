@@ -1,17 +1,30 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from data.models import QueryResult, QueryStatus, DomainCategory
 
 
 class QueryStore:
     """
     In-memory repository for storing and retrieving QueryResult objects.
+    Results are indexed by resolver, domain, (resolver, domain), status and category
+    as they are added, so filtered lookups do not scan the whole store.
+    Results must not change status or category after being added.
     """
     def __init__(self):
         self._results: List[QueryResult] = []
+        self._by_resolver: Dict[str, List[QueryResult]] = {}
+        self._by_domain: Dict[str, List[QueryResult]] = {}
+        self._by_resolver_domain: Dict[Tuple[str, str], List[QueryResult]] = {}
+        self._by_status: Dict[QueryStatus, List[QueryResult]] = {}
+        self._by_category: Dict[DomainCategory, List[QueryResult]] = {}
 
     def add_result(self, result: QueryResult):
-        """Adds a single QueryResult object to the store."""
+        """Adds a single QueryResult object to the store and its indexes."""
         self._results.append(result)
+        self._by_resolver.setdefault(result.resolver_url, []).append(result)
+        self._by_domain.setdefault(result.domain, []).append(result)
+        self._by_resolver_domain.setdefault((result.resolver_url, result.domain), []).append(result)
+        self._by_status.setdefault(result.status, []).append(result)
+        self._by_category.setdefault(result.domain_category, []).append(result)
 
     def get_results(self,
                     resolver_url: Optional[str] = None,
@@ -20,25 +33,41 @@ class QueryStore:
                     domain_category: Optional[DomainCategory] = None) -> List[QueryResult]:
         """
         Retrieves filtered QueryResult objects from the store.
-        Filters are applied cumulatively.
+        Filters are applied cumulatively: the smallest matching index is looked up
+        and only its entries are checked against the remaining filters.
         """
-        filtered_results = self._results
+        candidates: List[Tuple[List[QueryResult], str]] = []
+        if resolver_url and domain_name:
+            candidates.append((self._by_resolver_domain.get((resolver_url, domain_name), []), 'resolver_domain'))
+        elif resolver_url:
+            candidates.append((self._by_resolver.get(resolver_url, []), 'resolver'))
+        elif domain_name:
+            candidates.append((self._by_domain.get(domain_name, []), 'domain'))
+        if status:
+            candidates.append((self._by_status.get(status, []), 'status'))
+        if domain_category:
+            candidates.append((self._by_category.get(domain_category, []), 'category'))
+
+        if not candidates:
+            return list(self._results)
 
-        if resolver_url:
+        filtered_results, used_index = min(candidates, key=lambda candidate: len(candidate[0]))
+
+        if resolver_url and used_index not in ('resolver', 'resolver_domain'):
             filtered_results = [r for r in filtered_results if r.resolver_url == resolver_url]
-        if domain_name:
+        if domain_name and used_index not in ('domain', 'resolver_domain'):
             filtered_results = [r for r in filtered_results if r.domain == domain_name]
-        if status:
+        if status and used_index != 'status':
             filtered_results = [r for r in filtered_results if r.status == status]
-        if domain_category:
+        if domain_category and used_index != 'category':
             filtered_results = [r for r in filtered_results if r.domain_category == domain_category]
 
-        return filtered_results
+        return list(filtered_results)
 
     def get_all_resolvers(self) -> List[str]:
         """Returns a list of all unique resolver URLs present in the store."""
-        return sorted(list({r.resolver_url for r in self._results}))
+        return sorted(self._by_resolver)
 
     def get_all_domains(self) -> List[str]:
         """Returns a list of all unique domain names present in the store."""
-        return sorted(list({r.domain for r in self._results}))
\ No newline at end of file
+        return sorted(self._by_domain)
@@ -0,0 +1,162 @@
+import sqlite3
+import time
+from typing import Iterator, List, Optional, Tuple
+from data.models import QueryResult, QueryStatus, DomainCategory
+from config.settings import SQLITE_COMMIT_INTERVAL_ROWS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS query_results (
+    run_id TEXT NOT NULL,
+    resolver_url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    sample_round INTEGER NOT NULL,
+    domain_category TEXT NOT NULL,
+    status TEXT NOT NULL,
+    resolved_ips TEXT NOT NULL,
+    latency_ms REAL,
+    queue_wait_ms REAL,
+    connect_ms REAL,
+    tls_ms REAL,
+    ttfb_ms REAL,
+    error_type TEXT,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    hedged INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (run_id, resolver_url, domain, sample_round)
+);
+"""
+
+_COLUMNS = ('domain, resolver_url, resolved_ips, latency_ms, status, domain_category, '
+            'queue_wait_ms, connect_ms, tls_ms, ttfb_ms, error_type, sample_round, attempts, hedged')
+
+
+def _row_to_result(row: Tuple) -> QueryResult:
+    (domain, resolver_url, resolved_ips, latency_ms, status, domain_category,
+     queue_wait_ms, connect_ms, tls_ms, ttfb_ms, error_type, sample_round, attempts, hedged) = row
+    return QueryResult(
+        domain=domain,
+        resolver_url=resolver_url,
+        resolved_ips=resolved_ips.split() if resolved_ips else [],
+        latency_ms=latency_ms,
+        status=status,
+        domain_category=domain_category,
+        queue_wait_ms=queue_wait_ms,
+        connect_ms=connect_ms,
+        tls_ms=tls_ms,
+        ttfb_ms=ttfb_ms,
+        error_type=error_type,
+        sample_round=sample_round,
+        attempts=attempts,
+        hedged=bool(hedged)
+    )
+
+
+class SqliteQueryStore:
+    """
+    Persistent, SQLite-backed result store with the same query API as QueryStore.
+    Every result is written as soon as it is added, keyed by run ID, resolver, domain and
+    sampling round, and committed in batches of `commit_interval_rows` (WAL journal), so an
+    interrupted run loses at most one uncommitted batch and can be resumed with the same run ID.
+    """
+    def __init__(self, db_path: str, run_id: str, commit_interval_rows: int = SQLITE_COMMIT_INTERVAL_ROWS):
+        self.run_id = run_id
+        self._connection = sqlite3.connect(db_path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(_SCHEMA)
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(query_results)")}
+        if 'attempts' not in columns:  # Database written before attempts were recorded
+            self._connection.execute("ALTER TABLE query_results ADD COLUMN attempts INTEGER NOT NULL DEFAULT 1")
+        if 'hedged' not in columns:  # Database written before hedge wins were recorded
+            self._connection.execute("ALTER TABLE query_results ADD COLUMN hedged INTEGER NOT NULL DEFAULT 0")
+        self._connection.execute(
+            "INSERT OR IGNORE INTO runs (run_id, created_at) VALUES (?, ?)", (run_id, time.time())
+        )
+        self._connection.commit()
+        self._commit_interval_rows = commit_interval_rows
+        self._pending_rows = 0
+
+    def add_result(self, result: QueryResult):
+        """Records a single QueryResult, replacing an earlier result for the same key."""
+        self._connection.execute(
+            "INSERT OR REPLACE INTO query_results (run_id, " + _COLUMNS + ") "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.run_id, result.domain, result.resolver_url, ' '.join(result.resolved_ips), result.latency_ms,
+             result.status, result.domain_category, result.queue_wait_ms, result.connect_ms, result.tls_ms,
+             result.ttfb_ms, result.error_type, result.sample_round, result.attempts, result.hedged)
+        )
+        self._pending_rows += 1
+        if self._pending_rows >= self._commit_interval_rows:
+            self.commit()
+
+    def commit(self):
+        """Makes all results added so far durable."""
+        self._connection.commit()
+        self._pending_rows = 0
+
+    def close(self):
+        self.commit()
+        self._connection.close()
+
+    def __len__(self) -> int:
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM query_results WHERE run_id = ?", (self.run_id,)
+        ).fetchone()[0]
+
+    def has_result(self, resolver_url: str, domain_name: str, sample_round: int = 0) -> bool:
+        """
+        Returns True if a result for this resolver, domain and round is already recorded in the run.
+        'Skipped' results do not count, so a resumed run queries them again and replaces them.
+        """
+        return self._connection.execute(
+            "SELECT 1 FROM query_results WHERE run_id = ? AND resolver_url = ? AND domain = ? AND sample_round = ? "
+            "AND status != 'Skipped'",
+            (self.run_id, resolver_url, domain_name, sample_round)
+        ).fetchone() is not None
+
+    def iter_results(self) -> Iterator[QueryResult]:
+        """Streams every recorded result of the run in insertion order, without loading them all."""
+        cursor = self._connection.execute(
+            "SELECT " + _COLUMNS + " FROM query_results WHERE run_id = ? ORDER BY rowid", (self.run_id,)
+        )
+        for row in cursor:
+            yield _row_to_result(row)
+
+    def get_results(self,
+                    resolver_url: Optional[str] = None,
+                    domain_name: Optional[str] = None,
+                    status: Optional[QueryStatus] = None,
+                    domain_category: Optional[DomainCategory] = None) -> List[QueryResult]:
+        """
+        Retrieves filtered QueryResult objects of the run.
+        Filters are applied cumulatively; resolver and domain lookups use the primary key.
+        """
+        conditions = ["run_id = ?"]
+        parameters: List = [self.run_id]
+        for column, value in (('resolver_url', resolver_url), ('domain', domain_name),
+                              ('status', status), ('domain_category', domain_category)):
+            if value:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        cursor = self._connection.execute(
+            "SELECT " + _COLUMNS + " FROM query_results WHERE " + " AND ".join(conditions) + " ORDER BY rowid",
+            parameters
+        )
+        return [_row_to_result(row) for row in cursor]
+
+    def get_all_resolvers(self) -> List[str]:
+        """Returns a list of all unique resolver URLs present in the run."""
+        cursor = self._connection.execute(
+            "SELECT DISTINCT resolver_url FROM query_results WHERE run_id = ? ORDER BY resolver_url", (self.run_id,)
+        )
+        return [row[0] for row in cursor]
+
+    def get_all_domains(self) -> List[str]:
+        """Returns a list of all unique domain names present in the run."""
+        cursor = self._connection.execute(
+            "SELECT DISTINCT domain FROM query_results WHERE run_id = ? ORDER BY domain", (self.run_id,)
+        )
+        return [row[0] for row in cursor]
@@ -0,0 +1,83 @@
+import time
+from typing import Callable, Dict, Optional
+from config.settings import DEFAULT_CIRCUIT_BREAKER_PROBE_INTERVAL_SECONDS
+
+# Outcomes that suggest the resolver is down or saturated; any other answer shows it is alive
+_FAILURE_ERROR_TYPES = ('timeout', 'connection')
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of a single resolver.
+    Closed: every query is sent. After `failure_threshold` consecutive timeouts or connection
+    errors it opens and queries fail fast instead of waiting for the full timeout. Every
+    `probe_interval_seconds` it goes half-open and lets exactly one probe query through:
+    if the resolver answers, the circuit closes; otherwise it stays open for another interval.
+    """
+    def __init__(self,
+                 failure_threshold: int,
+                 probe_interval_seconds: float = DEFAULT_CIRCUIT_BREAKER_PROBE_INTERVAL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self._failure_threshold = max(1, failure_threshold)
+        self._probe_interval_seconds = probe_interval_seconds
+        self._clock = clock
+        self._consecutive_failures = 0
+        self._open_until: Optional[float] = None  # None while closed
+        self._probe_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def is_open(self) -> bool:
+        """True while queries are short-circuited; a due half-open probe does not count as open."""
+        if self._open_until is None:
+            return False
+        return self._probe_in_flight or self._clock() < self._open_until
+
+    def allow_request(self) -> bool:
+        """Tells whether a query may be sent now; a True answer in the open state claims the half-open probe."""
+        if self._open_until is None:
+            return True
+        if self._probe_in_flight or self._clock() < self._open_until:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_outcome(self, error_type: Optional[str]):
+        """Feeds the outcome of a sent query (None when it succeeded) back into the breaker."""
+        if error_type not in _FAILURE_ERROR_TYPES:
+            self._consecutive_failures = 0
+            self._open_until = None
+            self._probe_in_flight = False
+            return
+        self._consecutive_failures += 1
+        if self._probe_in_flight:
+            self._probe_in_flight = False
+            self._open_until = self._clock() + self._probe_interval_seconds
+        elif self._open_until is None and self._consecutive_failures >= self._failure_threshold:
+            self._open_until = self._clock() + self._probe_interval_seconds
+            self.times_opened += 1
+
+
+class ResolverCircuitBreaker:
+    """
+    Keeps one CircuitBreaker per resolver URL, so a dead or saturated resolver is short-circuited
+    without affecting the others.
+    """
+    def __init__(self,
+                 failure_threshold: int,
+                 probe_interval_seconds: float = DEFAULT_CIRCUIT_BREAKER_PROBE_INTERVAL_SECONDS):
+        self._failure_threshold = failure_threshold
+        self._probe_interval_seconds = probe_interval_seconds
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker_for(self, resolver_url: str) -> CircuitBreaker:
+        """Returns the circuit breaker of the given resolver, creating it on first use."""
+        breaker = self._breakers.get(resolver_url)
+        if breaker is None:
+            breaker = CircuitBreaker(self._failure_threshold, self._probe_interval_seconds)
+            self._breakers[resolver_url] = breaker
+        return breaker
+
+    def get_times_opened(self) -> Dict[str, int]:
+        """Returns how often each resolver's circuit opened, keyed by resolver URL."""
+        return {url: breaker.times_opened for url, breaker in self._breakers.items()}
@@ -0,0 +1,142 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from data.models import QueryResult
+from config.settings import (
+    ADAPTIVE_INITIAL_LIMIT,
+    ADAPTIVE_MIN_LIMIT,
+    ADAPTIVE_BACKOFF_FACTOR,
+    ADAPTIVE_LATENCY_TOLERANCE
+)
+
+_SHORT_TERM_SMOOTHING = 0.1  # EWMA weight of the newest sample for the recent latency
+_LONG_TERM_SMOOTHING = 0.01  # EWMA weight of the newest sample for the baseline latency
+
+
+class AimdLimiter:
+    """
+    Concurrency window for a single resolver, adjusted like TCP congestion control.
+    The window grows by roughly one slot per window of healthy responses (additive increase)
+    and is cut by a constant factor on timeouts, HTTP 429 or latency inflation
+    (multiplicative decrease). Used as an async context manager around each query.
+    """
+    def __init__(self,
+                 initial_limit: int = ADAPTIVE_INITIAL_LIMIT,
+                 min_limit: int = ADAPTIVE_MIN_LIMIT,
+                 max_limit: int = ADAPTIVE_INITIAL_LIMIT,
+                 backoff_factor: float = ADAPTIVE_BACKOFF_FACTOR,
+                 latency_tolerance: float = ADAPTIVE_LATENCY_TOLERANCE):
+        self._min_limit = max(1, min_limit)
+        self._max_limit = max(self._min_limit, max_limit)
+        self._window = float(min(max(initial_limit, self._min_limit), self._max_limit))
+        self._backoff_factor = backoff_factor
+        self._latency_tolerance = latency_tolerance
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._baseline_latency_ms: Optional[float] = None
+        self._smoothed_latency_ms: Optional[float] = None
+        self._last_decrease_time = 0.0
+
+    @property
+    def limit(self) -> int:
+        """Current number of queries allowed in flight."""
+        return int(self._window)
+
+    async def __aenter__(self):
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return self
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # The slot was handed over just before cancellation
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self._release()
+
+    def _release(self):
+        self._in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        """Hands free slots directly to queued waiters, in arrival order."""
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    def record_result(self, result: QueryResult):
+        """Feeds a finished query's outcome back into the window."""
+        if result.error_type in ('timeout', 'rate_limited'):
+            self._decrease()
+            return
+        if result.latency_ms is None:
+            return  # Other errors say nothing about congestion
+
+        latency_ms = result.latency_ms
+        if self._smoothed_latency_ms is None:
+            self._smoothed_latency_ms = latency_ms
+            self._baseline_latency_ms = latency_ms
+        else:
+            self._smoothed_latency_ms += _SHORT_TERM_SMOOTHING * (latency_ms - self._smoothed_latency_ms)
+            self._baseline_latency_ms += _LONG_TERM_SMOOTHING * (latency_ms - self._baseline_latency_ms)
+
+        if self._smoothed_latency_ms > self._baseline_latency_ms * self._latency_tolerance:
+            self._decrease()
+        else:
+            self._window = min(self._max_limit, self._window + 1.0 / self._window)
+            self._wake_waiters()
+
+    def _decrease(self):
+        # Back off at most once per smoothed round trip, so that a burst of failures
+        # from the same window only counts as one congestion signal.
+        now = time.monotonic()
+        round_trip_seconds = (self._smoothed_latency_ms or 0.0) / 1000
+        if now - self._last_decrease_time < round_trip_seconds:
+            return
+        self._last_decrease_time = now
+        self._window = max(float(self._min_limit), self._window * self._backoff_factor)
+
+
+class AdaptiveConcurrencyController:
+    """
+    Keeps one AimdLimiter per resolver URL so that a slow or throttling resolver
+    only shrinks its own window and never holds slots needed by the others.
+    """
+    def __init__(self,
+                 max_limit: int,
+                 initial_limit: int = ADAPTIVE_INITIAL_LIMIT,
+                 min_limit: int = ADAPTIVE_MIN_LIMIT):
+        self.max_limit = max(1, max_limit)
+        self._initial_limit = initial_limit
+        self._min_limit = min_limit
+        self._limiters: Dict[str, AimdLimiter] = {}
+
+    def limiter_for(self, resolver_url: str) -> AimdLimiter:
+        """Returns the concurrency window of the given resolver, creating it on first use."""
+        limiter = self._limiters.get(resolver_url)
+        if limiter is None:
+            limiter = AimdLimiter(
+                initial_limit=self._initial_limit,
+                min_limit=self._min_limit,
+                max_limit=self.max_limit
+            )
+            self._limiters[resolver_url] = limiter
+        return limiter
+
+    def record_result(self, result: QueryResult):
+        """Feeds a finished query's outcome back into its resolver's window."""
+        self.limiter_for(result.resolver_url).record_result(result)
+
+    def get_limits(self) -> Dict[str, int]:
+        """Returns the current concurrency window keyed by resolver URL."""
+        return {url: limiter.limit for url, limiter in self._limiters.items()}
@@ -0,0 +1,95 @@
+import base64
+import struct
+from typing import List, Tuple
+
+
+# RFC 8484 recommends a DNS ID of 0 so that identical queries are cache-friendly.
+# Flags 0x0100 sets RD (recursion desired); one question, no other sections.
+_QUERY_HEADER = struct.pack('!HHHHHH', 0, 0x0100, 1, 0, 0, 0)
+_HEADER = struct.Struct('!HHHHHH')
+_RR_FIXED = struct.Struct('!HHIH')  # TYPE, CLASS, TTL, RDLENGTH
+
+QTYPE_A = 1
+QCLASS_IN = 1
+RCODE_SERVFAIL = 2
+RCODE_NXDOMAIN = 3
+
+_QUESTION_TAIL_A = struct.pack('!HH', QTYPE_A, QCLASS_IN)
+
+
+def encode_query(domain_name: str, qtype: int = QTYPE_A) -> bytes:
+    """
+    Encodes a single-question DNS query message in RFC 1035 wire format.
+    Raises ValueError for names that cannot be represented as DNS labels.
+    """
+    try:
+        name_bytes = domain_name.encode('ascii')
+    except UnicodeEncodeError:
+        name_bytes = domain_name.encode('idna')
+
+    parts = [_QUERY_HEADER]
+    for label in name_bytes.rstrip(b'.').split(b'.'):
+        label_length = len(label)
+        if label_length == 0 or label_length > 63:
+            raise ValueError(f"Invalid DNS label in '{domain_name}'")
+        parts.append(bytes((label_length,)))
+        parts.append(label)
+    parts.append(b'\x00')
+    parts.append(_QUESTION_TAIL_A if qtype == QTYPE_A else struct.pack('!HH', qtype, QCLASS_IN))
+    return b''.join(parts)
+
+
+def encode_query_base64url(domain_name: str, qtype: int = QTYPE_A) -> str:
+    """
+    Encodes a DNS query for the RFC 8484 GET 'dns' parameter (base64url, no padding).
+    """
+    return base64.urlsafe_b64encode(encode_query(domain_name, qtype)).rstrip(b'=').decode('ascii')
+
+
+def _skip_name(message: bytes, offset: int) -> int:
+    """
+    Returns the offset just past the (possibly compressed) domain name at `offset`.
+    Compression pointers are not followed: a pointer always terminates the name in place.
+    """
+    message_length = len(message)
+    while True:
+        if offset >= message_length:
+            raise ValueError("Truncated DNS message while reading a name")
+        length = message[offset]
+        if length == 0:
+            return offset + 1
+        if length & 0xC0 == 0xC0:  # Compression pointer (2 bytes)
+            return offset + 2
+        offset += length + 1
+
+
+def decode_response(message: bytes) -> Tuple[List[int], int]:
+    """
+    Decodes a DNS response message in wire format.
+    Returns the IPv4 addresses from A records in the answer section, as integers, and the RCODE.
+    """
+    if len(message) < _HEADER.size:
+        raise ValueError("DNS message shorter than its header")
+
+    _, flags, qdcount, ancount, _, _ = _HEADER.unpack_from(message, 0)
+    rcode = flags & 0x000F
+
+    offset = _HEADER.size
+    for _ in range(qdcount):
+        offset = _skip_name(message, offset) + 4  # QTYPE + QCLASS
+
+    ips: List[int] = []
+    message_length = len(message)
+    for _ in range(ancount):
+        offset = _skip_name(message, offset)
+        if offset + _RR_FIXED.size > message_length:
+            raise ValueError("Truncated DNS message while reading a resource record")
+        rr_type, rr_class, _, rdlength = _RR_FIXED.unpack_from(message, offset)
+        offset += _RR_FIXED.size
+        if offset + rdlength > message_length:
+            raise ValueError("Truncated DNS message while reading record data")
+        if rr_type == QTYPE_A and rr_class == QCLASS_IN and rdlength == 4:
+            ips.append(int.from_bytes(message[offset:offset + 4], 'big'))
+        offset += rdlength
+
+    return ips, rcode
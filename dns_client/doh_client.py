@@ -2,18 +2,154 @@ import asyncio
 import time
 import httpx
 from typing import List, Optional, Tuple, Dict, Any
-from data.models import QueryResult, DnsResolver, DomainCategory, QueryStatus
-from utils.ip_utils import is_valid_ipv4
+from data.models import QueryResult, DnsResolver, DomainCategory, QueryErrorType, ConnectionStats
+from config.settings import (
+    DEFAULT_CONCURRENCY_LIMIT,
+    DEFAULT_KEEPALIVE_EXPIRY_SECONDS,
+    HEDGE_MAX_REQUEST_FRACTION,
+    MAX_HTTP1_CONNECTIONS_PER_RESOLVER
+)
+from dns_client.rate_limiter import ResolverRateLimiter, TokenBucket, parse_retry_after
+from dns_client.circuit_breaker import ResolverCircuitBreaker
+from dns_client.latency_tracker import ResolverLatencyTracker
+from dns_client.retry_policy import RetryPolicy
+from dns_client.dns_message import (
+    encode_query,
+    encode_query_base64url,
+    decode_response,
+    RCODE_NXDOMAIN,
+    RCODE_SERVFAIL
+)
+from utils.ip_utils import ipv4_to_int, int_to_ipv4
+
+
+_JSON_HEADERS = {"Accept": "application/dns-json"}
+_WIRE_GET_HEADERS = {"Accept": "application/dns-message"}
+_WIRE_POST_HEADERS = {"Accept": "application/dns-message", "Content-Type": "application/dns-message"}
+
+
+class _RequestTrace:
+    """
+    httpx/httpcore trace extension callback recording how a single request used its
+    connection and when each phase (TCP connect, TLS, response headers) completed.
+    """
+    __slots__ = ('opened_connection', 'sent_request',
+                 'connect_started', 'connect_complete', 'tls_started', 'tls_complete', 'headers_received')
+
+    def __init__(self):
+        self.opened_connection = False
+        self.sent_request = False
+        self.connect_started: Optional[float] = None
+        self.connect_complete: Optional[float] = None
+        self.tls_started: Optional[float] = None
+        self.tls_complete: Optional[float] = None
+        self.headers_received: Optional[float] = None
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]):
+        if event_name == 'connection.connect_tcp.started':
+            self.connect_started = time.perf_counter()
+        elif event_name == 'connection.connect_tcp.complete':
+            self.connect_complete = time.perf_counter()
+            self.opened_connection = True
+        elif event_name == 'connection.start_tls.started':
+            self.tls_started = time.perf_counter()
+        elif event_name == 'connection.start_tls.complete':
+            self.tls_complete = time.perf_counter()
+        elif event_name.endswith('.send_request_headers.started'):
+            self.sent_request = True
+        elif event_name.endswith('.receive_response_headers.complete'):
+            self.headers_received = time.perf_counter()
+
+
+class _Attempt:
+    """Outcome of a single request of a query; error_type is None when the resolver answered."""
+    __slots__ = ('trace', 'start_time', 'latency_ms', 'resolved_ips', 'resolved_ip_ints', 'error_type')
+
+    def __init__(self):
+        self.trace = _RequestTrace()
+        self.start_time = time.perf_counter()
+        self.latency_ms: Optional[float] = None
+        self.resolved_ips: List[str] = []
+        self.resolved_ip_ints: List[int] = []
+        self.error_type: Optional[QueryErrorType] = None
+
+
+def _elapsed_ms(start: Optional[float], end: Optional[float]) -> Optional[float]:
+    """Returns the milliseconds between two perf_counter readings, or None if either is missing."""
+    if start is None or end is None:
+        return None
+    return (end - start) * 1000
 
 
 class DohClient:
     """
     Asynchronous DNS-over-HTTPS (DoH) client for querying DNS records.
+    Each resolver gets its own connection pool so one resolver cannot exhaust
+    the connections of another. With a `rate_limiter`, requests are paced per resolver
+    and HTTP 429 responses pause (and optionally slow down) the throttling resolver.
+    With a `circuit_breaker`, queries to a resolver that keeps timing out or refusing
+    connections are not sent but returned at once with status 'Skipped'.
+    A `retry_policy` retries timeouts and connection errors with backoff; `dynamic_timeouts`
+    caps each request's timeout from the resolver's recent p99 latency, and `hedge_requests`
+    sends a duplicate request once the first has been pending longer than the resolver's p95.
     """
-    def __init__(self):
+    def __init__(self,
+                 http2: bool = False,
+                 max_connections_per_resolver: int = DEFAULT_CONCURRENCY_LIMIT,
+                 keepalive_expiry_seconds: float = DEFAULT_KEEPALIVE_EXPIRY_SECONDS,
+                 rate_limiter: Optional[ResolverRateLimiter] = None,
+                 circuit_breaker: Optional[ResolverCircuitBreaker] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 dynamic_timeouts: bool = False,
+                 hedge_requests: bool = False):
         # httpx.AsyncClient should be reused for connection pooling and efficiency.
-        # It handles session management internally.
-        self._client = httpx.AsyncClient()
+        # Clients are created lazily, one per resolver URL.
+        self._http2 = http2
+        # HTTP/1.1 needs one connection per in-flight query; keep them all alive between queries.
+        # When HTTP/2 is negotiated, httpx multiplexes every query on a single connection anyway,
+        # but the pool must still fit all in-flight queries if the resolver only speaks HTTP/1.1.
+        # Without HTTP/2 the pool is capped at MAX_HTTP1_CONNECTIONS_PER_RESOLVER, and so are the
+        # queries in flight per resolver (see _connection_slots): queries beyond that wait as queue
+        # wait without a connection or a concurrency slot, instead of in the httpcore pool queue.
+        connections = max(1, max_connections_per_resolver)
+        if not http2:
+            connections = min(connections, MAX_HTTP1_CONNECTIONS_PER_RESOLVER)
+        self._slots_per_resolver = connections
+        if hedge_requests:
+            connections *= 2  # Room for a hedged duplicate of every in-flight query
+        self._limits = httpx.Limits(
+            max_connections=connections,
+            max_keepalive_connections=connections,
+            keepalive_expiry=keepalive_expiry_seconds
+        )
+        self._rate_limiter = rate_limiter
+        self._circuit_breaker = circuit_breaker
+        self._retry_policy = retry_policy
+        self._dynamic_timeouts = dynamic_timeouts
+        self._hedge_requests = hedge_requests
+        self._latency_tracker = ResolverLatencyTracker() if dynamic_timeouts or hedge_requests else None
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._connection_slots: Dict[str, asyncio.Semaphore] = {}
+        self._connection_stats: Dict[str, ConnectionStats] = {}
+
+    def _client_for(self, resolver: DnsResolver) -> httpx.AsyncClient:
+        """Returns the pooled httpx.AsyncClient dedicated to the given resolver."""
+        client = self._clients.get(resolver.url)
+        if client is None:
+            client = httpx.AsyncClient(http2=self._http2, limits=self._limits)
+            self._clients[resolver.url] = client
+            self._connection_slots[resolver.url] = asyncio.Semaphore(self._slots_per_resolver)
+            self._connection_stats.setdefault(resolver.url, ConnectionStats())
+        return client
+
+    @property
+    def slots_per_resolver(self) -> int:
+        """Queries a single resolver can have in flight at once."""
+        return self._slots_per_resolver
+
+    def get_connection_stats(self) -> Dict[str, ConnectionStats]:
+        """Returns connection usage counters keyed by resolver URL."""
+        return dict(self._connection_stats)
 
     async def query(self,
                     domain_name: str,
@@ -24,57 +160,232 @@ class DohClient:
         """
         Executes an asynchronous DNS-over-HTTPS (DoH) query for a given domain
         using a specified resolver, measuring latency.
+        Time spent waiting for the rate limiter and the semaphore is reported separately
+        as queue wait; latency_ms covers only the attempt that produced the result, from
+        send to full response (from the original request's send when a hedge won). With a
+        retry policy, timeouts and connection errors are retried after a backoff, outside the
+        semaphore; `attempts` counts every request sent, including retries and hedged duplicates.
         """
-        resolved_ips: List[str] = []
-        latency_ms: Optional[float] = None
-        status: QueryStatus = 'Error'  # Default to Error, refine later
-
-        # RFC 8484 specifies GET method with 'dns' query parameter for the DNS message
-        # and 'ct' query parameter for content type (application/dns-message or application/dns-json)
-        # We'll use application/dns-json and query A records.
-        doh_url = f"{resolver.url}?name={domain_name}&type=A"
-
-        start_time = time.perf_counter()
-        async with semaphore:
-            try:
-                response = await self._client.get(
-                    doh_url,
-                    headers={"Accept": "application/dns-json"},
-                    timeout=timeout_seconds
-                )
-                response.raise_for_status()  # Raise an exception for 4xx/5xx responses
-                latency_ms = (time.perf_counter() - start_time) * 1000
-
-                response_json = response.json()
-                parsed_ips, is_nxdomain, is_servfail = self._parse_doh_response(response_json)
-                resolved_ips = parsed_ips
-
-                status = 'Resolved'  # Temporarily set to resolved; blocking_detector will refine it
-
-            except httpx.TimeoutException:
-                status = 'Error'
-            except httpx.RequestError:  # Covers connection errors, DNS lookup failures before DoH, etc.
-                status = 'Error'
-            except httpx.HTTPStatusError:  # Covers 4xx/5xx HTTP responses
-                status = 'Error'
-            except Exception:  # Catch any other unexpected errors during JSON parsing, etc.
-                status = 'Error'
+        client = self._client_for(resolver)
+        queued_time = time.perf_counter()
+        breaker = self._circuit_breaker.breaker_for(resolver.url) if self._circuit_breaker else None
+        if breaker is not None and breaker.is_open:
+            return self._skipped_result(domain_name, resolver, domain_category, queued_time)
+        rate_bucket = self._rate_limiter.bucket_for(resolver) if self._rate_limiter else None
+        connection_slots = self._connection_slots[resolver.url]
 
+        attempt: Optional[_Attempt] = None
+        requests_sent = 0
+        retries_done = 0
+        queue_wait_ms: Optional[float] = None
+        hedged = False
+        while True:
+            if rate_bucket is not None:
+                await rate_bucket.acquire()  # Paced before taking a slot, so waiting does not hold one
+            # The resolver's own connection slot comes first, so a busy resolver does not hold shared slots
+            async with connection_slots, semaphore:
+                # Checked again with the slot held: the circuit may have opened while this query waited
+                if breaker is not None and not breaker.allow_request():
+                    break
+                if queue_wait_ms is None:
+                    queue_wait_ms = (time.perf_counter() - queued_time) * 1000
+                if retries_done:
+                    self._connection_stats[resolver.url].retry_requests += 1
+                attempt_timeout_seconds = timeout_seconds
+                if self._dynamic_timeouts:
+                    attempt_timeout_seconds = self._latency_tracker.timeout_for(resolver.url, timeout_seconds)
+                attempt, sent, hedged = await self._send_with_hedge(client, domain_name, resolver,
+                                                                    attempt_timeout_seconds, rate_bucket)
+                requests_sent += sent
+                if self._latency_tracker is not None and attempt.error_type is None:
+                    # The latency the caller saw, so a won hedge does not pull later hedge delays and timeouts down
+                    self._latency_tracker.record(resolver.url, attempt.latency_ms)
+            if breaker is not None:
+                breaker.record_outcome(attempt.error_type)
+            if self._retry_policy is None or not self._retry_policy.should_retry(attempt.error_type, retries_done):
+                break
+            retries_done += 1
+            await asyncio.sleep(self._retry_policy.backoff_seconds(retries_done))
+
+        if attempt is None:
+            return self._skipped_result(domain_name, resolver, domain_category, queued_time)
+        trace = attempt.trace
         return QueryResult(
             domain=domain_name,
             resolver_url=resolver.url,
-            resolved_ips=resolved_ips,
-            latency_ms=latency_ms,
-            status=status,
-            domain_category=domain_category
+            resolved_ips=attempt.resolved_ips,
+            latency_ms=attempt.latency_ms,
+            status='Error' if attempt.error_type else 'Resolved',  # blocking_detector refines 'Resolved'
+            domain_category=domain_category,
+            queue_wait_ms=queue_wait_ms,
+            connect_ms=None if hedged else _elapsed_ms(trace.connect_started, trace.connect_complete),
+            tls_ms=None if hedged else _elapsed_ms(trace.tls_started, trace.tls_complete),
+            ttfb_ms=_elapsed_ms(attempt.start_time, trace.headers_received),
+            error_type=attempt.error_type,
+            attempts=requests_sent,
+            hedged=hedged,
+            resolved_ip_ints=attempt.resolved_ip_ints
         )
 
-    def _parse_doh_response(self, response_json: Dict[str, Any]) -> Tuple[List[str], bool, bool]:
+    async def _send_with_hedge(self,
+                               client: httpx.AsyncClient,
+                               domain_name: str,
+                               resolver: DnsResolver,
+                               timeout_seconds: float,
+                               rate_bucket: Optional[TokenBucket]) -> Tuple['_Attempt', int, bool]:
+        """
+        Sends one request and, with hedging, a duplicate once the first has been pending for the
+        resolver's recent p95 latency, unless hedges already make up HEDGE_MAX_REQUEST_FRACTION of
+        its requests or the rate limit does not allow one more request right away.
+        The first answer wins and the other request is cancelled; if both fail, the original's
+        error is kept. A winning hedge's latency and TTFB are measured from the original request's
+        send, so hedging does not make the reported tail look shorter than the wait the caller saw;
+        its connect and TLS times belong to the hedge's own connection and are not reported.
+        Returns the winning attempt, the number of requests sent and whether the hedge won.
+        """
+        sent_time = time.perf_counter()
+        first = asyncio.ensure_future(self._attempt(client, domain_name, resolver, timeout_seconds, rate_bucket))
+        pending = {first}
+        try:
+            hedge_delay_seconds = self._latency_tracker.hedge_delay_seconds(resolver.url) if self._hedge_requests else None
+            if hedge_delay_seconds is None:
+                return await first, 1, False
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay_seconds)
+            stats = self._connection_stats[resolver.url]
+            if done or stats.hedged_requests >= HEDGE_MAX_REQUEST_FRACTION * stats.requests \
+                    or (rate_bucket is not None and not rate_bucket.try_acquire()):
+                return await first, 1, False
+
+            hedge = asyncio.ensure_future(self._attempt(client, domain_name, resolver, timeout_seconds, rate_bucket))
+            pending.add(hedge)
+            stats.hedged_requests += 1
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in (first, hedge):
+                    if task in done and task.result().error_type is None:
+                        attempt = task.result()
+                        if task is hedge:
+                            stats.hedges_won += 1
+                            attempt.start_time = sent_time
+                            attempt.latency_ms = (time.perf_counter() - sent_time) * 1000
+                        return attempt, 2, task is hedge
+            return first.result(), 2, False
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _attempt(self,
+                       client: httpx.AsyncClient,
+                       domain_name: str,
+                       resolver: DnsResolver,
+                       timeout_seconds: float,
+                       rate_bucket: Optional[TokenBucket]) -> '_Attempt':
+        """Sends a single DoH request and classifies its outcome; failures are returned, not raised."""
+        attempt = _Attempt()
+        http_version: Optional[str] = None
+        try:
+            response = await self._send_request(client, domain_name, resolver, timeout_seconds, attempt.trace)
+            http_version = response.http_version
+            response.raise_for_status()  # Raise an exception for 4xx/5xx responses
+            attempt.latency_ms = (time.perf_counter() - attempt.start_time) * 1000
+
+            if resolver.doh_format == 'json':
+                attempt.resolved_ips, attempt.resolved_ip_ints, is_nxdomain, is_servfail = \
+                    self._parse_doh_response(response.json())
+            else:
+                attempt.resolved_ips, attempt.resolved_ip_ints, is_nxdomain, is_servfail = \
+                    self._parse_wire_response(response.content)
+
+            if rate_bucket is not None:
+                rate_bucket.record_success()
+
+        except httpx.TimeoutException:
+            attempt.error_type = 'timeout'
+        except httpx.RequestError:  # Covers connection errors, DNS lookup failures before DoH, etc.
+            attempt.error_type = 'connection'
+        except httpx.HTTPStatusError as e:  # Covers 4xx/5xx HTTP responses
+            attempt.error_type = 'rate_limited' if e.response.status_code == 429 else 'http_status'
+            if rate_bucket is not None and attempt.error_type == 'rate_limited':
+                rate_bucket.record_throttled(parse_retry_after(e.response.headers.get('Retry-After')))
+        except Exception:  # Catch any other unexpected errors during JSON/wire parsing, etc.
+            attempt.error_type = 'invalid_response'
+
+        self._record_connection_usage(resolver.url, attempt.trace, http_version)
+        return attempt
+
+    @staticmethod
+    def _skipped_result(domain_name: str,
+                        resolver: DnsResolver,
+                        domain_category: DomainCategory,
+                        queued_time: float) -> QueryResult:
+        """Result of a query that was not sent because the resolver's circuit is open."""
+        return QueryResult(
+            domain=domain_name,
+            resolver_url=resolver.url,
+            resolved_ips=[],
+            latency_ms=None,
+            status='Skipped',
+            domain_category=domain_category,
+            queue_wait_ms=(time.perf_counter() - queued_time) * 1000,
+            attempts=0
+        )
+
+    def _record_connection_usage(self, resolver_url: str, trace: _RequestTrace, http_version: Optional[str]):
+        """Updates the per-resolver connection reuse counters from a finished request's trace."""
+        if not trace.sent_request:
+            return
+        stats = self._connection_stats[resolver_url]
+        stats.requests += 1
+        if trace.opened_connection:
+            stats.new_connections += 1
+        else:
+            stats.reused_connection_requests += 1
+        if http_version == 'HTTP/2':
+            stats.http2_requests += 1
+
+    async def _send_request(self,
+                            client: httpx.AsyncClient,
+                            domain_name: str,
+                            resolver: DnsResolver,
+                            timeout_seconds: float,
+                            trace: _RequestTrace) -> httpx.Response:
+        """
+        Sends the DoH request for an A record in the resolver's configured format.
+        'json' uses the application/dns-json dialect; 'wire-get' and 'wire-post'
+        send an RFC 8484 application/dns-message query.
+        """
+        if resolver.doh_format == 'wire-post':
+            return await client.post(
+                resolver.url,
+                content=encode_query(domain_name),
+                headers=_WIRE_POST_HEADERS,
+                timeout=timeout_seconds,
+                extensions={"trace": trace}
+            )
+        if resolver.doh_format == 'wire-get':
+            return await client.get(
+                resolver.url,
+                params={"dns": encode_query_base64url(domain_name)},
+                headers=_WIRE_GET_HEADERS,
+                timeout=timeout_seconds,
+                extensions={"trace": trace}
+            )
+        return await client.get(
+            f"{resolver.url}?name={domain_name}&type=A",
+            headers=_JSON_HEADERS,
+            timeout=timeout_seconds,
+            extensions={"trace": trace}
+        )
+
+    def _parse_doh_response(self, response_json: Dict[str, Any]) -> Tuple[List[str], List[int], bool, bool]:
         """
         Parses the JSON response from a DoH query (RFC 8484 format)
-        to extract IPv4 A records and detect NXDOMAIN/SERVFAIL.
+        to extract IPv4 A records, as strings and integers, and detect NXDOMAIN/SERVFAIL.
         """
         ips: List[str] = []
+        ip_ints: List[int] = []
         is_nxdomain = False
         is_servfail = False
 
@@ -89,11 +400,23 @@ class DohClient:
         for record in answers:
             if record.get('type') == 1:  # Type 1 is A record (IPv4)
                 ip = record.get('data')
-                if ip and is_valid_ipv4(ip):
+                ip_int = ipv4_to_int(ip) if ip else None
+                if ip_int is not None:
                     ips.append(ip)
+                    ip_ints.append(ip_int)
+
+        return ips, ip_ints, is_nxdomain, is_servfail
 
-        return ips, is_nxdomain, is_servfail
+    def _parse_wire_response(self, message: bytes) -> Tuple[List[str], List[int], bool, bool]:
+        """
+        Parses an RFC 8484 application/dns-message response body
+        to extract IPv4 A records, as strings and integers, and detect NXDOMAIN/SERVFAIL.
+        """
+        ip_ints, rcode = decode_response(message)
+        return [int_to_ipv4(ip_int) for ip_int in ip_ints], ip_ints, rcode == RCODE_NXDOMAIN, rcode == RCODE_SERVFAIL
 
     async def close(self):
-        """Closes the underlying httpx.AsyncClient session."""
-        await self._client.aclose()
\ No newline at end of file
+        """Closes every per-resolver httpx.AsyncClient session."""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
\ No newline at end of file
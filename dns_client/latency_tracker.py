@@ -0,0 +1,67 @@
+from collections import deque
+from typing import Deque, Dict, Optional
+from config.settings import (
+    LATENCY_TRACKER_WINDOW,
+    LATENCY_TRACKER_MIN_SAMPLES,
+    DYNAMIC_TIMEOUT_P99_MULTIPLIER,
+    DYNAMIC_TIMEOUT_MIN_SECONDS
+)
+
+_REFRESH_INTERVAL = max(1, LATENCY_TRACKER_WINDOW // 10)  # New samples between two percentile refreshes
+
+
+class _RecentLatencies:
+    """The latest LATENCY_TRACKER_WINDOW answered-request latencies of one resolver, with cached p95 and p99."""
+    __slots__ = ('samples', 'new_samples', 'p95_ms', 'p99_ms')
+
+    def __init__(self):
+        self.samples: Deque[float] = deque(maxlen=LATENCY_TRACKER_WINDOW)
+        self.new_samples = 0
+        self.p95_ms: Optional[float] = None
+        self.p99_ms: Optional[float] = None
+
+    def add(self, latency_ms: float):
+        self.samples.append(latency_ms)
+        self.new_samples += 1
+        if len(self.samples) >= LATENCY_TRACKER_MIN_SAMPLES and (self.p95_ms is None or self.new_samples >= _REFRESH_INTERVAL):
+            ordered = sorted(self.samples)
+            self.p95_ms = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            self.p99_ms = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+            self.new_samples = 0
+
+
+class ResolverLatencyTracker:
+    """
+    Tracks the recent latency of every resolver to derive per-resolver request timeouts
+    and hedging delays. Percentiles are only refreshed every few samples, so recording
+    a latency is cheap, and nothing is derived before LATENCY_TRACKER_MIN_SAMPLES answers.
+    """
+    def __init__(self):
+        self._resolvers: Dict[str, _RecentLatencies] = {}
+
+    def record(self, resolver_url: str, latency_ms: float):
+        """Records the latency of an answered request."""
+        recent = self._resolvers.get(resolver_url)
+        if recent is None:
+            recent = _RecentLatencies()
+            self._resolvers[resolver_url] = recent
+        recent.add(latency_ms)
+
+    def timeout_for(self, resolver_url: str, max_timeout_seconds: float) -> float:
+        """
+        Request timeout for the resolver: DYNAMIC_TIMEOUT_P99_MULTIPLIER times its recent p99,
+        at least DYNAMIC_TIMEOUT_MIN_SECONDS and at most `max_timeout_seconds`, which is also
+        used until enough latencies are known.
+        """
+        recent = self._resolvers.get(resolver_url)
+        if recent is None or recent.p99_ms is None:
+            return max_timeout_seconds
+        dynamic_timeout_seconds = recent.p99_ms * DYNAMIC_TIMEOUT_P99_MULTIPLIER / 1000
+        return min(max_timeout_seconds, max(DYNAMIC_TIMEOUT_MIN_SECONDS, dynamic_timeout_seconds))
+
+    def hedge_delay_seconds(self, resolver_url: str) -> Optional[float]:
+        """Recent p95 latency of the resolver in seconds, or None while it is not known yet."""
+        recent = self._resolvers.get(resolver_url)
+        if recent is None or recent.p95_ms is None:
+            return None
+        return recent.p95_ms / 1000
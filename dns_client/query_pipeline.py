@@ -0,0 +1,120 @@
+import asyncio
+from typing import AsyncIterable, Callable, Dict, Iterable, Iterator, List, Optional, Union
+from data.models import QueryResult, DomainConfig, DnsResolver, WorkItem
+from dns_client.doh_client import DohClient
+from dns_client.concurrency_controller import AdaptiveConcurrencyController
+from config.settings import ADAPTIVE_LANE_QUEUE_SIZE, PIPELINE_QUEUE_SIZE_PER_WORKER
+
+
+def iter_work_items(domains: Iterable[DomainConfig],
+                    resolvers: List[DnsResolver],
+                    sample_round: int = 0) -> Iterator[WorkItem]:
+    """
+    Lazily yields one WorkItem per domain x resolver pair, domain by domain.
+    """
+    for domain_cfg in domains:
+        for resolver_cfg in resolvers:
+            yield WorkItem(domain=domain_cfg, resolver=resolver_cfg, sample_round=sample_round)
+
+
+WorkStream = Union[Iterable[WorkItem], AsyncIterable[WorkItem]]
+
+
+async def run_query_pipeline(doh_client: DohClient,
+                             work_items: Union[WorkStream, Dict[str, WorkStream]],
+                             timeout_seconds: float,
+                             semaphore: asyncio.Semaphore,
+                             on_result: Callable[[QueryResult], None],
+                             worker_count: int,
+                             queue_size: Optional[int] = None,
+                             concurrency_controller: Optional[AdaptiveConcurrencyController] = None) -> int:
+    """
+    Runs queries through a bounded producer/consumer pipeline.
+    A producer feeds work items into a bounded queue, a fixed pool of workers executes
+    the queries and each result is handed to `on_result` as soon as it completes.
+    Memory use depends on the worker count and queue size, not on the number of work items.
+
+    With a `concurrency_controller`, every resolver gets its own queue and workers, limited
+    by that resolver's adaptive window instead of the shared semaphore. The single producer fans
+    the work out to these queues; each holds up to ADAPTIVE_LANE_QUEUE_SIZE items, so fast
+    resolvers can run that far ahead of a slow one before the producer waits for it.
+    `work_items` may also be a dict of streams, each drained by its own producer, and streams
+    may be async iterables, for work that arrives while the pipeline runs.
+    Returns the number of completed queries.
+    """
+    worker_count = max(1, worker_count)
+    lane_worker_count = concurrency_controller.max_limit if concurrency_controller else worker_count
+    lane_queue_size = queue_size or lane_worker_count * PIPELINE_QUEUE_SIZE_PER_WORKER
+    if concurrency_controller:
+        lane_queue_size = max(lane_queue_size, ADAPTIVE_LANE_QUEUE_SIZE)
+    lanes: Dict[Optional[str], asyncio.Queue] = {}
+    tasks: List[asyncio.Task] = []
+    completed = 0
+
+    async def consume(queue: asyncio.Queue, slot):
+        nonlocal completed
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            result = await doh_client.query(
+                domain_name=item.domain.name,
+                resolver=item.resolver,
+                timeout_seconds=timeout_seconds,
+                semaphore=slot,
+                domain_category=item.domain.category
+            )
+            result.sample_round = item.sample_round
+            if concurrency_controller:
+                concurrency_controller.record_result(result)
+            on_result(result)
+            completed += 1
+
+    def lane_for(item: WorkItem) -> asyncio.Queue:
+        lane_key = item.resolver.url if concurrency_controller else None
+        queue = lanes.get(lane_key)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=lane_queue_size)
+            lanes[lane_key] = queue
+            slot = concurrency_controller.limiter_for(lane_key) if concurrency_controller else semaphore
+            for _ in range(lane_worker_count):
+                task = asyncio.create_task(consume(queue, slot))
+                task.add_done_callback(stop_producer_on_failure)
+                tasks.append(task)
+        return queue
+
+    def stop_producer_on_failure(task: asyncio.Task):
+        # A dead worker would leave the producer blocked on a full queue forever.
+        if not task.cancelled() and task.exception() is not None:
+            producer.cancel()
+
+    async def produce(stream: WorkStream):
+        if hasattr(stream, '__aiter__'):
+            async for item in stream:
+                await lane_for(item).put(item)
+        else:
+            for item in stream:
+                await lane_for(item).put(item)
+
+    async def produce_all():
+        streams = work_items.values() if isinstance(work_items, dict) else [work_items]
+        await asyncio.gather(*(produce(stream) for stream in streams))
+        for queue in lanes.values():
+            for _ in range(lane_worker_count):
+                await queue.put(None)  # One stop sentinel per worker
+
+    producer = asyncio.create_task(produce_all())
+    try:
+        try:
+            await producer
+        except asyncio.CancelledError:
+            failed = [t for t in tasks if t.done() and not t.cancelled() and t.exception() is not None]
+            if not failed:
+                raise
+            raise failed[0].exception()
+        await asyncio.gather(*tasks)
+    finally:
+        producer.cancel()
+        for task in tasks:
+            task.cancel()
+    return completed
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from data.models import DnsResolver
+from config.settings import (
+    RATE_LIMIT_BURST_SECONDS,
+    RATE_LIMIT_MIN_QPS,
+    RATE_LIMIT_BACKOFF_FACTOR,
+    RATE_LIMIT_RECOVERY_PER_SECOND,
+    RATE_LIMIT_DEFAULT_RETRY_AFTER_SECONDS,
+    RATE_LIMIT_MAX_RETRY_AFTER_SECONDS
+)
+
+_THROUGHPUT_WINDOW_SECONDS = 1.0  # Period over which an unlimited bucket measures its request rate
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header, given in seconds or as an HTTP date, into seconds from now."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """
+    Paces the requests to a single resolver to at most `rate_qps` per second, with short bursts
+    of up to RATE_LIMIT_BURST_SECONDS worth of tokens. A rate of None means unlimited.
+    Waiters reserve their token up front and sleep until it is due, so many waiters cost
+    one sleep each instead of competing for every refill. A throttled resolver can also
+    pause the bucket entirely, e.g. for the duration of a Retry-After.
+    When learning, the rate is cut by a constant factor on throttling and grows back by
+    RATE_LIMIT_RECOVERY_PER_SECOND of itself per second of successful requests, up to `max_qps`.
+    """
+    def __init__(self, rate_qps: Optional[float], learn: bool = False):
+        self._max_qps = rate_qps
+        self._rate_qps = rate_qps
+        self._learn = learn
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._window_start = self._updated
+        self._window_requests = 0
+        self._observed_qps: Optional[float] = None
+
+    @property
+    def rate_qps(self) -> Optional[float]:
+        """Current request rate cap, or None when unlimited."""
+        return self._rate_qps
+
+    @property
+    def _burst(self) -> float:
+        return max(1.0, (self._rate_qps or 0.0) * RATE_LIMIT_BURST_SECONDS)
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate_qps)
+            self._updated = now
+
+    def _count_request(self, now: float):
+        elapsed = now - self._window_start
+        if elapsed >= _THROUGHPUT_WINDOW_SECONDS:
+            self._observed_qps = self._window_requests / elapsed
+            self._window_start = now
+            self._window_requests = 0
+        self._window_requests += 1
+
+    async def acquire(self):
+        """Waits until the next request may be sent."""
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._count_request(now)
+            if self._rate_qps is None:
+                return
+            self._refill(now)
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return
+            await asyncio.sleep(-self._tokens / self._rate_qps)
+            if time.monotonic() >= self._paused_until:
+                return
+            # Paused while waiting: the reserved token was dropped with the pause, so queue up again
+
+    def try_acquire(self) -> bool:
+        """Takes a token only if one is available right away; for optional requests such as hedges."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return False
+        if self._rate_qps is not None:
+            self._refill(now)
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+        self._count_request(now)
+        return True
+
+    def record_success(self):
+        """Lets a learned rate recover towards its cap after a successful request."""
+        if self._learn and self._rate_qps is not None and self._rate_qps != self._max_qps:
+            # One success per 1/rate seconds at full speed, so this adds the recovery fraction per second
+            if self._max_qps is None:
+                self._rate_qps += RATE_LIMIT_RECOVERY_PER_SECOND
+            else:
+                self._rate_qps = min(self._max_qps, self._rate_qps + RATE_LIMIT_RECOVERY_PER_SECOND)
+
+    def record_throttled(self, retry_after_seconds: Optional[float]):
+        """
+        Pauses the bucket after an HTTP 429 for the Retry-After period (or a default pause)
+        and, when learning, lowers the rate. Throttled responses that arrive during a pause
+        were sent before it and do not lower the rate again.
+        """
+        now = time.monotonic()
+        already_paused = now < self._paused_until
+        pause_seconds = RATE_LIMIT_DEFAULT_RETRY_AFTER_SECONDS if retry_after_seconds is None else retry_after_seconds
+        self._paused_until = max(self._paused_until, now + min(pause_seconds, RATE_LIMIT_MAX_RETRY_AFTER_SECONDS))
+        if self._learn and not already_paused:
+            current_qps = self._rate_qps
+            if current_qps is None:
+                elapsed = now - self._window_start
+                current_qps = self._observed_qps or (self._window_requests / elapsed if elapsed > 0 else RATE_LIMIT_MIN_QPS)
+            self._rate_qps = max(RATE_LIMIT_MIN_QPS, current_qps * RATE_LIMIT_BACKOFF_FACTOR)
+        # Nothing accumulates or stays reserved through the pause
+        self._tokens = 0.0
+        self._updated = self._paused_until
+
+
+class ResolverRateLimiter:
+    """
+    Keeps one TokenBucket per resolver URL. A resolver's cap is its own `max_qps` from the
+    resolver list, or `default_max_qps`; both are scaled by `rate_share` when several
+    processes query the same resolvers. With `learn`, caps adapt to HTTP 429 responses.
+    """
+    def __init__(self, default_max_qps: Optional[float] = None, learn: bool = False, rate_share: float = 1.0):
+        self._default_max_qps = default_max_qps
+        self._learn = learn
+        self._rate_share = rate_share
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket_for(self, resolver: DnsResolver) -> TokenBucket:
+        """Returns the token bucket of the given resolver, creating it on first use."""
+        bucket = self._buckets.get(resolver.url)
+        if bucket is None:
+            max_qps = resolver.max_qps or self._default_max_qps
+            if max_qps is not None:
+                max_qps *= self._rate_share
+            bucket = TokenBucket(max_qps, learn=self._learn)
+            self._buckets[resolver.url] = bucket
+        return bucket
+
+    def get_rates(self) -> Dict[str, Optional[float]]:
+        """Returns the current rate cap keyed by resolver URL; None means unlimited."""
+        return {url: bucket.rate_qps for url, bucket in self._buckets.items()}
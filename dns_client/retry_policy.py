@@ -0,0 +1,32 @@
+import random
+from typing import Optional
+from config.settings import DEFAULT_RETRY_BACKOFF_SECONDS, RETRY_MAX_BACKOFF_SECONDS
+
+# Failures that are often transient; other errors are answers and are not retried
+RETRYABLE_ERROR_TYPES = ('timeout', 'connection')
+
+
+class RetryPolicy:
+    """
+    Bounded retries with exponential backoff and full jitter: before retry n (counting from 1)
+    the query waits a random time between 0 and min(RETRY_MAX_BACKOFF_SECONDS, backoff * 2^(n-1)),
+    so retries of many failed queries do not hit the resolver again in lockstep.
+    """
+    def __init__(self,
+                 max_retries: int,
+                 backoff_seconds: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+                 max_backoff_seconds: float = RETRY_MAX_BACKOFF_SECONDS,
+                 rng: Optional[random.Random] = None):
+        self.max_retries = max(0, max_retries)
+        self._backoff_seconds = backoff_seconds
+        self._max_backoff_seconds = max_backoff_seconds
+        self._rng = rng or random.Random()
+
+    def should_retry(self, error_type: Optional[str], retries_done: int) -> bool:
+        """Tells whether a query that failed with `error_type` after `retries_done` retries is tried again."""
+        return error_type in RETRYABLE_ERROR_TYPES and retries_done < self.max_retries
+
+    def backoff_seconds(self, retry_number: int) -> float:
+        """Randomized wait before the given retry (1 for the first one)."""
+        ceiling = min(self._max_backoff_seconds, self._backoff_seconds * 2 ** (retry_number - 1))
+        return self._rng.uniform(0.0, ceiling)
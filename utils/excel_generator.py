@@ -1,26 +1,63 @@
 import openpyxl
-from openpyxl.styles import Font, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
-from typing import List, Dict, Any
-from data.models import DomainConfig, DnsResolver, QueryResult, PerformanceStats, BlockingStats, CategorizedBlockingStats
+from typing import List, Dict, Any, Optional
+from data.models import (
+    DomainConfig,
+    DnsResolver,
+    QueryResult,
+    PerformanceStats,
+    BlockingStats,
+    CategorizedBlockingStats,
+    ConnectionStats
+)
+
+_THIN_BORDER = Border(left=Side(style='thin'),
+                      right=Side(style='thin'),
+                      top=Side(style='thin'),
+                      bottom=Side(style='thin'))
+
+# Named styles are registered once per workbook and shared by every cell that uses them
+_REPORT_STYLES = [
+    NamedStyle(name='matrix_header', font=Font(bold=True), border=_THIN_BORDER,
+               alignment=Alignment(horizontal='center', vertical='center', wrapText=True)),
+    NamedStyle(name='matrix_resolver', font=Font(bold=True), border=_THIN_BORDER,
+               alignment=Alignment(horizontal='left', vertical='center', wrapText=True)),
+    NamedStyle(name='matrix_cell', border=_THIN_BORDER,
+               alignment=Alignment(horizontal='center', vertical='center')),
+    NamedStyle(name='section_title', font=Font(bold=True)),
+    NamedStyle(name='table_label', font=Font(bold=True), border=_THIN_BORDER),
+    NamedStyle(name='table_cell', border=_THIN_BORDER),
+]
+_MAX_DETAIL_COLUMN_WIDTH = 50
+_MAX_MATRIX_DOMAINS = 16383  # Excel's 16384-column limit minus the resolver name column
 
 
 class ExcelGenerator:
     """
     Generates the comprehensive Excel output report.
+    The workbook is written in openpyxl's write-only mode: rows are streamed to the file
+    as they are appended, cells share named styles, and column widths are computed from
+    the known cell values before the first row is written.
     """
     def __init__(self, output_filepath: str, all_domains: List[DomainConfig], all_resolvers: List[DnsResolver], query_store):
         self.output_filepath = output_filepath
         self.all_domains = sorted(all_domains, key=lambda d: d.name)  # Ensure consistent domain order
         self.all_resolvers = sorted(all_resolvers, key=lambda r: r.name)  # Ensure consistent resolver order
         self.query_store = query_store
-        self.workbook = openpyxl.Workbook()
+        self.workbook = openpyxl.Workbook(write_only=True)
         self._setup_workbook()
 
     def _setup_workbook(self):
-        # Remove default sheet created by openpyxl.Workbook()
-        if 'Sheet' in self.workbook.sheetnames:
-            self.workbook.remove(self.workbook['Sheet'])
+        # A write-only workbook starts without sheets; only the shared styles need registering
+        for style in _REPORT_STYLES:
+            self.workbook.add_named_style(style)
+
+    def _styled_cell(self, ws, value: Any, style: str) -> WriteOnlyCell:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
 
     def generate_report(self,
                         performance_stats_by_resolver: Dict[str, PerformanceStats],
@@ -28,13 +65,27 @@ class ExcelGenerator:
                         categorized_blocking_stats_by_resolver: Dict[str, List[CategorizedBlockingStats]],
                         blocked_useful_domains_by_resolver: Dict[str, List[str]],
                         blocked_useless_domains_by_resolver: Dict[str, List[str]],
-                        passed_useless_domains_by_resolver: Dict[str, List[str]]):
+                        passed_useless_domains_by_resolver: Dict[str, List[str]],
+                        connection_stats_by_resolver: Optional[Dict[str, ConnectionStats]] = None,
+                        cold_performance_stats_by_resolver: Optional[Dict[str, PerformanceStats]] = None,
+                        warm_performance_stats_by_resolver: Optional[Dict[str, PerformanceStats]] = None,
+                        domain_performance_stats_by_resolver: Optional[Dict[str, Dict[str, PerformanceStats]]] = None,
+                        category_performance_stats_by_resolver: Optional[Dict[str, Dict[str, PerformanceStats]]] = None,
+                        performance_stats_by_vantage: Optional[Dict[str, Dict[str, PerformanceStats]]] = None,
+                        blocking_stats_by_vantage: Optional[Dict[str, Dict[str, BlockingStats]]] = None):
         """
         Orchestrates the creation of the Excel workbook, including the matrix and detail sheets.
         """
         print("Generating Excel report...")
         self._create_matrix_sheet()
+        if performance_stats_by_vantage:
+            self._create_vantage_sheet(performance_stats_by_vantage, blocking_stats_by_vantage or {})
 
+        connection_stats_by_resolver = connection_stats_by_resolver or {}
+        cold_performance_stats_by_resolver = cold_performance_stats_by_resolver or {}
+        warm_performance_stats_by_resolver = warm_performance_stats_by_resolver or {}
+        domain_performance_stats_by_resolver = domain_performance_stats_by_resolver or {}
+        category_performance_stats_by_resolver = category_performance_stats_by_resolver or {}
         for resolver in self.all_resolvers:
             self._create_resolver_detail_sheet(
                 resolver=resolver,
@@ -43,7 +94,12 @@ class ExcelGenerator:
                 categorized_blocking_stats=categorized_blocking_stats_by_resolver.get(resolver.url, []),
                 blocked_useful_domains=blocked_useful_domains_by_resolver.get(resolver.url, []),
                 blocked_useless_domains=blocked_useless_domains_by_resolver.get(resolver.url, []),
-                passed_useless_domains=passed_useless_domains_by_resolver.get(resolver.url, [])
+                passed_useless_domains=passed_useless_domains_by_resolver.get(resolver.url, []),
+                connection_stats=connection_stats_by_resolver.get(resolver.url),
+                cold_performance_stats=cold_performance_stats_by_resolver.get(resolver.url),
+                warm_performance_stats=warm_performance_stats_by_resolver.get(resolver.url),
+                domain_performance_stats=domain_performance_stats_by_resolver.get(resolver.url),
+                category_performance_stats=category_performance_stats_by_resolver.get(resolver.url)
             )
 
         try:
@@ -58,49 +114,84 @@ class ExcelGenerator:
         """
         ws = self.workbook.create_sheet(title="DNS Matrix")
 
+        matrix_domains = self.all_domains
+        if len(matrix_domains) > _MAX_MATRIX_DOMAINS:
+            print(f"Warning: The DNS Matrix sheet only shows the first {_MAX_MATRIX_DOMAINS} of "
+                  f"{len(matrix_domains)} domains (Excel column limit).")
+            matrix_domains = matrix_domains[:_MAX_MATRIX_DOMAINS]
+
+        # Column widths must be set before the first row is streamed
+        ws.column_dimensions['A'].width = 25
+        for col_idx, domain in enumerate(matrix_domains, start=2):
+            ws.column_dimensions[get_column_letter(col_idx)].width = max(len(domain.name), 10) + 2  # Min width 12
+
         # Headers
-        headers = ['DNS Resolver'] + [d.name for d in self.all_domains]
+        headers = [self._styled_cell(ws, 'DNS Resolver', 'matrix_header')]
+        headers.extend(self._styled_cell(ws, domain.name, 'matrix_header') for domain in matrix_domains)
         ws.append(headers)
 
-        # Apply header style
-        header_font = Font(bold=True)
-        thin_border = Border(left=Side(style='thin'),
-                             right=Side(style='thin'),
-                             top=Side(style='thin'),
-                             bottom=Side(style='thin'))
-
-        for col_idx, cell in enumerate(ws[1]):
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrapText=True)
-            cell.border = thin_border
-            # Adjust column width based on content
-            if col_idx == 0:
-                ws.column_dimensions[get_column_letter(col_idx + 1)].width = 25
-            else:
-                ws.column_dimensions[get_column_letter(col_idx + 1)].width = max(len(headers[col_idx]), 10) + 2  # Min width 12
-
         # Data rows
-        for r_idx, resolver in enumerate(self.all_resolvers):
-            row_data = [resolver.name]
-            for domain in self.all_domains:
+        for resolver in self.all_resolvers:
+            row_data = [self._styled_cell(ws, resolver.name, 'matrix_resolver')]
+            for domain in matrix_domains:
                 # Retrieve the specific query result for this resolver and domain
                 results = self.query_store.get_results(resolver_url=resolver.url, domain_name=domain.name)
 
                 # There should ideally be only one result per resolver+domain pair
                 if results:
                     status = results[0].status
-                    row_data.append('.' if status == 'Resolved' else 'X')
+                    mark = '.' if status == 'Resolved' else '-' if status == 'Skipped' else 'X'
                 else:
-                    row_data.append('?')  # Should not happen if all queries were made
+                    mark = '?'  # Should not happen if all queries were made
+                row_data.append(self._styled_cell(ws, mark, 'matrix_cell'))
 
             ws.append(row_data)
 
-            # Apply data row style
-            for col_idx, cell in enumerate(ws[r_idx + 2]):  # +2 because row 1 is header, +1 for 0-indexing
-                cell.border = thin_border
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-                if col_idx == 0:  # Resolver name column
-                    cell.alignment = Alignment(horizontal='left', vertical='center', wrapText=True)
+    def _create_vantage_sheet(self,
+                              performance_stats_by_vantage: Dict[str, Dict[str, PerformanceStats]],
+                              blocking_stats_by_vantage: Dict[str, Dict[str, BlockingStats]]):
+        """
+        Creates the "Vantage Points" sheet comparing every resolver as seen from each vantage point of a cluster run.
+        """
+        ws = self.workbook.create_sheet(title="Vantage Points")
+
+        def format_ms(value):
+            return f"{value:.2f}" if value is not None else "N/A"
+
+        rows = [["Vantage Point", "DNS Resolver", "Queries", "Resolved", "Blocked", "Errors", "Error Rate (%)",
+                 "Blocked (%)", "Skipped", "P50 (ms)", "P95 (ms)", "P99 (ms)"]]
+        for vantage_id in sorted(performance_stats_by_vantage):
+            for resolver in self.all_resolvers:
+                performance_stats = performance_stats_by_vantage[vantage_id].get(resolver.url)
+                blocking_stats = blocking_stats_by_vantage.get(vantage_id, {}).get(resolver.url)
+                if performance_stats is None or blocking_stats is None:
+                    continue
+                error_rate = (blocking_stats.error_queries / blocking_stats.total_queries * 100
+                              if blocking_stats.total_queries else 0.0)
+                rows.append([
+                    vantage_id,
+                    resolver.name,
+                    blocking_stats.total_queries,
+                    blocking_stats.resolved_queries,
+                    blocking_stats.blocked_queries,
+                    blocking_stats.error_queries,
+                    f"{error_rate:.2f}",
+                    f"{blocking_stats.overall_blocked_percentage:.2f}",
+                    blocking_stats.skipped_queries,
+                    format_ms(performance_stats.median_latency_ms),
+                    format_ms(performance_stats.p95_latency_ms),
+                    format_ms(performance_stats.p99_latency_ms),
+                ])
+
+        for col_idx in range(len(rows[0])):
+            max_length = max(len(str(row_data[col_idx])) for row_data in rows)
+            ws.column_dimensions[get_column_letter(col_idx + 1)].width = min(max_length + 2, _MAX_DETAIL_COLUMN_WIDTH)
+        ws.append([self._styled_cell(ws, header, 'matrix_header') for header in rows[0]])
+        for row_data in rows[1:]:
+            ws.append([
+                self._styled_cell(ws, cell_value, 'table_label' if col_idx < 2 else 'table_cell')
+                for col_idx, cell_value in enumerate(row_data)
+            ])
 
     def _create_resolver_detail_sheet(self,
                                       resolver: DnsResolver,
@@ -109,7 +200,12 @@ class ExcelGenerator:
                                       categorized_blocking_stats: List[CategorizedBlockingStats],
                                       blocked_useful_domains: List[str],
                                       blocked_useless_domains: List[str],
-                                      passed_useless_domains: List[str]):
+                                      passed_useless_domains: List[str],
+                                      connection_stats: Optional[ConnectionStats] = None,
+                                      cold_performance_stats: Optional[PerformanceStats] = None,
+                                      warm_performance_stats: Optional[PerformanceStats] = None,
+                                      domain_performance_stats: Optional[Dict[str, PerformanceStats]] = None,
+                                      category_performance_stats: Optional[Dict[str, PerformanceStats]] = None):
         """
         Creates a dedicated sheet for a single DNS resolver, detailing its statistics and lists.
         """
@@ -122,32 +218,14 @@ class ExcelGenerator:
 
         ws = self.workbook.create_sheet(title=sheet_title)
 
-        # Styling
-        bold_font = Font(bold=True)
-        thin_border = Border(left=Side(style='thin'),
-                             right=Side(style='thin'),
-                             top=Side(style='thin'),
-                             bottom=Side(style='thin'))
-
-        # Helper to write a section
-        def write_section(title, data_rows, start_row):
-            ws.cell(row=start_row, column=1, value=title).font = bold_font
-            current_row = start_row + 1
-            for row_data in data_rows:
-                for col_idx, cell_value in enumerate(row_data):
-                    cell = ws.cell(row=current_row, column=col_idx + 1, value=cell_value)
-                    cell.border = thin_border
-                    if col_idx == 0:  # Label column
-                        cell.font = bold_font
-                current_row += 1
-            return current_row + 1  # Return next available row, with a blank line separator
+        # Sections are collected first so that column widths are known before streaming
+        sections = []
 
-        current_row = 1
+        def add_section(title, data_rows):
+            sections.append((title, data_rows))
 
-        # Resolver Name
-        ws.cell(row=current_row, column=1, value="DNS Resolver:").font = bold_font
-        ws.cell(row=current_row, column=2, value=resolver.url)
-        current_row += 2
+        def format_ms(value):
+            return f"{value:.2f}" if value is not None else "N/A"
 
         # Performance Statistics
         perf_data = [
@@ -155,17 +233,78 @@ class ExcelGenerator:
             ["Max Latency (ms)", f"{performance_stats.max_latency_ms:.2f}" if performance_stats.max_latency_ms is not None else "N/A"],
             ["Median Latency (ms)", f"{performance_stats.median_latency_ms:.2f}" if performance_stats.median_latency_ms is not None else "N/A"],
             ["Avg Latency (ms)", f"{performance_stats.avg_latency_ms:.2f}" if performance_stats.avg_latency_ms is not None else "N/A"],
+            ["P90 Latency (ms)", format_ms(performance_stats.p90_latency_ms)],
+            ["P95 Latency (ms)", format_ms(performance_stats.p95_latency_ms)],
+            ["P99 Latency (ms)", format_ms(performance_stats.p99_latency_ms)],
+            ["Std Dev (ms)", format_ms(performance_stats.stddev_latency_ms)],
+            ["Jitter (ms)", format_ms(performance_stats.jitter_ms)],
+            ["Samples", performance_stats.sample_count],
         ]
-        current_row = write_section("Performance Statistics (Resolved Queries)", perf_data, current_row)
+        add_section("Performance Statistics (Resolved Queries)", perf_data)
+
+        # Cold vs Warm Samples (multi-round sampling only)
+        if cold_performance_stats is not None and warm_performance_stats is not None:
+            cold_warm_data = [["Sample", "Samples", "P50 (ms)", "P90 (ms)", "P95 (ms)", "P99 (ms)", "Std Dev (ms)", "Jitter (ms)"]]
+            for label, stats in (("Cold (first round)", cold_performance_stats), ("Warm (later rounds)", warm_performance_stats)):
+                cold_warm_data.append([
+                    label,
+                    stats.sample_count,
+                    format_ms(stats.median_latency_ms),
+                    format_ms(stats.p90_latency_ms),
+                    format_ms(stats.p95_latency_ms),
+                    format_ms(stats.p99_latency_ms),
+                    format_ms(stats.stddev_latency_ms),
+                    format_ms(stats.jitter_ms)
+                ])
+            add_section("Cold vs Warm Latency", cold_warm_data)
+
+        # Latency by Domain Category
+        if category_performance_stats:
+            category_latency_data = [["Category", "Samples", "P50 (ms)", "P90 (ms)", "P95 (ms)", "P99 (ms)", "Std Dev (ms)"]]
+            for category, stats in category_performance_stats.items():
+                category_latency_data.append([
+                    category,
+                    stats.sample_count,
+                    format_ms(stats.median_latency_ms),
+                    format_ms(stats.p90_latency_ms),
+                    format_ms(stats.p95_latency_ms),
+                    format_ms(stats.p99_latency_ms),
+                    format_ms(stats.stddev_latency_ms)
+                ])
+            add_section("Latency by Category (Resolved Queries)", category_latency_data)
+
+        # Latency Phase Breakdown
+        phase_data = [
+            ["Avg Queue Wait (ms)", format_ms(performance_stats.avg_queue_wait_ms)],
+            ["Avg TCP Connect (ms, new connections)", format_ms(performance_stats.avg_connect_ms)],
+            ["Avg TLS Handshake (ms, new connections)", format_ms(performance_stats.avg_tls_ms)],
+            ["Avg Time to First Byte (ms)", format_ms(performance_stats.avg_ttfb_ms)],
+            ["Avg Total Request (ms)", format_ms(performance_stats.avg_latency_ms)],
+        ]
+        add_section("Latency Phase Breakdown (Resolved Queries)", phase_data)
 
         # Error Rate Statistics
         error_rate = blocking_stats.error_queries / blocking_stats.total_queries * 100 if blocking_stats.total_queries > 0 else 0.0
         error_data = [
             ["Total Queries", blocking_stats.total_queries],
             ["Error Queries", blocking_stats.error_queries],
-            ["Error Rate (%)", f"{error_rate:.2f}%"]
+            ["Error Rate (%)", f"{error_rate:.2f}%"],
+            ["Skipped Queries (circuit open, not sent)", blocking_stats.skipped_queries]
         ]
-        current_row = write_section("Error Rate Statistics", error_data, current_row)
+        add_section("Error Rate Statistics", error_data)
+
+        # Connection Statistics
+        if connection_stats is not None:
+            connection_data = [
+                ["Requests Sent", connection_stats.requests],
+                ["New Connections", connection_stats.new_connections],
+                ["Requests on Reused Connections", connection_stats.reused_connection_requests],
+                ["HTTP/2 Requests", connection_stats.http2_requests],
+                ["Retry Requests", connection_stats.retry_requests],
+                ["Hedged Requests", connection_stats.hedged_requests],
+                ["Hedged Requests Answered First", connection_stats.hedges_won],
+            ]
+            add_section("Connection Statistics", connection_data)
 
         # Overall Blocking Statistics
         overall_blocking_data = [
@@ -174,7 +313,7 @@ class ExcelGenerator:
             ["Blocked Queries", blocking_stats.blocked_queries],
             ["Overall Blocked (%)", f"{blocking_stats.overall_blocked_percentage:.2f}%"],
         ]
-        current_row = write_section("Overall Blocking Statistics", overall_blocking_data, current_row)
+        add_section("Overall Blocking Statistics", overall_blocking_data)
 
         # Categorized Blocking Statistics
         cat_blocking_header = [["Category", "Total Non-Error", "Blocked Count", "Blocked (%)"]]
@@ -186,28 +325,55 @@ class ExcelGenerator:
                 stat.blocked_in_category,
                 f"{stat.percentage_blocked_in_category:.2f}%"
             ])
-        current_row = write_section("Categorized Blocking Statistics", cat_blocking_header + cat_blocking_rows, current_row)
+        add_section("Categorized Blocking Statistics", cat_blocking_header + cat_blocking_rows)
+
+        # Per-Domain Latency (multi-round sampling only)
+        if domain_performance_stats:
+            domain_latency_data = [["Domain", "Samples", "Min (ms)", "Avg (ms)", "Max (ms)", "Std Dev (ms)", "Jitter (ms)"]]
+            for domain_name in sorted(domain_performance_stats):
+                stats = domain_performance_stats[domain_name]
+                domain_latency_data.append([
+                    domain_name,
+                    stats.sample_count,
+                    format_ms(stats.min_latency_ms),
+                    format_ms(stats.avg_latency_ms),
+                    format_ms(stats.max_latency_ms),
+                    format_ms(stats.stddev_latency_ms),
+                    format_ms(stats.jitter_ms)
+                ])
+            add_section("Per-Domain Latency (Resolved Queries)", domain_latency_data)
 
         # List of Blocked Useful Domains
-        current_row = write_section("Blocked Useful Domains", [[d] for d in blocked_useful_domains] if blocked_useful_domains else [["None"]], current_row)
+        add_section("Blocked Useful Domains", [[d] for d in blocked_useful_domains] if blocked_useful_domains else [["None"]])
 
         # List of Blocked Useless Domains
-        current_row = write_section("Blocked Useless Domains", [[d] for d in blocked_useless_domains] if blocked_useless_domains else [["None"]], current_row)
+        add_section("Blocked Useless Domains", [[d] for d in blocked_useless_domains] if blocked_useless_domains else [["None"]])
 
         # List of Passed Useless Domains
-        current_row = write_section("Passed Useless Domains", [[d] for d in passed_useless_domains] if passed_useless_domains else [["None"]], current_row)
-
-        # Auto-adjust column widths
-        for col in ws.columns:
-            max_length = 0
-            column = col[0].column_letter  # Get the column name
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = (max_length + 2)
-            if adjusted_width > 50:  # Cap max width
-                adjusted_width = 50
-            ws.column_dimensions[column].width = adjusted_width
\ No newline at end of file
+        add_section("Passed Useless Domains", [[d] for d in passed_useless_domains] if passed_useless_domains else [["None"]])
+
+        # Column widths from the known cell values
+        column_widths = [len("DNS Resolver:"), len(resolver.url)]
+        for title, data_rows in sections:
+            column_widths[0] = max(column_widths[0], len(title))
+            for row_data in data_rows:
+                for col_idx, cell_value in enumerate(row_data):
+                    if col_idx >= len(column_widths):
+                        column_widths.append(0)
+                    column_widths[col_idx] = max(column_widths[col_idx], len(str(cell_value)))
+        for col_idx, max_length in enumerate(column_widths, start=1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = min(max_length + 2, _MAX_DETAIL_COLUMN_WIDTH)
+
+        # Resolver Name
+        ws.append([self._styled_cell(ws, "DNS Resolver:", 'section_title'), resolver.url])
+        ws.append([])
+
+        # Sections, each followed by a blank line separator
+        for title, data_rows in sections:
+            ws.append([self._styled_cell(ws, title, 'section_title')])
+            for row_data in data_rows:
+                ws.append([
+                    self._styled_cell(ws, cell_value, 'table_label' if col_idx == 0 else 'table_cell')  # Label column
+                    for col_idx, cell_value in enumerate(row_data)
+                ])
+            ws.append([])
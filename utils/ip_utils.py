@@ -1,24 +1,89 @@
 import ipaddress
-from typing import List
+import socket
+from array import array
+from bisect import bisect_right
+from typing import Iterable, List, Optional, Tuple
 from data.models import BlockingIpRange
 
-def is_valid_ipv4(ip_address_str: str) -> bool:
+
+def ipv4_to_int(ip_address_str: str) -> Optional[int]:
+    """Parses a dotted-quad IPv4 address into an integer, or returns None if it is not valid."""
     try:
-        ipaddress.IPv4Address(ip_address_str)
-        return True
-    except ipaddress.AddressValueError:
-        return False
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, ip_address_str), 'big')
+    except (OSError, TypeError):
+        return None
 
 
-def is_private_or_non_routable_ipv4(ip_address_str: str, blocking_ip_ranges: List[BlockingIpRange]) -> bool:
-    if not is_valid_ipv4(ip_address_str):
-        return False
+def int_to_ipv4(ip_address_int: int) -> str:
+    """Formats an integer IPv4 address as a dotted-quad string."""
+    return socket.inet_ntoa(ip_address_int.to_bytes(4, 'big'))
 
-    ip_address = ipaddress.IPv4Address(ip_address_str)
 
-    # Check against explicit blocking ranges
-    for block_range in blocking_ip_ranges:
-        if ip_address in block_range.network:
-            return True
+def parse_ipv4_interval(entry: str) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single address ('192.0.2.1'), a CIDR block ('192.0.2.0/24') or an inclusive
+    range ('192.0.2.10-192.0.2.20') into an integer (start, end) interval.
+    Returns None if the entry is not valid.
+    """
+    if '/' in entry:
+        try:
+            network = ipaddress.IPv4Network(entry, strict=False)
+        except ValueError:
+            return None
+        return int(network.network_address), int(network.broadcast_address)
+    if '-' in entry:
+        start_str, _, end_str = entry.partition('-')
+        start, end = ipv4_to_int(start_str.strip()), ipv4_to_int(end_str.strip())
+        if start is None or end is None or start > end:
+            return None
+        return start, end
+    ip_int = ipv4_to_int(entry)
+    return None if ip_int is None else (ip_int, ip_int)
+
+
+def merge_ipv4_intervals(intervals: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Sorts integer (start, end) intervals and merges duplicates, overlaps and adjacent intervals."""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
 
-    return False
\ No newline at end of file
+
+class BlockingIpMatcher:
+    """
+    Precompiled IPv4 blocking lookup over integer addresses.
+    Blocking ranges and custom CIDRs/ranges are merged into sorted, non-overlapping
+    [start, end] intervals kept in two compact arrays (8 bytes per interval) and searched
+    with bisect; single custom addresses are kept in a set. Each lookup costs O(log n)
+    in the number of merged ranges, independent of how the lists were written.
+    """
+    def __init__(self,
+                 blocking_ip_ranges: List[BlockingIpRange],
+                 custom_blocking_intervals: Iterable[Tuple[int, int]] = ()):
+        intervals = [
+            (int(block_range.network.network_address), int(block_range.network.broadcast_address))
+            for block_range in blocking_ip_ranges
+        ]
+        self._exact_ips = set()
+        for start, end in custom_blocking_intervals:
+            if start == end:
+                self._exact_ips.add(start)
+            else:
+                intervals.append((start, end))
+
+        self._starts = array('I')
+        self._ends = array('I')
+        for start, end in merge_ipv4_intervals(intervals):
+            self._starts.append(start)
+            self._ends.append(end)
+
+    def is_blocked(self, ip_address_int: int) -> bool:
+        """Returns True if the address is a custom blocking IP or lies in a blocking range."""
+        if ip_address_int in self._exact_ips:
+            return True
+        index = bisect_right(self._starts, ip_address_int) - 1
+        return index >= 0 and ip_address_int <= self._ends[index]
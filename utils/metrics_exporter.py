@@ -0,0 +1,164 @@
+import asyncio
+from bisect import bisect_left
+from typing import Dict, List, Optional
+from data.models import QueryResult, DomainCategory
+from config.settings import ALL_DOMAIN_CATEGORIES, METRICS_LATENCY_BUCKETS_SECONDS
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+_STATUSES = ('Resolved', 'Blocked', 'Error', 'Skipped')
+_STATUS_INDEXES = {status: index for index, status in enumerate(_STATUSES)}
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _ResolverMetrics:
+    """Raw counters of one resolver; cumulative buckets and ratios are only derived when rendering."""
+    __slots__ = ('status_counts', 'category_status_counts', 'error_counts', 'latency_bucket_counts',
+                 'latency_sum', 'latency_count')
+
+    def __init__(self, category_count: int, latency_bucket_count: int):
+        self.status_counts = [0] * len(_STATUSES)
+        self.category_status_counts = [0] * (category_count * len(_STATUSES))
+        self.error_counts: Dict[str, int] = {}
+        self.latency_bucket_counts = [0] * (latency_bucket_count + 1)  # The last slot is +Inf
+        self.latency_sum = 0.0
+        self.latency_count = 0
+
+
+class ProbeMetrics:
+    """
+    Per-resolver probe metrics in OpenMetrics format: query counters by status and by domain category,
+    error counters by class, blocked ratios per domain category and a latency histogram.
+    `observe` only increments preallocated counters (plus one bisect over the fixed latency bounds),
+    so it can run on every QueryResult inside the event loop; text is produced only when scraped.
+    """
+    def __init__(self,
+                 categories: List[DomainCategory] = ALL_DOMAIN_CATEGORIES,
+                 latency_buckets_seconds: List[float] = METRICS_LATENCY_BUCKETS_SECONDS):
+        self._categories = list(categories)
+        self._category_indexes = {category: index for index, category in enumerate(self._categories)}
+        self._latency_bounds = sorted(latency_buckets_seconds)
+        self._resolvers: Dict[str, _ResolverMetrics] = {}
+
+    def observe(self, result: QueryResult):
+        """Records a single analyzed QueryResult."""
+        metrics = self._resolvers.get(result.resolver_url)
+        if metrics is None:
+            metrics = _ResolverMetrics(len(self._categories), len(self._latency_bounds))
+            self._resolvers[result.resolver_url] = metrics
+        status_index = _STATUS_INDEXES[result.status]
+        metrics.status_counts[status_index] += 1
+        category_index = self._category_indexes.get(result.domain_category)
+        if category_index is not None:
+            metrics.category_status_counts[category_index * len(_STATUSES) + status_index] += 1
+        if result.status == 'Error':
+            error_type = result.error_type or 'unknown'
+            metrics.error_counts[error_type] = metrics.error_counts.get(error_type, 0) + 1
+        elif result.latency_ms is not None:
+            latency_seconds = result.latency_ms / 1000
+            metrics.latency_bucket_counts[bisect_left(self._latency_bounds, latency_seconds)] += 1
+            metrics.latency_sum += latency_seconds
+            metrics.latency_count += 1
+
+    def render(self) -> str:
+        """Renders every metric in the OpenMetrics text format, terminated by '# EOF'."""
+        lines = [
+            '# TYPE dns_analyzer_queries counter',
+            '# HELP dns_analyzer_queries DoH queries by final status.',
+        ]
+        resolver_labels = {url: f'resolver="{_escape_label_value(url)}"' for url in self._resolvers}
+        for url, metrics in self._resolvers.items():
+            for status, count in zip(_STATUSES, metrics.status_counts):
+                lines.append(f'dns_analyzer_queries_total{{{resolver_labels[url]},status="{status}"}} {count}')
+
+        lines.append('# TYPE dns_analyzer_category_queries counter')
+        lines.append('# HELP dns_analyzer_category_queries DoH queries by domain category and final status.')
+        for url, metrics in self._resolvers.items():
+            for category_index, category in enumerate(self._categories):
+                for status_index, status in enumerate(_STATUSES):
+                    count = metrics.category_status_counts[category_index * len(_STATUSES) + status_index]
+                    lines.append(f'dns_analyzer_category_queries_total{{{resolver_labels[url]},'
+                                 f'category="{category}",status="{status}"}} {count}')
+
+        lines.append('# TYPE dns_analyzer_query_errors counter')
+        lines.append('# HELP dns_analyzer_query_errors Failed DoH queries by error class.')
+        for url, metrics in self._resolvers.items():
+            for error_type, count in sorted(metrics.error_counts.items()):
+                lines.append(f'dns_analyzer_query_errors_total{{{resolver_labels[url]},'
+                             f'error_type="{_escape_label_value(error_type)}"}} {count}')
+
+        lines.append('# TYPE dns_analyzer_blocked_ratio gauge')
+        lines.append('# HELP dns_analyzer_blocked_ratio Share of blocked among resolved and blocked queries, per domain category.')
+        for url, metrics in self._resolvers.items():
+            for category_index, category in enumerate(self._categories):
+                offset = category_index * len(_STATUSES)
+                resolved = metrics.category_status_counts[offset + _STATUS_INDEXES['Resolved']]
+                blocked = metrics.category_status_counts[offset + _STATUS_INDEXES['Blocked']]
+                if resolved + blocked:
+                    lines.append(f'dns_analyzer_blocked_ratio{{{resolver_labels[url]},category="{category}"}} '
+                                 f'{_format_number(blocked / (resolved + blocked))}')
+
+        lines.append('# TYPE dns_analyzer_query_latency_seconds histogram')
+        lines.append('# UNIT dns_analyzer_query_latency_seconds seconds')
+        lines.append('# HELP dns_analyzer_query_latency_seconds Latency of answered DoH queries.')
+        for url, metrics in self._resolvers.items():
+            cumulative_count = 0
+            for bound, count in zip(self._latency_bounds + [None], metrics.latency_bucket_counts):
+                cumulative_count += count
+                le = '+Inf' if bound is None else _format_number(float(bound))
+                lines.append(f'dns_analyzer_query_latency_seconds_bucket{{{resolver_labels[url]},le="{le}"}} '
+                             f'{cumulative_count}')
+            lines.append(f'dns_analyzer_query_latency_seconds_count{{{resolver_labels[url]}}} {metrics.latency_count}')
+            lines.append(f'dns_analyzer_query_latency_seconds_sum{{{resolver_labels[url]}}} '
+                         f'{_format_number(metrics.latency_sum)}')
+
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """
+    Minimal HTTP server on the running event loop that serves ProbeMetrics on GET /metrics.
+    Each scrape renders the current counters; every other path answers 404.
+    """
+    def __init__(self, metrics: ProbeMetrics):
+        self._metrics = metrics
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str, port: int):
+        self._server = await asyncio.start_server(self._handle_connection, host or None, port)
+        bound_address = self._server.sockets[0].getsockname()
+        print(f"Serving OpenMetrics on http://{bound_address[0]}:{bound_address[1]}/metrics")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            while True:  # Headers are not needed
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] in ('GET', 'HEAD') and parts[1].split('?')[0] == '/metrics':
+                status, content_type, body = '200 OK', OPENMETRICS_CONTENT_TYPE, self._metrics.render().encode('utf-8')
+            else:
+                status, content_type, body = '404 Not Found', 'text/plain; charset=utf-8', b'Not found\n'
+            headers = (f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                       f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+            writer.write(headers.encode('latin-1') + (body if parts[:1] != ['HEAD'] else b''))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,151 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+from dataclasses import fields
+from typing import Any, Dict, List, Optional, Union, get_args, get_origin, get_type_hints
+from data.models import QueryResult
+from config.settings import SINK_FLUSH_INTERVAL_ROWS, PARQUET_ROW_GROUP_SIZE
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; only the Parquet sink needs it
+    pa = None
+    pq = None
+
+RESULT_FIELDS: List[str] = [field.name for field in fields(QueryResult) if not field.metadata.get('derived')]
+
+
+class ResultSink(ABC):
+    """
+    Destination that receives every QueryResult as soon as it has been analyzed.
+    Sinks write incrementally so that the results completed so far survive a crash
+    or interruption; `close` must be called to flush the remaining buffered rows.
+    """
+    @abstractmethod
+    def write(self, result: QueryResult):
+        """Records a single analyzed result."""
+
+    def close(self):
+        pass
+
+
+class CsvResultSink(ResultSink):
+    """
+    Writes one CSV row per result. Resolved IPs are joined with spaces and missing
+    values are written as empty fields.
+    """
+    def __init__(self, path: str, flush_interval_rows: int = SINK_FLUSH_INTERVAL_ROWS):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(RESULT_FIELDS)
+        self._flush_interval_rows = flush_interval_rows
+        self._pending_rows = 0
+
+    def write(self, result: QueryResult):
+        row = []
+        for name in RESULT_FIELDS:
+            value = getattr(result, name)
+            if value is None:
+                value = ''
+            elif name == 'resolved_ips':
+                value = ' '.join(value)
+            row.append(value)
+        self._writer.writerow(row)
+        self._pending_rows += 1
+        if self._pending_rows >= self._flush_interval_rows:
+            self._file.flush()
+            self._pending_rows = 0
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlResultSink(ResultSink):
+    """
+    Writes one JSON object per line (newline-delimited JSON) per result.
+    """
+    def __init__(self, path: str, flush_interval_rows: int = SINK_FLUSH_INTERVAL_ROWS):
+        self._file = open(path, 'w', encoding='utf-8')
+        self._flush_interval_rows = flush_interval_rows
+        self._pending_rows = 0
+
+    def write(self, result: QueryResult):
+        record = {name: getattr(result, name) for name in RESULT_FIELDS}
+        self._file.write(json.dumps(record, ensure_ascii=False))
+        self._file.write('\n')
+        self._pending_rows += 1
+        if self._pending_rows >= self._flush_interval_rows:
+            self._file.flush()
+            self._pending_rows = 0
+
+    def close(self):
+        self._file.close()
+
+
+def _arrow_type(annotation) -> 'pa.DataType':
+    """Maps a QueryResult field annotation to an Arrow type; Literal and str fields become strings."""
+    if get_origin(annotation) is Union:  # Optional[X]
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+    if annotation is float:
+        return pa.float64()
+    if annotation is int:
+        return pa.int64()
+    if get_origin(annotation) is list:
+        return pa.list_(pa.string())
+    return pa.string()
+
+
+def _parquet_schema() -> 'pa.Schema':
+    """Builds the Parquet schema from the QueryResult field annotations."""
+    annotations = get_type_hints(QueryResult)
+    return pa.schema([pa.field(name, _arrow_type(annotations[name])) for name in RESULT_FIELDS])
+
+
+class ParquetResultSink(ResultSink):
+    """
+    Buffers results column by column and writes each full buffer as a Parquet row group.
+    Requires pyarrow. Note that a Parquet file is only readable after `close` has written
+    its footer; use the CSV or JSONL sink when partial output must survive a crash.
+    """
+    def __init__(self, path: str, row_group_size: int = PARQUET_ROW_GROUP_SIZE):
+        if pa is None:
+            raise ValueError("Parquet output requires pyarrow (pip install pyarrow).")
+        self._schema = _parquet_schema()
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._row_group_size = row_group_size
+        self._columns: Dict[str, List[Any]] = {name: [] for name in RESULT_FIELDS}
+
+    def write(self, result: QueryResult):
+        for name, column in self._columns.items():
+            column.append(getattr(result, name))
+        if len(self._columns['domain']) >= self._row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        if not self._columns['domain']:
+            return
+        self._writer.write_table(pa.Table.from_pydict(self._columns, schema=self._schema))
+        self._columns = {name: [] for name in RESULT_FIELDS}
+
+    def close(self):
+        self._write_row_group()
+        self._writer.close()
+
+
+_SINK_CLASSES = {
+    'csv': CsvResultSink,
+    'jsonl': JsonlResultSink,
+    'parquet': ParquetResultSink,
+}
+
+
+def create_result_sink(sink_format: str, path: str) -> ResultSink:
+    """
+    Creates a per-result sink for 'csv', 'jsonl' or 'parquet'. The Excel report is not
+    a per-result sink; it is generated from the stored results once the run is over.
+    """
+    sink_class: Optional[type] = _SINK_CLASSES.get(sink_format)
+    if sink_class is None:
+        raise ValueError(f"Unknown result sink format '{sink_format}'.")
+    return sink_class(path)
@@ -0,0 +1,66 @@
+import json
+from dataclasses import asdict
+from typing import Dict, List, Optional
+from data.models import PerformanceStats, BlockingStats, CategorizedBlockingStats, ConnectionStats
+
+
+def write_summary(output_filepath: str,
+                  total_queries: int,
+                  skipped_queries: int,
+                  duration_seconds: float,
+                  performance_stats_by_resolver: Dict[str, PerformanceStats],
+                  blocking_stats_by_resolver: Dict[str, BlockingStats],
+                  categorized_blocking_stats_by_resolver: Dict[str, List[CategorizedBlockingStats]],
+                  category_performance_stats_by_resolver: Optional[Dict[str, Dict[str, PerformanceStats]]] = None,
+                  connection_stats_by_resolver: Optional[Dict[str, ConnectionStats]] = None,
+                  performance_stats_by_vantage: Optional[Dict[str, Dict[str, PerformanceStats]]] = None,
+                  blocking_stats_by_vantage: Optional[Dict[str, Dict[str, BlockingStats]]] = None):
+    """
+    Writes the per-resolver summary statistics of a run to a JSON file, keyed by resolver URL.
+    Cluster runs add the per-resolver statistics of every vantage point, keyed by vantage ID.
+    `total_queries` counts the queries that were sent; `skipped_queries` the ones an open circuit
+    breaker short-circuited.
+    """
+    category_performance_stats_by_resolver = category_performance_stats_by_resolver or {}
+    connection_stats_by_resolver = connection_stats_by_resolver or {}
+    performance_stats_by_vantage = performance_stats_by_vantage or {}
+    blocking_stats_by_vantage = blocking_stats_by_vantage or {}
+
+    resolvers = {}
+    for resolver_url, performance_stats in performance_stats_by_resolver.items():
+        blocking_stats = blocking_stats_by_resolver.get(resolver_url)
+        connection_stats = connection_stats_by_resolver.get(resolver_url)
+        resolvers[resolver_url] = {
+            'performance': asdict(performance_stats),
+            'blocking': asdict(blocking_stats) if blocking_stats else None,
+            'categorized_blocking': [asdict(stat) for stat in categorized_blocking_stats_by_resolver.get(resolver_url, [])],
+            'category_performance': {
+                category: asdict(stats)
+                for category, stats in category_performance_stats_by_resolver.get(resolver_url, {}).items()
+            },
+            'connections': asdict(connection_stats) if connection_stats else None,
+        }
+
+    summary = {
+        'total_queries': total_queries,
+        'skipped_queries': skipped_queries,
+        'duration_seconds': duration_seconds,
+        'resolvers': resolvers,
+    }
+    if performance_stats_by_vantage:
+        summary['vantages'] = {
+            vantage_id: {
+                resolver_url: {
+                    'performance': asdict(performance_stats),
+                    'blocking': asdict(blocking_stats_by_vantage[vantage_id][resolver_url]),
+                }
+                for resolver_url, performance_stats in vantage_performance_stats.items()
+            }
+            for vantage_id, vantage_performance_stats in performance_stats_by_vantage.items()
+        }
+    try:
+        with open(output_filepath, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        print(f"Summary statistics saved to '{output_filepath}'")
+    except OSError as e:
+        print(f"Error saving summary statistics: {e}")